@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import filters, histogram, sankey, comparison, feature
+from . import filters, histogram, sankey, comparison, feature, semantic_search
 
 router = APIRouter()
 
@@ -7,4 +7,5 @@ router.include_router(filters.router, tags=["filters"])
 router.include_router(histogram.router, tags=["histogram"])
 router.include_router(sankey.router, tags=["sankey"])
 router.include_router(comparison.router, tags=["comparison"])
-router.include_router(feature.router, tags=["feature"])
\ No newline at end of file
+router.include_router(feature.router, tags=["feature"])
+router.include_router(semantic_search.router, tags=["semantic_search"])
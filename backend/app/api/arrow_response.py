@@ -0,0 +1,63 @@
+"""
+Apache Arrow IPC responses with Accept-header content negotiation.
+
+Clients that send `Accept: application/vnd.apache.arrow.stream` receive the
+tabular part of a response as an Arrow IPC stream written directly by Polars,
+and the small non-tabular part (statistics, pagination, applied filters) as
+compact JSON in the X-Arrow-Metadata header. All other clients get JSON.
+"""
+
+import io
+import json
+from typing import Any, Dict, Optional
+
+import polars as pl
+from fastapi import Request
+from fastapi.responses import Response
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_METADATA_HEADER = "X-Arrow-Metadata"
+
+# OpenAPI entry for endpoints that can answer with an Arrow stream
+ARROW_RESPONSE_CONTENT = {ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}
+
+
+def accepts_arrow(request: Request) -> bool:
+    """Whether the Accept header asks for an Arrow IPC stream (with a non-zero q)."""
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != ARROW_STREAM_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class ArrowResponse(Response):
+    """Response carrying a Polars DataFrame as an Arrow IPC stream."""
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def __init__(
+        self,
+        table: pl.DataFrame,
+        metadata: Optional[Dict[str, Any]] = None,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        buffer = io.BytesIO()
+        table.write_ipc_stream(buffer)
+
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept"
+        if metadata is not None:
+            # Header values must be ASCII, so non-ASCII characters are escaped
+            headers[ARROW_METADATA_HEADER] = json.dumps(metadata, separators=(",", ":"))
+
+        super().__init__(content=buffer.getvalue(), status_code=status_code, headers=headers)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import Optional
 import logging
 from ..services.visualization_service import DataService
-from ..models.responses import FeatureResponse
+from ..models.requests import FeatureBatchRequest
+from ..models.responses import FeatureResponse, FeatureBatchResponse, FeatureNeighborsResponse
 from ..models.common import ErrorResponse
+from .arrow_response import ArrowResponse, accepts_arrow, ARROW_RESPONSE_CONTENT
+from .json_response import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,7 +31,7 @@ def get_data_service():
     "/feature/{feature_id}",
     response_model=FeatureResponse,
     responses={
-        200: {"description": "Feature data retrieved successfully"},
+        200: {"description": "Feature data retrieved successfully", "content": ARROW_RESPONSE_CONTENT},
         400: {"model": ErrorResponse, "description": "Invalid query parameters"},
         404: {"model": ErrorResponse, "description": "Feature not found"},
         500: {"model": ErrorResponse, "description": "Server error"}
@@ -38,6 +41,7 @@ def get_data_service():
 )
 async def get_feature_data(
     feature_id: int,
+    http_request: Request,
     data_service: DataService = Depends(get_data_service),
     sae_id: Optional[str] = Query(
         None,
@@ -54,6 +58,10 @@ async def get_feature_data(
     llm_scorer: Optional[str] = Query(
         None,
         description="Specific LLM scorer context to filter by"
+    ),
+    include_details: bool = Query(
+        False,
+        description="Inline the detailed JSON (explanations, per-scorer scores, distance pairs)"
     )
 ):
     """
@@ -67,12 +75,18 @@ async def get_feature_data(
     explanation methods, LLMs, etc.), you can use the optional query parameters
     to specify which specific record you want to retrieve.
 
+    Clients sending `Accept: application/vnd.apache.arrow.stream` receive the
+    record as a one-row Arrow IPC table; with include_details the detailed JSON
+    is carried as a string in its `details` column.
+
     Args:
         feature_id: The unique feature identifier
         sae_id: Optional SAE model identifier filter
         explanation_method: Optional explanation method filter
         llm_explainer: Optional LLM explainer model filter
         llm_scorer: Optional LLM scorer model filter
+        include_details: Inline the feature's detailed JSON content
+        http_request: Raw request, used for Accept-header negotiation
         data_service: Data service dependency
 
     Returns:
@@ -95,13 +109,25 @@ async def get_feature_data(
                 }
             )
 
+        if accepts_arrow(http_request):
+            table = await data_service.get_feature_table(
+                feature_id=feature_id,
+                sae_id=sae_id,
+                explanation_method=explanation_method,
+                llm_explainer=llm_explainer,
+                llm_scorer=llm_scorer,
+                include_details=include_details
+            )
+            return ArrowResponse(table)
+
         # Retrieve feature data
         return await data_service.get_feature_data(
             feature_id=feature_id,
             sae_id=sae_id,
             explanation_method=explanation_method,
             llm_explainer=llm_explainer,
-            llm_scorer=llm_scorer
+            llm_scorer=llm_scorer,
+            include_details=include_details
         )
 
     except ValueError as e:
@@ -163,4 +189,220 @@ async def get_feature_data(
                     "details": {"error": str(e)}
                 }
             }
-        )
\ No newline at end of file
+        )
+
+@router.get(
+    "/feature/{feature_id}/neighbors",
+    response_model=FeatureNeighborsResponse,
+    responses={
+        200: {"description": "Feature neighbors retrieved successfully"},
+        400: {"model": ErrorResponse, "description": "Invalid query parameters"},
+        404: {"model": ErrorResponse, "description": "Feature or neighbor table not found"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    summary="Get Feature Decoder Neighbors",
+    description="Returns the nearest decoder neighbors of a feature by cosine similarity, e.g. for feature-splitting views."
+)
+async def get_feature_neighbors(
+    feature_id: int,
+    data_service: DataService = Depends(get_data_service),
+    sae_id: Optional[str] = Query(
+        None,
+        description="SAE of the feature (required when neighbors of several SAEs are loaded)"
+    ),
+    k: Optional[int] = Query(
+        None,
+        ge=1,
+        le=1000,
+        description="Maximum number of neighbors to return (default: all stored neighbors)"
+    )
+):
+    """
+    Get the top-k nearest decoder neighbors of a feature.
+
+    Neighbors come from the precomputed neighbor table next to the master parquet
+    (data/master/feature_neighbors.parquet), loaded at startup into per-SAE CSR
+    arrays, so a lookup is an array slice rather than a query.
+
+    Args:
+        feature_id: The unique feature identifier
+        sae_id: Optional SAE model identifier
+        k: Optional maximum number of neighbors
+        data_service: Data service dependency
+
+    Returns:
+        FeatureNeighborsResponse: Neighbor feature IDs and cosine similarities,
+        most similar first
+
+    Raises:
+        HTTPException: For unknown features, a missing neighbor table, invalid
+        parameters, or server errors
+    """
+    try:
+        if feature_id < 0:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": {
+                        "code": "INVALID_FEATURE_ID",
+                        "message": "Feature ID must be non-negative",
+                        "details": {"feature_id": feature_id}
+                    }
+                }
+            )
+
+        if not data_service.has_feature_neighbors():
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "error": {
+                        "code": "NEIGHBORS_NOT_AVAILABLE",
+                        "message": "No feature neighbor table is loaded",
+                        "details": {}
+                    }
+                }
+            )
+
+        return FastJSONResponse(data_service.get_feature_neighbors(feature_id, sae_id, k))
+
+    except ValueError as e:
+        error_msg = str(e)
+        if "not found" in error_msg.lower():
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "error": {
+                        "code": "FEATURE_NOT_FOUND",
+                        "message": error_msg,
+                        "details": {"feature_id": feature_id, "sae_id": sae_id}
+                    }
+                }
+            )
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_REQUEST",
+                    "message": error_msg,
+                    "details": {}
+                }
+            }
+        )
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Error retrieving feature neighbors: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": {
+                    "code": "INTERNAL_ERROR",
+                    "message": "Failed to retrieve feature neighbors",
+                    "details": {"error": str(e)}
+                }
+            }
+        )
+
+@router.post(
+    "/features/batch",
+    response_model=FeatureBatchResponse,
+    responses={
+        200: {"description": "Feature rows retrieved successfully", "content": ARROW_RESPONSE_CONTENT},
+        400: {"model": ErrorResponse, "description": "Invalid request parameters"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    summary="Get Feature Data in Bulk",
+    description="Returns the rows of many features at once as a paginated columnar table, e.g. for Sankey leaf drill-down."
+)
+async def get_features_batch(
+    request: FeatureBatchRequest,
+    http_request: Request,
+    data_service: DataService = Depends(get_data_service)
+):
+    """
+    Get master rows for a list of feature IDs.
+
+    All requested features are looked up with one indexed gather instead of one
+    request per feature. Rows are restricted to the filter context, returned in
+    primary key order, and paginated with offset/limit; `columns` optionally
+    projects the response to a subset of the master columns.
+
+    Clients sending `Accept: application/vnd.apache.arrow.stream` receive the
+    page as an Arrow IPC table with the pagination fields in the
+    X-Arrow-Metadata header, where missing_feature_ids is replaced by
+    missing_feature_count.
+
+    Args:
+        request: Feature IDs, filter context, column projection and page
+        http_request: Raw request, used for Accept-header negotiation
+        data_service: Data service dependency
+
+    Returns:
+        FeatureBatchResponse: Columnar page of feature rows and pagination info
+
+    Raises:
+        HTTPException: For invalid feature IDs or columns, or server errors
+    """
+    try:
+        negative_ids = [fid for fid in request.feature_ids if fid < 0]
+        if negative_ids:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": {
+                        "code": "INVALID_FEATURE_ID",
+                        "message": "Feature IDs must be non-negative",
+                        "details": {"feature_ids": negative_ids[:10]}
+                    }
+                }
+            )
+
+        if accepts_arrow(http_request):
+            table, pagination = await data_service.get_features_batch_table(
+                feature_ids=request.feature_ids,
+                filters=request.filters,
+                columns=request.columns,
+                offset=request.offset,
+                limit=request.limit
+            )
+            # Up to 100k missing ids would not fit in a header, so it carries their count
+            missing_ids = pagination.pop("missing_feature_ids")
+            return ArrowResponse(table, {**pagination, "missing_feature_count": len(missing_ids)})
+
+        return await data_service.get_features_batch(
+            feature_ids=request.feature_ids,
+            filters=request.filters,
+            columns=request.columns,
+            offset=request.offset,
+            limit=request.limit
+        )
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_REQUEST",
+                    "message": str(e),
+                    "details": {}
+                }
+            }
+        )
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Error retrieving feature batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": {
+                    "code": "INTERNAL_ERROR",
+                    "message": "Failed to retrieve feature data",
+                    "details": {"error": str(e)}
+                }
+            }
+        )
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 import logging
 from ..services.visualization_service import DataService
 from ..models.requests import HistogramRequest
 from ..models.responses import HistogramResponse
 from ..models.common import ErrorResponse
+from .json_response import FastJSONResponse
+from .arrow_response import ArrowResponse, accepts_arrow, ARROW_RESPONSE_CONTENT
+from .request_cache import parse_request_body, request_body_openapi
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,15 +31,16 @@ def get_data_service():
     "/histogram-data",
     response_model=HistogramResponse,
     responses={
-        200: {"description": "Histogram data generated successfully"},
+        200: {"description": "Histogram data generated successfully", "content": ARROW_RESPONSE_CONTENT},
         400: {"model": ErrorResponse, "description": "Invalid request parameters"},
         500: {"model": ErrorResponse, "description": "Server error"}
     },
     summary="Get Histogram Data",
-    description="Returns histogram data for a specific metric to render distribution visualization with threshold controls."
+    description="Returns histogram data for a specific metric to render distribution visualization with threshold controls.",
+    openapi_extra=request_body_openapi(HistogramRequest)
 )
 async def get_histogram_data(
-    request: HistogramRequest,
+    http_request: Request,
     data_service: DataService = Depends(get_data_service)
 ):
     """
@@ -48,8 +52,14 @@ async def get_histogram_data(
     The histogram is used to render distribution visualizations that help
     users set appropriate threshold values for the Sankey diagrams.
 
+    Clients sending `Accept: application/vnd.apache.arrow.stream` receive an
+    Arrow IPC table (group, bin_center, bin_start, bin_end, count) with the
+    metric, statistics and totals in the X-Arrow-Metadata header.
+
     Args:
-        request: Histogram request containing filters, metric, and bin count
+        http_request: Raw request; its body is the HistogramRequest (filters,
+                      metric, bin count, optional threshold tree) and its
+                      Accept header selects the response format
         data_service: Data service dependency
 
     Returns:
@@ -59,15 +69,30 @@ async def get_histogram_data(
         HTTPException: For various error conditions including invalid filters,
                       insufficient data, or server errors
     """
+    request = await parse_request_body(HistogramRequest, http_request)
+
     try:
-        return await data_service.get_histogram_data(
+        if accepts_arrow(http_request):
+            table, metadata = await data_service.get_histogram_table(
+                filters=request.filters,
+                metric=request.metric,
+                bins=request.bins,
+                threshold_tree=request.thresholdTree,
+                node_id=request.nodeId,
+                group_by=request.groupBy
+            )
+            return ArrowResponse(table, metadata)
+
+        payload = await data_service.get_histogram_data(
             filters=request.filters,
             metric=request.metric,
             bins=request.bins,
             threshold_tree=request.thresholdTree,
             node_id=request.nodeId,
-            group_by=request.groupBy
+            group_by=request.groupBy,
+            validate=False
         )
+        return FastJSONResponse(payload)
 
     except ValueError as e:
         error_msg = str(e)
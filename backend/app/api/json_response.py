@@ -0,0 +1,40 @@
+"""
+Fast JSON responses for large payloads.
+
+Endpoints that return big, service-built payloads (histograms, Sankey data) return
+plain dicts that already follow their response schema. Returning a
+FastJSONResponse skips FastAPI's response_model validation and jsonable_encoder
+pass; the dict is serialized once, with orjson when it is installed and the
+standard library encoder otherwise.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize a pre-validated payload to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for payloads that are already shaped like their response model."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
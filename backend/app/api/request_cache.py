@@ -0,0 +1,93 @@
+"""
+Parse cache for request bodies carrying a threshold tree.
+
+Sankey and histogram requests embed the full ThresholdStructure (tens of KB),
+and the frontend re-sends the same tree for every histogram panel and every
+Sankey refresh. Validating it runs the per-node and whole-structure validators
+and building its lookup tables and compiled tree walks every node again.
+Endpoints using parse_request_body read the raw body instead of declaring a
+body parameter, and identical bodies are served the
+already-validated model with its lookup caches and compiled tree built.
+Cached models are shared between requests and must be treated as read-only.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from ..middleware import REQUEST_HASH_STATE_KEY
+from ..models.threshold import ThresholdStructure
+from ..services.compiled_tree import compile_threshold_structure
+
+MAX_PARSED_REQUESTS = 256
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_parsed_requests: "OrderedDict[Tuple[str, str], BaseModel]" = OrderedDict()
+
+
+async def parse_request_body(model_cls: Type[ModelT], http_request: Request) -> ModelT:
+    """
+    Validate the JSON body as model_cls, reusing the result for identical bodies.
+
+    Bodies are keyed by the canonical request hash the ETag middleware already
+    computed, or by a hash of the raw bytes for requests it did not tag.
+    Validation errors are raised as RequestValidationError so clients get the
+    same 422 response as for a declared body parameter.
+    """
+    body = await http_request.body()
+    request_hash = getattr(http_request.state, REQUEST_HASH_STATE_KEY, None)
+    key = (model_cls.__name__, request_hash or hashlib.sha256(body).hexdigest())
+
+    cached = _parsed_requests.get(key)
+    if cached is not None:
+        _parsed_requests.move_to_end(key)
+        return cached
+
+    try:
+        parsed = model_cls.model_validate_json(body)
+    except ValidationError as e:
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+
+    # model_validate_json does not run ThresholdStructure.__init__, so build the
+    # lookup tables and the compiled tree here once instead of on every request
+    for value in parsed.__dict__.values():
+        if isinstance(value, ThresholdStructure):
+            value._build_lookup_caches()
+            compile_threshold_structure(value)
+
+    _parsed_requests[key] = parsed
+    while len(_parsed_requests) > MAX_PARSED_REQUESTS:
+        _parsed_requests.popitem(last=False)
+    return parsed
+
+
+def request_body_openapi(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """openapi_extra documenting model_cls as the JSON body of a route that reads it manually."""
+    schema = model_cls.model_json_schema()
+    definitions = schema.pop("$defs", {})
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_definitions(schema, definitions)}}
+        }
+    }
+
+
+def _inline_definitions(schema: Any, definitions: Dict[str, Any]) -> Any:
+    """Replace local $defs references so the schema is self-contained."""
+    if isinstance(schema, list):
+        return [_inline_definitions(item, definitions) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/$defs/"):
+        inlined = _inline_definitions(definitions[ref[len("#/$defs/"):]], definitions)
+        extra = {k: _inline_definitions(v, definitions) for k, v in schema.items() if k != "$ref"}
+        return {**inlined, **extra}
+    return {k: _inline_definitions(v, definitions) for k, v in schema.items()}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 import logging
 from ..services.visualization_service import DataService
 from ..models.requests import SankeyRequest
-from ..models.responses import SankeyResponse
+from ..models.responses import SankeyResponse, FeatureIdPageResponse
 from ..models.common import ErrorResponse
+from .json_response import FastJSONResponse
+from .arrow_response import ArrowResponse, accepts_arrow, ARROW_RESPONSE_CONTENT
+from .request_cache import parse_request_body, request_body_openapi
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,15 +31,16 @@ def get_data_service():
     "/sankey-data",
     response_model=SankeyResponse,
     responses={
-        200: {"description": "Sankey data generated successfully"},
+        200: {"description": "Sankey data generated successfully", "content": ARROW_RESPONSE_CONTENT},
         400: {"model": ErrorResponse, "description": "Invalid request parameters"},
         500: {"model": ErrorResponse, "description": "Server error"}
     },
     summary="Get Sankey Diagram Data (v2 only)",
-    description="Returns structured nodes and links data for rendering a Sankey diagram using the v2 threshold system only."
+    description="Returns structured nodes and links data for rendering a Sankey diagram using the v2 threshold system only.",
+    openapi_extra=request_body_openapi(SankeyRequest)
 )
 async def get_sankey_data(
-    request: SankeyRequest,
+    http_request: Request,
     data_service: DataService = Depends(get_data_service)
 ):
     """
@@ -61,8 +65,19 @@ async def get_sankey_data(
 
     The actual stage flow is determined entirely by the threshold_structure parameter.
 
+    Clients sending `Accept: application/vnd.apache.arrow.stream` receive one
+    Arrow IPC table holding both nodes and links (distinguished by the `kind`
+    column, leaf feature IDs as a list column) with the metadata in the
+    X-Arrow-Metadata header; featureIdEncoding does not apply to this format.
+
+    The body is read from the raw request and validated once per distinct body:
+    repeated requests with the same bytes reuse the parsed threshold structure
+    and its lookup tables.
+
     Args:
-        request: Sankey request containing filters and v2 threshold structure
+        http_request: Raw request; its body is the SankeyRequest (filters and
+                      v2 threshold structure) and its Accept header selects
+                      the response format
         data_service: Data service dependency
 
     Returns:
@@ -72,17 +87,29 @@ async def get_sankey_data(
         HTTPException: For various error conditions including invalid filters,
                       invalid thresholds, insufficient data, or server errors
     """
+    request = await parse_request_body(SankeyRequest, http_request)
+
     logger.info("📡 === SANKEY API REQUEST (v2 only) ===")
     logger.info(f"🔍 Filters: {request.filters}")
     logger.info(f"🌳 Threshold tree v2: {request.thresholdTree}")
 
     try:
         # Use only v2 threshold system
-        return await data_service.get_sankey_data(
+        if accepts_arrow(http_request):
+            table, metadata = await data_service.get_sankey_table(
+                filters=request.filters,
+                threshold_data=request.thresholdTree
+            )
+            return ArrowResponse(table, metadata)
+
+        payload = await data_service.get_sankey_data(
             filters=request.filters,
             threshold_data=request.thresholdTree,
-            use_v2=True
+            use_v2=True,
+            feature_id_encoding=request.featureIdEncoding,
+            validate=False
         )
+        return FastJSONResponse(payload)
 
     except ValueError as e:
         error_msg = str(e)
@@ -124,4 +151,65 @@ async def get_sankey_data(
                     "details": {"error": str(e)}
                 }
             }
-        )
\ No newline at end of file
+        )
+
+@router.get(
+    "/sankey-data/feature-ids/{cursor}",
+    response_model=FeatureIdPageResponse,
+    responses={
+        200: {"description": "Feature IDs retrieved successfully"},
+        404: {"model": ErrorResponse, "description": "Cursor not found or expired"}
+    },
+    summary="Get Sankey Leaf Feature IDs",
+    description="Returns one page of the feature IDs of a Sankey leaf node requested with featureIdEncoding=cursor."
+)
+async def get_sankey_feature_ids(
+    cursor: str,
+    data_service: DataService = Depends(get_data_service),
+    offset: int = Query(
+        0,
+        ge=0,
+        description="Offset of the first feature ID in the page"
+    ),
+    limit: int = Query(
+        10000,
+        ge=1,
+        le=100000,
+        description="Maximum number of feature IDs in the page"
+    )
+):
+    """
+    Page through the feature IDs behind a Sankey leaf node cursor.
+
+    Cursors are returned in `feature_ids_encoded.cursor` when the Sankey request
+    sets `featureIdEncoding` to `cursor`. Only the most recently used cursors are
+    kept, in the memory of the worker process that answered the Sankey request,
+    so cursors only work with a single worker (or sticky sessions); an unknown
+    or expired cursor returns 404 and the Sankey request must be repeated.
+
+    Args:
+        cursor: Cursor handle from the Sankey response
+        offset: Offset of the first feature ID in the page
+        limit: Maximum number of feature IDs in the page
+        data_service: Data service dependency
+
+    Returns:
+        FeatureIdPageResponse: Feature IDs in ascending order and pagination info
+
+    Raises:
+        HTTPException: If the cursor is unknown or expired
+    """
+    try:
+        return data_service.get_feature_id_page(cursor, offset, limit)
+
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": {
+                    "code": "CURSOR_NOT_FOUND",
+                    "message": "Feature ID cursor not found or expired",
+                    "details": {"cursor": cursor}
+                }
+            }
+        )
@@ -0,0 +1,195 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Any, Dict, Optional
+import logging
+from ..services.visualization_service import DataService
+from ..models.requests import SemanticSearchRequest
+from ..models.responses import SemanticSearchResponse
+from ..models.common import ErrorResponse
+from .json_response import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def get_data_service():
+    """Dependency to get data service instance"""
+    from ..main import data_service
+    if not data_service or not data_service.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": {
+                    "code": "SERVICE_UNAVAILABLE",
+                    "message": "Data service is not available",
+                    "details": {}
+                }
+            }
+        )
+    return data_service
+
+async def _run_search(data_service: DataService, **query: Any) -> FastJSONResponse:
+    """Run a semantic search off the event loop and map service errors to the API error format."""
+    if not data_service.has_semantic_index():
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": {
+                    "code": "SEMANTIC_INDEX_NOT_AVAILABLE",
+                    "message": "No semantic index is loaded",
+                    "details": {}
+                }
+            }
+        )
+
+    try:
+        return FastJSONResponse(
+            await asyncio.to_thread(data_service.search_similar_explanations, **query)
+        )
+
+    except ValueError as e:
+        error_msg = str(e)
+        details: Dict[str, Any] = {"data_source": query.get("data_source")}
+        if "not found" in error_msg.lower():
+            details["feature_id"] = query.get("feature_id")
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "error": {
+                        "code": "FEATURE_NOT_FOUND",
+                        "message": error_msg,
+                        "details": details
+                    }
+                }
+            )
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_REQUEST",
+                    "message": error_msg,
+                    "details": details
+                }
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error running semantic search: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": {
+                    "code": "INTERNAL_ERROR",
+                    "message": "Failed to run semantic search",
+                    "details": {"error": str(e)}
+                }
+            }
+        )
+
+@router.get(
+    "/semantic-search/feature/{feature_id}",
+    response_model=SemanticSearchResponse,
+    responses={
+        200: {"description": "Similar features retrieved successfully"},
+        400: {"model": ErrorResponse, "description": "Invalid query parameters"},
+        404: {"model": ErrorResponse, "description": "Feature or semantic index not found"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    summary="Find Features with Similar Explanations",
+    description="Returns the features whose explanation embeddings are closest to the given feature's explanation."
+)
+async def search_by_feature(
+    feature_id: int,
+    data_service: DataService = Depends(get_data_service),
+    data_source: Optional[str] = Query(
+        None,
+        description="Data source index to search (required when several indexes are loaded)"
+    ),
+    k: int = Query(
+        10,
+        ge=1,
+        le=1000,
+        description="Number of results to return"
+    ),
+    nprobe: Optional[int] = Query(
+        None,
+        ge=1,
+        description="Inverted lists to scan (index default if not provided)"
+    )
+):
+    """
+    Find features whose explanations are semantically close to a feature's explanation.
+
+    The feature's own explanation embedding is the query, and the feature itself
+    is excluded from the results. Search runs on the IVF index built by
+    build_semantic_index.py: the nprobe closest inverted lists are scanned from
+    the memory-mapped vectors, so results are approximate.
+
+    Args:
+        feature_id: Feature whose explanation is the query
+        data_source: Optional data source (explainer) index
+        k: Number of results
+        nprobe: Optional number of inverted lists to scan
+        data_service: Data service dependency
+
+    Returns:
+        SemanticSearchResponse: Similar features, most similar first
+
+    Raises:
+        HTTPException: For unknown features, a missing index, invalid
+        parameters, or server errors
+    """
+    if feature_id < 0:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_FEATURE_ID",
+                    "message": "Feature ID must be non-negative",
+                    "details": {"feature_id": feature_id}
+                }
+            }
+        )
+
+    return await _run_search(data_service, k=k, data_source=data_source, nprobe=nprobe, feature_id=feature_id)
+
+@router.post(
+    "/semantic-search",
+    response_model=SemanticSearchResponse,
+    responses={
+        200: {"description": "Similar features retrieved successfully"},
+        400: {"model": ErrorResponse, "description": "Invalid query vector or parameters"},
+        404: {"model": ErrorResponse, "description": "Semantic index not found"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    summary="Semantic Search by Vector",
+    description="Returns the features whose explanation embeddings are closest to a query embedding."
+)
+async def search_by_vector(
+    request: SemanticSearchRequest,
+    data_service: DataService = Depends(get_data_service)
+):
+    """
+    Find features whose explanations are semantically close to a query embedding.
+
+    The vector must come from the same embedding model as the indexed
+    explanations (see `embedding_model` in the index metadata) and have the same
+    dimension; it does not need to be normalized.
+
+    Args:
+        request: Query vector, data source, k and nprobe
+        data_service: Data service dependency
+
+    Returns:
+        SemanticSearchResponse: Similar features, most similar first
+
+    Raises:
+        HTTPException: For a missing index, dimension mismatch, invalid
+        parameters, or server errors
+    """
+    return await _run_search(
+        data_service,
+        k=request.k,
+        data_source=request.data_source,
+        nprobe=request.nprobe,
+        vector=request.vector
+    )
@@ -6,6 +6,7 @@ from contextlib import asynccontextmanager
 
 from .api import router as api_router
 from .services.visualization_service import DataService
+from .middleware import ETagMiddleware, add_compression_middleware
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,16 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+def get_data_version():
+    """Data version for ETags, or None while the data service is not ready."""
+    if data_service and data_service.is_ready():
+        return data_service.data_version
+    return None
+
+# Middleware added later wraps earlier ones: CORS (outermost) -> compression -> ETag
+app.add_middleware(ETagMiddleware, version_provider=get_data_version)
+add_compression_middleware(app)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -50,6 +61,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Arrow-Metadata", "ETag"],
 )
 
 @app.exception_handler(HTTPException)
@@ -0,0 +1,207 @@
+"""
+HTTP middleware: response compression and request-hash ETags.
+
+Compression uses Brotli (with gzip fallback) when the optional brotli-asgi package
+is installed and Starlette's GZipMiddleware otherwise. Both are configured from
+environment variables:
+
+- COMPRESSION_MIN_SIZE: smallest response body in bytes that is compressed (default 1024)
+- GZIP_LEVEL: gzip compression level 1-9 (default 6)
+- BROTLI_QUALITY: Brotli quality 0-11 (default 4)
+
+ETags are derived from the canonical request (method, path, sorted query string,
+Accept header, JSON body with sorted keys) and the data version of the served
+data (see DataService.data_version), so they are known before the endpoint runs: a request whose
+If-None-Match lists the exact tag gets 304 without recomputing or transferring
+the response. Responses that hand out Sankey leaf cursors, and the cursor pages
+themselves, are not tagged: cursors live in a bounded LRU on the data service,
+so a revalidated body could point at a cursor that has already been evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # pragma: no cover - optional dependency
+    BrotliMiddleware = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+# Paged Sankey leaf feature IDs (cursor handles are not stable per data version)
+CURSOR_PATH_PREFIX = "/api/sankey-data/feature-ids/"
+CURSOR_ENCODING = "cursor"
+
+# request.state attribute holding the canonical request hash of tagged requests
+REQUEST_HASH_STATE_KEY = "request_hash"
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Ignoring non-integer {name}={value!r}, using {default}")
+        return default
+
+
+def add_compression_middleware(app: FastAPI):
+    """Install Brotli (if available) or gzip compression with env-configured thresholds."""
+    minimum_size = _env_int("COMPRESSION_MIN_SIZE", DEFAULT_COMPRESSION_MIN_SIZE)
+
+    if BrotliMiddleware is not None:
+        quality = _env_int("BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)
+        app.add_middleware(
+            BrotliMiddleware, quality=quality, minimum_size=minimum_size, gzip_fallback=True
+        )
+        logger.info(f"Brotli compression enabled (quality={quality}, minimum_size={minimum_size})")
+    else:
+        level = _env_int("GZIP_LEVEL", DEFAULT_GZIP_LEVEL)
+        app.add_middleware(GZipMiddleware, minimum_size=minimum_size, compresslevel=level)
+        logger.info(f"Gzip compression enabled (level={level}, minimum_size={minimum_size})")
+
+
+def canonical_request_hash(scope: Scope, body: bytes, parsed: Any = None) -> str:
+    """
+    Hash of the request independent of JSON key order and query parameter order.
+
+    parsed is the already decoded JSON body, if the caller has it; a body that is
+    not JSON is hashed as is.
+    """
+    headers = Headers(scope=scope)
+    query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"))))
+
+    if parsed is None:
+        parsed = _parse_json(body)
+    canonical_body = json.dumps(
+        parsed, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8") if parsed is not None else body
+
+    digest = hashlib.sha256()
+    for part in (scope["method"], scope["path"], query, headers.get("accept", "")):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(canonical_body)
+    return digest.hexdigest()
+
+
+def requests_cursor(value) -> bool:
+    """Whether a parsed JSON body asks for cursor-encoded leaf feature IDs anywhere."""
+    if isinstance(value, dict):
+        return any(
+            (key == "featureIdEncoding" and item == CURSOR_ENCODING) or requests_cursor(item)
+            for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return any(requests_cursor(item) for item in value)
+    return False
+
+
+def _parse_json(body: bytes):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+class ETagMiddleware:
+    """
+    Weak ETags from the canonical request hash and the data version.
+
+    Only GET/POST requests under path_prefix are handled, and only while
+    version_provider returns a version (i.e. the data service is loaded).
+    Cursor pages and requests with featureIdEncoding=cursor pass through untagged.
+    The canonical request hash of tagged requests is left in request.state for
+    the endpoint.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        version_provider: Callable[[], Optional[str]],
+        path_prefix: str = "/api/"
+    ):
+        self.app = app
+        self.version_provider = version_provider
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "POST")
+            or not scope["path"].startswith(self.path_prefix)
+            or scope["path"].startswith(CURSOR_PATH_PREFIX)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        version = self.version_provider()
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        parsed = _parse_json(body)
+        if requests_cursor(parsed):
+            await self.app(scope, replay_receive, send)
+            return
+
+        # Shared with the endpoint (request.state.request_hash) so the body is
+        # decoded and hashed once per request
+        request_hash = canonical_request_hash(scope, body, parsed)
+        scope.setdefault("state", {})[REQUEST_HASH_STATE_KEY] = request_hash
+        etag = 'W/"' + hashlib.sha256(f"{request_hash}:{version}".encode()).hexdigest()[:32] + '"'
+
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode("latin-1")), (b"vary", b"Accept")]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                headers["ETag"] = etag
+            await send(message)
+
+        await self.app(scope, replay_receive, send_with_etag)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
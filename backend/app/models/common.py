@@ -13,6 +13,13 @@ class MetricType(str, Enum):
     SCORE_EMBEDDING = "score_embedding"
     SCORE_COMBINED = "score_combined"
 
+class FeatureIdEncoding(str, Enum):
+    """Encodings for leaf node feature ID lists in Sankey responses"""
+    LIST = "list"
+    RUNS = "runs"
+    BITMAP = "bitmap"
+    CURSOR = "cursor"
+
 class CategoryType(str, Enum):
     """Node category types for Sankey diagrams"""
     ROOT = "root"
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Union, Dict, Any
-from .common import Filters, MetricType
+from typing import Optional, Union, Dict, Any, List
+from .common import Filters, MetricType, FeatureIdEncoding
 from .threshold import ThresholdStructure
 
 class  HistogramRequest(BaseModel):
@@ -42,6 +42,10 @@ class SankeyRequest(BaseModel):
         ...,
         description="Threshold tree structure for hierarchical classification (v2 format only)"
     )
+    featureIdEncoding: FeatureIdEncoding = Field(
+        default=FeatureIdEncoding.LIST,
+        description="How leaf node feature IDs are returned: plain list, run-length ranges or base64 bitmap (each node gets the smallest of these and the list), or a cursor for the paged feature-ids endpoint (single worker process only)"
+    )
 
 class ComparisonRequest(BaseModel):
     """Request model for comparison/alluvial diagram data endpoint"""
@@ -52,4 +56,55 @@ class ComparisonRequest(BaseModel):
     sankey_right: SankeyRequest = Field(
         ...,
         description="Configuration for right Sankey diagram"
-    )
\ No newline at end of file
+    )
+
+class FeatureBatchRequest(BaseModel):
+    """Request model for bulk feature data endpoint"""
+    feature_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=100000,
+        description="Feature IDs to fetch (e.g. a Sankey node's feature_ids)"
+    )
+    filters: Filters = Field(
+        default_factory=Filters,
+        description="Filter context restricting which records of each feature are returned"
+    )
+    columns: Optional[List[str]] = Field(
+        default=None,
+        description="Columns to return (all master columns if not provided)"
+    )
+    offset: int = Field(
+        default=0,
+        ge=0,
+        description="Row offset of the requested page"
+    )
+    limit: int = Field(
+        default=1000,
+        ge=1,
+        le=10000,
+        description="Maximum number of rows in the page"
+    )
+
+class SemanticSearchRequest(BaseModel):
+    """Request model for semantic search by embedding vector"""
+    vector: List[float] = Field(
+        ...,
+        min_length=1,
+        description="Query embedding (same model and dimension as the indexed explanations)"
+    )
+    data_source: Optional[str] = Field(
+        default=None,
+        description="Data source index to search (required when several indexes are loaded)"
+    )
+    k: int = Field(
+        default=10,
+        ge=1,
+        le=1000,
+        description="Number of results to return"
+    )
+    nprobe: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Inverted lists to scan (index default if not provided); higher is slower but more exact"
+    )
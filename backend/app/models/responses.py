@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from .common import CategoryType
+from typing import List, Dict, Optional, Any
+from .common import CategoryType, FeatureIdEncoding
 
 class FilterOptionsResponse(BaseModel):
     """Response model for filter options endpoint"""
@@ -86,6 +86,34 @@ class HistogramResponse(BaseModel):
         description="Grouped histogram data when groupBy is specified"
     )
 
+class EncodedFeatureIds(BaseModel):
+    """Compact encoding of a leaf node's feature IDs"""
+    encoding: FeatureIdEncoding = Field(
+        ...,
+        description="Encoding used (runs, bitmap or cursor); runs and bitmap requests get whichever is smaller"
+    )
+    count: int = Field(
+        ...,
+        ge=0,
+        description="Number of feature IDs encoded"
+    )
+    runs: Optional[List[int]] = Field(
+        default=None,
+        description="Delta-encoded run-length ranges [gap_0, len_0, gap_1, len_1, ...]; gap_0 is the first ID, later gaps are measured from the end of the previous run"
+    )
+    base: Optional[int] = Field(
+        default=None,
+        description="Feature ID of bit 0 of the bitmap"
+    )
+    bitmap: Optional[str] = Field(
+        default=None,
+        description="Base64 little-endian bit-packed membership bitmap (bit i is feature base + i)"
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Handle for GET /api/sankey-data/feature-ids/{cursor}"
+    )
+
 class SankeyNode(BaseModel):
     """Individual node in Sankey diagram"""
     id: str = Field(
@@ -115,6 +143,10 @@ class SankeyNode(BaseModel):
         default=None,
         description="List of feature IDs in this node (included only for leaf nodes to enable alluvial diagrams)"
     )
+    feature_ids_encoded: Optional[EncodedFeatureIds] = Field(
+        default=None,
+        description="Leaf node feature IDs in a compact encoding (instead of feature_ids when requested)"
+    )
 
 class SankeyLink(BaseModel):
     """Individual link in Sankey diagram"""
@@ -232,6 +264,50 @@ class FeatureScores(BaseModel):
     detection: float = Field(..., description="Detection score")
     embedding: float = Field(..., description="Embedding score")
 
+class FeatureExplanation(BaseModel):
+    """Explanation text from one explainer for a feature"""
+    explanation_id: str = Field(..., description="Explanation identifier")
+    text: str = Field(..., description="Explanation text")
+    explanation_method: str = Field(..., description="Explanation method used")
+    llm_explainer: str = Field(..., description="LLM explainer model")
+    data_source: str = Field(..., description="Data source the explanation came from")
+
+class FeatureDistancePair(BaseModel):
+    """Semantic distance between two explanations of a feature"""
+    pair: List[str] = Field(..., description="The two explanation IDs compared")
+    cosine_distance: Optional[float] = Field(None, description="Cosine distance between embeddings")
+    euclidean_distance: Optional[float] = Field(None, description="Euclidean distance between embeddings")
+
+class FeatureScorerScores(BaseModel):
+    """Scores for a feature from one scorer / data source"""
+    data_source: str = Field(..., description="Data source the scores came from")
+    llm_scorer: str = Field(..., description="LLM scorer model")
+    score_fuzz: Optional[float] = Field(None, description="Fuzzing score")
+    score_detection: Optional[float] = Field(None, description="Detection score")
+    score_simulation: Optional[float] = Field(None, description="Simulation score")
+    score_embedding: Optional[float] = Field(None, description="Embedding score")
+
+class FeatureDetails(BaseModel):
+    """Detailed per-feature data consolidated by generate_detailed_json.py"""
+    feature_id: int = Field(..., description="The feature ID")
+    sae_id: str = Field(..., description="SAE model identifier")
+    explanations: List[FeatureExplanation] = Field(
+        default_factory=list,
+        description="Explanations from all explainers"
+    )
+    semantic_distance_pairs: List[FeatureDistancePair] = Field(
+        default_factory=list,
+        description="Semantic distances between explanation pairs"
+    )
+    scores: List[FeatureScorerScores] = Field(
+        default_factory=list,
+        description="Scores from all scorers"
+    )
+    activating_examples: Optional[Any] = Field(
+        None,
+        description="Activating examples (not generated yet)"
+    )
+
 class FeatureResponse(BaseModel):
     """Response model for individual feature endpoint"""
     feature_id: int = Field(
@@ -273,4 +349,103 @@ class FeatureResponse(BaseModel):
     details_path: str = Field(
         ...,
         description="Path to detailed JSON file"
-    )
\ No newline at end of file
+    )
+    details: Optional[FeatureDetails] = Field(
+        None,
+        description="Inlined detailed JSON content (only when include_details=true)"
+    )
+
+class FeatureNeighbor(BaseModel):
+    """One nearest decoder neighbor of a feature"""
+    feature_id: int = Field(..., description="Neighbor feature ID")
+    cosine_similarity: float = Field(..., description="Cosine similarity of the decoder directions")
+
+class FeatureNeighborsResponse(BaseModel):
+    """Response model for the feature neighbors endpoint"""
+    feature_id: int = Field(
+        ...,
+        description="The feature ID"
+    )
+    sae_id: str = Field(
+        ...,
+        description="SAE model identifier"
+    )
+    neighbors: List[FeatureNeighbor] = Field(
+        default_factory=list,
+        description="Nearest decoder neighbors, most similar first"
+    )
+
+class SemanticSearchResult(BaseModel):
+    """One feature returned by semantic search"""
+    feature_id: int = Field(..., description="Feature ID")
+    similarity: float = Field(..., description="Cosine similarity of the explanation embeddings")
+
+class SemanticSearchResponse(BaseModel):
+    """Response model for semantic search endpoints"""
+    data_source: str = Field(
+        ...,
+        description="Data source index that was searched"
+    )
+    query_feature_id: Optional[int] = Field(
+        None,
+        description="Feature whose explanation was the query (null for vector queries)"
+    )
+    nprobe: int = Field(
+        ...,
+        description="Number of inverted lists scanned"
+    )
+    results: List[SemanticSearchResult] = Field(
+        default_factory=list,
+        description="Most similar features first"
+    )
+
+class FeatureBatchResponse(BaseModel):
+    """Response model for bulk feature data endpoint (columnar)"""
+    columns: Dict[str, List[Any]] = Field(
+        ...,
+        description="Column name to values for the rows in this page, in primary key order"
+    )
+    total_rows: int = Field(
+        ...,
+        description="Total number of matching rows across all pages"
+    )
+    offset: int = Field(
+        ...,
+        description="Row offset of this page"
+    )
+    limit: int = Field(
+        ...,
+        description="Maximum number of rows per page"
+    )
+    next_offset: Optional[int] = Field(
+        None,
+        description="Offset of the next page, or null on the last page"
+    )
+    missing_feature_ids: List[int] = Field(
+        default_factory=list,
+        description="Requested feature IDs with no rows in the filter context"
+    )
+
+
+class FeatureIdPageResponse(BaseModel):
+    """Response model for paged Sankey leaf feature IDs"""
+    feature_ids: List[int] = Field(
+        ...,
+        description="Feature IDs in this page, in ascending order"
+    )
+    total: int = Field(
+        ...,
+        description="Total number of feature IDs behind the cursor"
+    )
+    offset: int = Field(
+        ...,
+        description="Offset of this page"
+    )
+    limit: int = Field(
+        ...,
+        description="Maximum number of IDs per page"
+    )
+    next_offset: Optional[int] = Field(
+        None,
+        description="Offset of the next page, or null on the last page"
+    )
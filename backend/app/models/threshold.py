@@ -336,6 +336,8 @@ class ThresholdStructure(BaseModel):
     # Performance optimization: cache for O(1) node lookups
     _nodes_by_id: Optional[Dict[str, SankeyThreshold]] = None
     _nodes_by_stage: Optional[Dict[int, List[SankeyThreshold]]] = None
+    # Compiled node arrays, set by services.compiled_tree.compile_threshold_structure
+    _compiled_tree: Optional[Any] = None
 
     class Config:
         # Allow private attributes for caching
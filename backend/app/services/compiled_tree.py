@@ -0,0 +1,760 @@
+"""
+Compiled, immutable form of a v2 threshold structure.
+
+compile_threshold_structure() flattens the pydantic node list once into
+parallel per-node arrays (stage, rule opcode, parent and branch, children and
+rule outcome offsets into flat index arrays) plus small frozen parameter
+records per split rule. The result is stored on the ThresholdStructure, so a
+structure reused through the request parse cache is compiled only once.
+
+CompiledThresholdTree.traverse() classifies a whole DataFrame level by level:
+the rows sitting at each split node are evaluated with numpy and moved to
+their child in one step, instead of walking pydantic nodes row by row. The
+vectorized rules reproduce SplitEvaluator exactly (null handling, pattern
+child matching, expression errors and short-circuiting); the rare cases that
+cannot be reproduced column-wise (non-numeric metric columns, expressions
+without available_metrics or outside the comparison/boolean grammar) are
+evaluated per row with SplitEvaluator.
+
+Trees whose rules are all interval tests (range rules and pattern conditions
+other than ==/!=) are additionally flattened into a decision table: every
+metric's thresholds become bin edges, each combination of bins maps to one
+root-to-leaf path, and classification is one binning per metric plus one
+integer lookup, regardless of depth.
+"""
+
+import ast
+import logging
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from ..models.threshold import (
+    CategoryType,
+    ExpressionSplitRule,
+    PatternSplitRule,
+    RangeSplitRule,
+    ThresholdStructure,
+)
+from .data_constants import (
+    CONDITION_STATE_HIGH, CONDITION_STATE_LOW, CONDITION_STATE_IN_RANGE, CONDITION_STATE_OUT_RANGE,
+    EXPR_OP_AND, EXPR_OP_OR, EXPR_OP_NOT, EXPR_OP_PYTHON_AND, EXPR_OP_PYTHON_OR, EXPR_OP_PYTHON_NOT
+)
+from .rule_evaluators import SplitEvaluator
+
+logger = logging.getLogger(__name__)
+
+# Rule opcodes
+OP_LEAF = 0
+OP_RANGE = 1
+OP_PATTERN = 2
+OP_EXPRESSION = 3
+
+# Pattern condition states (0 = condition without criterion, matches nothing)
+STATE_NONE = 0
+STATE_CODES = {
+    CONDITION_STATE_HIGH: 1,
+    CONDITION_STATE_LOW: 2,
+    CONDITION_STATE_IN_RANGE: 3,
+    CONDITION_STATE_OUT_RANGE: 4,
+}
+
+# Largest decision table (product of per-metric bin counts) built before
+# falling back to level-wise traversal
+DECISION_TABLE_MAX_CELLS = 1 << 16
+
+# Characters SplitEvaluator._evaluate_expression accepts besides metric names
+EXPRESSION_BASE_CHARS = frozenset('0123456789.()><=! andornotTrueFalse_')
+
+_COMPARISONS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+}
+_CONDITION_OPERATORS = {
+    '>': lambda v, t: v > t,
+    '>=': lambda v, t: v >= t,
+    '<': lambda v, t: v < t,
+    '<=': lambda v, t: v <= t,
+    '==': lambda v, t: np.abs(v - t) < 1e-9,
+    '!=': lambda v, t: np.abs(v - t) >= 1e-9,
+}
+
+
+class _RowwiseFallback(Exception):
+    """Raised when a rule cannot be evaluated column-wise for the given data."""
+
+
+# ============================================================================
+# RULE PARAMETERS
+# ============================================================================
+
+@dataclass(frozen=True)
+class RangeParams:
+    metric: str
+    thresholds: np.ndarray
+
+
+@dataclass(frozen=True)
+class ConditionParams:
+    metric: str
+    kind: str  # "threshold", "range", "operator" or "none"
+    threshold: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    operator: Optional[str] = None
+    value: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class PatternParams:
+    conditions: Tuple[ConditionParams, ...]
+    # Per pattern: (metric, expected state code) for every non-wildcard entry
+    matches: Tuple[Tuple[Tuple[str, int], ...], ...]
+    descriptions: Tuple[Optional[str], ...]
+
+
+@dataclass(frozen=True)
+class ExpressionParams:
+    available_metrics: Optional[Tuple[str, ...]]
+    # Per branch: vectorized predicate, or None when the branch can never match
+    predicates: Tuple[Optional["_Predicate"], ...]
+    descriptions: Tuple[Optional[str], ...]
+    default_child_id: str
+    vectorized: bool
+
+
+RuleParams = Any  # RangeParams | PatternParams | ExpressionParams | None
+
+
+@dataclass(frozen=True)
+class DecisionTable:
+    """
+    Root-to-leaf path for every combination of per-metric value bins.
+
+    Bins of a metric with edges U are: values below U[0], one bin per
+    [U[i], U[i+1]), then one bin for NaN and one for nulls, which the split
+    rules treat differently from each other and from ordinary values.
+    """
+    metrics: Tuple[str, ...]
+    edges: Tuple[np.ndarray, ...]
+    strides: Tuple[int, ...]
+    paths: np.ndarray  # (cells, depth) node indices, -1 padded
+
+    def lookup(self, columns: "_Columns") -> np.ndarray:
+        keys = np.zeros(len(columns.df), dtype=np.int64)
+        for metric, edges, stride in zip(self.metrics, self.edges, self.strides):
+            column = columns.get(metric)
+            bins = np.searchsorted(edges, column.values, side="right")
+            bins[np.isnan(column.values)] = len(edges) + 1
+            bins[column.null] = len(edges) + 2
+            keys += bins * stride
+        return self.paths[keys]
+
+
+# ============================================================================
+# COLUMN ACCESS
+# ============================================================================
+
+@dataclass
+class _Column:
+    values: np.ndarray  # float64, NaN where null
+    null: np.ndarray    # bool
+
+
+class _Columns:
+    """Numeric metric columns of a DataFrame, converted on first use."""
+
+    def __init__(self, df: pl.DataFrame):
+        self.df = df
+        self._cache: Dict[str, Optional[_Column]] = {}
+
+    def get(self, metric: str) -> Optional[_Column]:
+        """Column for metric, None if the DataFrame has no such column."""
+        if metric not in self._cache:
+            if metric not in self.df.columns:
+                self._cache[metric] = None
+            else:
+                series = self.df.get_column(metric)
+                if series.dtype not in pl.NUMERIC_DTYPES and series.dtype != pl.Boolean:
+                    raise _RowwiseFallback(f"column '{metric}' is not numeric")
+                self._cache[metric] = _Column(
+                    values=series.cast(pl.Float64).to_numpy(),
+                    # Boolean series convert to object arrays without pyarrow
+                    null=series.is_null().cast(pl.UInt8).to_numpy().astype(bool)
+                )
+        return self._cache[metric]
+
+
+# ============================================================================
+# EXPRESSIONS
+# ============================================================================
+
+@dataclass
+class _Operand:
+    values: np.ndarray
+    null: np.ndarray
+    error: np.ndarray
+
+
+@dataclass
+class _Outcome:
+    truthy: np.ndarray
+    error: np.ndarray
+
+
+class _Predicate:
+    """
+    Column-wise form of a branch condition.
+
+    Tracks, per row, the truthiness of the expression and whether Python's
+    eval() would have raised (undefined name, None in an ordering comparison),
+    honouring and/or short-circuiting, so that rows evaluate exactly as in
+    SplitEvaluator._evaluate_expression.
+    """
+
+    def __init__(self, tree: ast.Expression, context_names: Sequence[str]):
+        self._context_names = frozenset(context_names)
+        self._evaluate = self._compile(tree.body)
+
+    def __call__(self, columns: _Columns, rows: np.ndarray) -> _Outcome:
+        return self._evaluate(columns, rows)
+
+    @classmethod
+    def supports(cls, tree: ast.Expression) -> bool:
+        """Whether every node of the parsed condition has a column-wise form."""
+        def operand_ok(node):
+            if isinstance(node, ast.Name):
+                return node.id != "__builtins__"
+            return isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float))
+
+        def ok(node):
+            if isinstance(node, ast.BoolOp):
+                return all(ok(value) for value in node.values)
+            if isinstance(node, ast.UnaryOp):
+                return isinstance(node.op, ast.Not) and ok(node.operand)
+            if isinstance(node, ast.Compare):
+                return (
+                    all(type(op) in _COMPARISONS or isinstance(op, (ast.Eq, ast.NotEq)) for op in node.ops)
+                    and operand_ok(node.left)
+                    and all(operand_ok(c) for c in node.comparators)
+                )
+            return operand_ok(node)
+
+        return ok(tree.body)
+
+    def _compile(self, node) -> Callable[[_Columns, np.ndarray], _Outcome]:
+        if isinstance(node, ast.BoolOp):
+            values = [self._compile(value) for value in node.values]
+            return self._compile_and(values) if isinstance(node.op, ast.And) else self._compile_or(values)
+        if isinstance(node, ast.UnaryOp):
+            inner = self._compile(node.operand)
+
+            def evaluate_not(columns, rows):
+                outcome = inner(columns, rows)
+                return _Outcome(truthy=~outcome.truthy, error=outcome.error)
+            return evaluate_not
+        if isinstance(node, ast.Compare):
+            return self._compile_compare(node)
+
+        operand = self._compile_operand(node)
+
+        def evaluate_truth(columns, rows):
+            value = operand(columns, rows)
+            # bool(None) is False; NaN is truthy like any non-zero float
+            return _Outcome(truthy=~value.null & (value.values != 0), error=value.error)
+        return evaluate_truth
+
+    @staticmethod
+    def _compile_and(values):
+        def evaluate_and(columns, rows):
+            pending = np.ones(len(rows), dtype=bool)
+            error = np.zeros(len(rows), dtype=bool)
+            for value in values:
+                outcome = value(columns, rows)
+                error |= pending & outcome.error
+                pending &= ~outcome.error & outcome.truthy
+            return _Outcome(truthy=pending, error=error)
+        return evaluate_and
+
+    @staticmethod
+    def _compile_or(values):
+        def evaluate_or(columns, rows):
+            pending = np.ones(len(rows), dtype=bool)
+            truthy = np.zeros(len(rows), dtype=bool)
+            error = np.zeros(len(rows), dtype=bool)
+            for value in values:
+                outcome = value(columns, rows)
+                error |= pending & outcome.error
+                evaluated = pending & ~outcome.error
+                truthy |= evaluated & outcome.truthy
+                pending = evaluated & ~outcome.truthy
+            return _Outcome(truthy=truthy, error=error)
+        return evaluate_or
+
+    def _compile_compare(self, node: ast.Compare):
+        operands = [self._compile_operand(n) for n in [node.left] + list(node.comparators)]
+        ops = list(node.ops)
+
+        def evaluate_compare(columns, rows):
+            left = operands[0](columns, rows)
+            error = left.error.copy()
+            pending = ~left.error
+            for op, right_operand in zip(ops, operands[1:]):
+                right = right_operand(columns, rows)
+                error |= pending & right.error
+                pending &= ~right.error
+                with np.errstate(invalid="ignore"):
+                    if isinstance(op, (ast.Eq, ast.NotEq)):
+                        # None == x never raises; it is only equal to None
+                        both_null = left.null & right.null
+                        equal = both_null | (~left.null & ~right.null & (left.values == right.values))
+                        result = equal if isinstance(op, ast.Eq) else ~equal
+                    else:
+                        # Ordering comparisons involving None raise TypeError
+                        compare_error = left.null | right.null
+                        error |= pending & compare_error
+                        pending &= ~compare_error
+                        result = _COMPARISONS[type(op)](left.values, right.values)
+                pending &= result
+                left = right
+            return _Outcome(truthy=pending, error=error)
+        return evaluate_compare
+
+    def _compile_operand(self, node) -> Callable[[_Columns, np.ndarray], _Operand]:
+        if isinstance(node, ast.Constant):
+            constant = float(node.value)
+
+            def evaluate_constant(columns, rows):
+                n = len(rows)
+                return _Operand(
+                    values=np.full(n, constant), null=np.zeros(n, dtype=bool), error=np.zeros(n, dtype=bool)
+                )
+            return evaluate_constant
+
+        name = node.id
+        if name not in self._context_names:
+            # NameError whenever the name is evaluated
+            def evaluate_undefined(columns, rows):
+                n = len(rows)
+                return _Operand(values=np.zeros(n), null=np.zeros(n, dtype=bool), error=np.ones(n, dtype=bool))
+            return evaluate_undefined
+
+        def evaluate_name(columns, rows):
+            n = len(rows)
+            column = columns.get(name)
+            if column is None:
+                # feature_row.get(metric, 0.0) for a metric the data does not have
+                return _Operand(values=np.zeros(n), null=np.zeros(n, dtype=bool), error=np.zeros(n, dtype=bool))
+            return _Operand(values=column.values[rows], null=column.null[rows], error=np.zeros(n, dtype=bool))
+        return evaluate_name
+
+
+def _to_python_expression(condition: str) -> str:
+    """Apply the operator rewriting done by SplitEvaluator._evaluate_expression."""
+    expression = condition.replace(EXPR_OP_AND, EXPR_OP_PYTHON_AND)
+    expression = expression.replace(EXPR_OP_OR, EXPR_OP_PYTHON_OR)
+    return expression.replace(EXPR_OP_NOT, EXPR_OP_PYTHON_NOT)
+
+
+def _compile_expression_rule(rule: ExpressionSplitRule) -> ExpressionParams:
+    descriptions = tuple(branch.description for branch in rule.branches)
+    if not rule.available_metrics:
+        # The evaluation context is every numeric value of the row, which varies per row
+        return ExpressionParams(
+            available_metrics=None, predicates=(), descriptions=descriptions,
+            default_child_id=rule.default_child_id, vectorized=False
+        )
+
+    metrics = tuple(rule.available_metrics)
+    allowed_chars = set(EXPRESSION_BASE_CHARS)
+    for metric in metrics:
+        allowed_chars.update(metric)
+
+    predicates = []
+    for branch in rule.branches:
+        expression = _to_python_expression(branch.condition)
+        if not all(c in allowed_chars or c.isspace() for c in expression):
+            logger.error(f"Expression contains disallowed characters: {expression}")
+            predicates.append(None)
+            continue
+        try:
+            # eval() ignores leading blanks, ast.parse() does not
+            tree = ast.parse(expression.lstrip(" \t"), mode="eval")
+        except SyntaxError as e:
+            logger.error(f"Expression evaluation failed: {expression}, error: {e}")
+            predicates.append(None)
+            continue
+        if not _Predicate.supports(tree):
+            return ExpressionParams(
+                available_metrics=metrics, predicates=(), descriptions=descriptions,
+                default_child_id=rule.default_child_id, vectorized=False
+            )
+        predicates.append(_Predicate(tree, metrics))
+
+    return ExpressionParams(
+        available_metrics=metrics, predicates=tuple(predicates), descriptions=descriptions,
+        default_child_id=rule.default_child_id, vectorized=True
+    )
+
+
+def _compile_pattern_rule(rule: PatternSplitRule) -> PatternParams:
+    conditions = []
+    for metric, condition in rule.conditions.items():
+        if condition.threshold is not None:
+            conditions.append(ConditionParams(metric, "threshold", threshold=condition.threshold))
+        elif condition.min is not None and condition.max is not None:
+            conditions.append(ConditionParams(metric, "range", min=condition.min, max=condition.max))
+        elif condition.operator and condition.value is not None:
+            conditions.append(ConditionParams(
+                metric, "operator", operator=condition.operator, value=condition.value
+            ))
+        else:
+            conditions.append(ConditionParams(metric, "none"))
+
+    matches = tuple(
+        tuple((metric, STATE_CODES[state]) for metric, state in pattern.match.items() if state is not None)
+        for pattern in rule.patterns
+    )
+    return PatternParams(
+        conditions=tuple(conditions),
+        matches=matches,
+        descriptions=tuple(pattern.description for pattern in rule.patterns)
+    )
+
+
+# ============================================================================
+# COMPILED TREE
+# ============================================================================
+
+class CompiledThresholdTree:
+    """
+    Flattened, read-only threshold structure.
+
+    Nodes are addressed by their position in ThresholdStructure.nodes. Child
+    and rule outcome targets are node indices (-1 when the referenced node
+    does not exist, which ends classification at the parent as in the
+    row-wise classifier).
+    """
+
+    def __init__(self, structure: ThresholdStructure):
+        nodes = structure.nodes
+        self.num_nodes = len(nodes)
+        self.node_ids: Tuple[str, ...] = tuple(node.id for node in nodes)
+        # Same resolution as ThresholdStructure._nodes_by_id: last node with an ID wins
+        self.index_by_id: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.categories: Tuple[CategoryType, ...] = tuple(node.category for node in nodes)
+        self.stages = np.array([node.stage for node in nodes], dtype=np.int32)
+        self.max_stage = int(self.stages.max())
+        root = structure.get_root()
+        self.root = next(i for i, node in enumerate(nodes) if node is root)
+
+        child_counts = [len(node.children_ids) for node in nodes]
+        self.child_offsets = np.concatenate(([0], np.cumsum(child_counts))).astype(np.int64)
+        self.child_indices = np.array(
+            [self.index_by_id.get(child_id, -1) for node in nodes for child_id in node.children_ids],
+            dtype=np.int64
+        )
+
+        # Last parent_path entry as declared in the request (used for display names)
+        self.has_parent_path = np.array([bool(node.parent_path) for node in nodes], dtype=bool)
+        self.parent_index = np.array(
+            [self.index_by_id.get(node.parent_path[-1].parent_id, -1) if node.parent_path else -1
+             for node in nodes],
+            dtype=np.int64
+        )
+        self.parent_branch = np.array(
+            [node.parent_path[-1].branch_index if node.parent_path else 0 for node in nodes],
+            dtype=np.int64
+        )
+
+        opcodes = []
+        params: List[RuleParams] = []
+        outcome_targets: List[List[int]] = []
+        evaluator = SplitEvaluator()
+        for node in nodes:
+            rule = node.split_rule
+            children_ids = node.children_ids
+            if isinstance(rule, RangeSplitRule):
+                opcodes.append(OP_RANGE)
+                params.append(RangeParams(rule.metric, np.asarray(rule.thresholds, dtype=np.float64)))
+                targets = [self.index_by_id.get(child_id, -1) for child_id in children_ids]
+            elif isinstance(rule, PatternSplitRule):
+                opcodes.append(OP_PATTERN)
+                params.append(_compile_pattern_rule(rule))
+                targets = []
+                for pattern in rule.patterns:
+                    child_id = evaluator._find_matching_child(pattern.child_id, children_ids)
+                    if not child_id:
+                        child_id = children_ids[0] if children_ids else pattern.child_id
+                    targets.append(self.index_by_id.get(child_id, -1))
+                default_id = rule.default_child_id or (children_ids[-1] if children_ids else "unknown")
+                targets.append(self.index_by_id.get(default_id, -1))
+            elif isinstance(rule, ExpressionSplitRule):
+                opcodes.append(OP_EXPRESSION)
+                params.append(_compile_expression_rule(rule))
+                targets = [self.index_by_id.get(branch.child_id, -1) for branch in rule.branches]
+                targets.append(self.index_by_id.get(rule.default_child_id, -1))
+            else:
+                opcodes.append(OP_LEAF)
+                params.append(None)
+                targets = []
+            outcome_targets.append(targets)
+
+        self.opcodes = np.array(opcodes, dtype=np.int8)
+        self.rule_params: Tuple[RuleParams, ...] = tuple(params)
+        self.outcome_offsets = np.concatenate(
+            ([0], np.cumsum([len(t) for t in outcome_targets]))
+        ).astype(np.int64)
+        self.outcome_targets = np.array([t for ts in outcome_targets for t in ts], dtype=np.int64)
+
+        # Original rules and children, only for row-wise fallback evaluation
+        self._split_rules = tuple(node.split_rule for node in nodes)
+        self._children_ids = tuple(tuple(node.children_ids) for node in nodes)
+
+        for array in (self.stages, self.child_offsets, self.child_indices, self.has_parent_path,
+                      self.parent_index, self.parent_branch, self.opcodes, self.outcome_offsets,
+                      self.outcome_targets):
+            array.setflags(write=False)
+
+        # Bin edges per metric when every rule is an interval test, else None
+        self._interval_edges = self._collect_interval_edges()
+        # Decision tables by the set of rule metrics present in the data
+        self._decision_tables: Dict[Tuple[str, ...], Optional[DecisionTable]] = {}
+
+    def num_children(self, index: int) -> int:
+        return int(self.child_offsets[index + 1] - self.child_offsets[index])
+
+    def is_leaf(self, index: int) -> bool:
+        return self.num_children(index) == 0
+
+    def traverse(self, df: pl.DataFrame, max_stage: Optional[int] = None) -> np.ndarray:
+        """
+        Route every row of df from the root down the tree.
+
+        Rows stop at a node without split rule, when the selected child does
+        not exist, or (if max_stage is given) once they reach a node at or
+        beyond max_stage. Uses the decision table when the tree has one.
+
+        Returns:
+            (num_rows, depth) array of visited node indices per row, padded
+            with -1 after the node each row stopped at
+        """
+        columns = _Columns(df)
+        try:
+            table = self._get_decision_table(df)
+            if table is not None:
+                paths = table.lookup(columns)
+                if max_stage is not None:
+                    paths = self._truncate_paths(paths, max_stage)
+                # Drop padding columns no row reaches
+                depth = int((paths >= 0).sum(axis=1).max()) if len(paths) else 1
+                return paths[:, :depth]
+        except _RowwiseFallback:
+            pass
+        return self._traverse_levels(columns, max_stage)
+
+    def _traverse_levels(self, columns: "_Columns", max_stage: Optional[int]) -> np.ndarray:
+        """Level-wise traversal: evaluate each split node on the rows currently at it."""
+        num_rows = len(columns.df)
+        current = np.full(num_rows, self.root, dtype=np.int64)
+        steps = [current.copy()]
+        active = np.ones(num_rows, dtype=bool)
+
+        # A well-formed tree is at most num_nodes deep; the bound guards against cycles
+        for _ in range(self.num_nodes):
+            splittable = active & (self.opcodes[current] != OP_LEAF)
+            if max_stage is not None:
+                splittable &= self.stages[current] < max_stage
+            if not splittable.any():
+                break
+
+            step = np.full(num_rows, -1, dtype=np.int64)
+            for node in np.unique(current[splittable]):
+                rows = np.flatnonzero(splittable & (current == node))
+                step[rows] = self._route(int(node), columns, rows)
+
+            active = step >= 0
+            if not active.any():
+                break
+            current = np.where(active, step, current)
+            steps.append(step)
+
+        return np.column_stack(steps)
+
+    def _truncate_paths(self, paths: np.ndarray, max_stage: int) -> np.ndarray:
+        """Cut full paths after the first node at or beyond max_stage."""
+        visited = paths >= 0
+        reached = visited & (self.stages[np.where(visited, paths, self.root)] >= max_stage)
+        stop = np.where(reached.any(axis=1), reached.argmax(axis=1), paths.shape[1])
+        return np.where(np.arange(paths.shape[1])[None, :] <= stop[:, None], paths, -1)
+
+    def _collect_interval_edges(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Value boundaries at which any rule's outcome can change, per metric.
+
+        Every test is rewritten as value >= edge: value > t and value <= t use
+        the next float above t. Returns None if some rule is not an interval test.
+        """
+        edges: Dict[str, set] = {}
+        for opcode, params in zip(self.opcodes, self.rule_params):
+            if opcode == OP_RANGE:
+                edges.setdefault(params.metric, set()).update(params.thresholds.tolist())
+            elif opcode == OP_PATTERN:
+                for condition in params.conditions:
+                    metric_edges = edges.setdefault(condition.metric, set())
+                    if condition.kind == "threshold":
+                        metric_edges.add(condition.threshold)
+                    elif condition.kind == "range":
+                        metric_edges.update((condition.min, np.nextafter(condition.max, np.inf)))
+                    elif condition.kind == "operator":
+                        if condition.operator in (">=", "<"):
+                            metric_edges.add(condition.value)
+                        elif condition.operator in (">", "<="):
+                            metric_edges.add(np.nextafter(condition.value, np.inf))
+                        else:
+                            # ==/!= use a tolerance, not an interval boundary
+                            return None
+            elif opcode == OP_EXPRESSION:
+                return None
+        return {metric: np.array(sorted(values), dtype=np.float64) for metric, values in edges.items()}
+
+    def _get_decision_table(self, df: pl.DataFrame) -> Optional[DecisionTable]:
+        if self._interval_edges is None:
+            return None
+        # A missing metric column is not the same as a null value, so tables are per column set
+        present = tuple(sorted(metric for metric in self._interval_edges if metric in df.columns))
+        if present not in self._decision_tables:
+            self._decision_tables[present] = self._build_decision_table(present)
+        return self._decision_tables[present]
+
+    def _build_decision_table(self, metrics: Tuple[str, ...]) -> Optional[DecisionTable]:
+        """
+        Route one representative row per bin combination through the tree.
+
+        Representatives are -inf for the lowest bin and the lower edge for the
+        others, so each row takes exactly the branches of any value in its bins.
+        """
+        edges = tuple(self._interval_edges[metric] for metric in metrics)
+        radices = [len(metric_edges) + 3 for metric_edges in edges]
+        num_cells = int(np.prod(radices, dtype=np.int64))
+        if num_cells > DECISION_TABLE_MAX_CELLS:
+            logger.debug(f"Decision table would have {num_cells} cells, using level-wise traversal")
+            return None
+
+        grid = np.unravel_index(np.arange(num_cells), radices) if metrics else ()
+        representatives = [pl.Series("_cell", np.arange(num_cells))]
+        for metric, metric_edges, bins in zip(metrics, edges, grid):
+            values = np.concatenate(([-np.inf], metric_edges, [np.nan, np.nan]))[bins]
+            representatives.append(
+                pl.Series(metric, values).set(pl.Series(bins == len(metric_edges) + 2), None)
+            )
+
+        paths = self._traverse_levels(_Columns(pl.DataFrame(representatives)), None)
+        strides = tuple(int(np.prod(radices[i + 1:], dtype=np.int64)) for i in range(len(radices)))
+        return DecisionTable(metrics=metrics, edges=edges, strides=strides, paths=paths)
+
+    def _route(self, node: int, columns: _Columns, rows: np.ndarray) -> np.ndarray:
+        """Target node index for each row at a split node."""
+        try:
+            opcode = self.opcodes[node]
+            params = self.rule_params[node]
+            if opcode == OP_RANGE:
+                outcome = self._evaluate_range(node, params, columns, rows)
+            elif opcode == OP_PATTERN:
+                outcome = self._evaluate_pattern(params, columns, rows)
+            elif params.vectorized:
+                outcome = self._evaluate_expression(params, columns, rows)
+            else:
+                raise _RowwiseFallback("expression is not vectorizable")
+        except _RowwiseFallback as e:
+            logger.debug(f"Evaluating node '{self.node_ids[node]}' row by row: {e}")
+            return self._route_rowwise(node, columns.df, rows)
+        return self.outcome_targets[self.outcome_offsets[node] + outcome]
+
+    def _evaluate_range(self, node: int, params: RangeParams, columns: _Columns, rows: np.ndarray) -> np.ndarray:
+        column = columns.get(params.metric)
+        if column is None:
+            values = np.zeros(len(rows))
+        else:
+            values = np.where(column.null[rows], 0.0, column.values[rows])
+        # Thresholds are strictly ascending, so the count of passed thresholds is the range index
+        with np.errstate(invalid="ignore"):
+            selected = (values[:, None] >= params.thresholds[None, :]).sum(axis=1)
+        return np.minimum(selected, self.num_children(node) - 1)
+
+    @staticmethod
+    def _evaluate_pattern(params: PatternParams, columns: _Columns, rows: np.ndarray) -> np.ndarray:
+        num_rows = len(rows)
+        states: Dict[str, np.ndarray] = {}
+        for condition in params.conditions:
+            column = columns.get(condition.metric)
+            if column is None:
+                states[condition.metric] = np.full(num_rows, STATE_CODES[CONDITION_STATE_LOW], dtype=np.int8)
+                continue
+            values = column.values[rows]
+            with np.errstate(invalid="ignore"):
+                if condition.kind == "threshold":
+                    state = np.where(values >= condition.threshold, 1, 2)
+                elif condition.kind == "range":
+                    state = np.where((condition.min <= values) & (values <= condition.max), 3, 4)
+                elif condition.kind == "operator":
+                    state = np.where(_CONDITION_OPERATORS[condition.operator](values, condition.value), 1, 2)
+                else:
+                    state = np.full(num_rows, STATE_NONE)
+            # Missing values are always LOW
+            states[condition.metric] = np.where(
+                column.null[rows], STATE_CODES[CONDITION_STATE_LOW], state
+            ).astype(np.int8)
+
+        outcome = np.full(num_rows, len(params.matches), dtype=np.int64)
+        unmatched = np.ones(num_rows, dtype=bool)
+        for pattern_index, match in enumerate(params.matches):
+            matched = unmatched.copy()
+            for metric, expected in match:
+                state = states.get(metric)
+                if state is None:
+                    matched[:] = False
+                    break
+                matched &= state == expected
+            outcome[matched] = pattern_index
+            unmatched &= ~matched
+        return outcome
+
+    @staticmethod
+    def _evaluate_expression(params: ExpressionParams, columns: _Columns, rows: np.ndarray) -> np.ndarray:
+        outcome = np.full(len(rows), len(params.predicates), dtype=np.int64)
+        unmatched = np.ones(len(rows), dtype=bool)
+        for branch_index, predicate in enumerate(params.predicates):
+            if predicate is None or not unmatched.any():
+                continue
+            result = predicate(columns, rows)
+            failed = unmatched & result.error
+            if failed.any():
+                logger.error(f"Expression branch {branch_index} failed to evaluate for {int(failed.sum())} rows")
+            matched = unmatched & result.truthy & ~result.error
+            outcome[matched] = branch_index
+            unmatched &= ~matched
+        return outcome
+
+    def _route_rowwise(self, node: int, df: pl.DataFrame, rows: np.ndarray) -> np.ndarray:
+        evaluator = SplitEvaluator()
+        rule = self._split_rules[node]
+        children_ids = list(self._children_ids[node])
+        return np.array([
+            self.index_by_id.get(evaluator.evaluate(row, rule, children_ids).child_id, -1)
+            for row in df[rows].to_dicts()
+        ], dtype=np.int64)
+
+
+def compile_threshold_structure(structure: ThresholdStructure) -> CompiledThresholdTree:
+    """Compiled form of a structure, built on first use and kept on the structure."""
+    compiled = structure._compiled_tree
+    if compiled is None:
+        compiled = CompiledThresholdTree(structure)
+        structure._compiled_tree = compiled
+    return compiled
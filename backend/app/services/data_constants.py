@@ -50,6 +50,10 @@ COL_SCORE_DETECTION = "score_detection"
 COL_SCORE_EMBEDDING = "score_embedding"
 COL_DETAILS_PATH = "details_path"
 
+# Neighbor table column names
+COL_NEIGHBOR_ID = "neighbor_id"
+COL_COSINE_SIMILARITY = "cosine_similarity"
+
 # Computed column names
 COL_SPLITTING_CATEGORY = "splitting_category"
 COL_SEMDIST_CATEGORY = "semdist_category"
@@ -81,6 +85,9 @@ STAGE_NAMES = {
 # Filter columns
 FILTER_COLUMNS = [COL_SAE_ID, COL_EXPLANATION_METHOD, COL_LLM_EXPLAINER, COL_LLM_SCORER]
 
+# Primary key of the master table (one row per key)
+PRIMARY_KEY_COLUMNS = [COL_FEATURE_ID] + FILTER_COLUMNS
+
 # Custom ordering for Sankey nodes
 SPLITTING_ORDER = [SPLITTING_FALSE, SPLITTING_TRUE]  # false at the top
 SEMDIST_ORDER = [SEMDIST_HIGH, SEMDIST_LOW]  # high at the top
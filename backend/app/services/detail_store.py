@@ -0,0 +1,292 @@
+"""
+Memory-mapped store for detailed per-feature JSON.
+
+Reads the packed store written by generate_detailed_json.py --pack: one JSONL
+blob per SAE directory plus an offset index (feature_id, offset, length) sorted
+by feature_id. A lookup is a binary search over the index and a slice of the
+mapped blob, with no per-feature file reads. The store files are stat-ed on
+each lookup, and a store that appears, is replaced (e.g. via os.replace) or is
+removed after the backend started is reopened. SAE directories without a
+packed store fall back to the per-feature JSON files.
+
+Parsed documents are kept in an LRU cache bounded by the total size of their
+raw JSON, and neighbouring feature ids can be prefetched into it so sequential
+drill-down clicks are served from memory.
+"""
+
+import json
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PACK_DATA_FILENAME = "features.jsonl"
+PACK_INDEX_FILENAME = "features.idx.npy"
+FEATURE_FILENAME_PATTERN = "feature_{feature_id}.json"
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_PREFETCH_RADIUS = 4
+
+
+# (inode, mtime_ns, size) of the packed blob and of its index
+StoreIdentity = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+
+
+def _store_identity(directory: Path) -> Optional[StoreIdentity]:
+    """Identity of an SAE directory's packed store files, or None if either is missing."""
+    try:
+        data_stat = os.stat(directory / PACK_DATA_FILENAME)
+        index_stat = os.stat(directory / PACK_INDEX_FILENAME)
+    except OSError:
+        return None
+    return (
+        (data_stat.st_ino, data_stat.st_mtime_ns, data_stat.st_size),
+        (index_stat.st_ino, index_stat.st_mtime_ns, index_stat.st_size)
+    )
+
+
+def sanitize_sae_id_for_path(sae_id: str) -> str:
+    """Convert SAE ID to the directory name used under detailed_json/."""
+    return sae_id.replace("/", "--")
+
+
+class _PackedSAEStore:
+    """Memory-mapped JSONL blob and offset index for a single SAE."""
+
+    def __init__(self, directory: Path):
+        self._file = open(directory / PACK_DATA_FILENAME, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty blob: mmap cannot map zero bytes
+            self._mmap = None
+        index = np.load(directory / PACK_INDEX_FILENAME, mmap_mode="r")
+        self._feature_ids = index["feature_id"]
+        self._offsets = index["offset"]
+        self._lengths = index["length"]
+
+    def __len__(self) -> int:
+        return len(self._feature_ids)
+
+    def get_raw(self, feature_id: int) -> Optional[bytes]:
+        """Return the raw JSON bytes for a feature, or None if it is not packed."""
+        pos = int(np.searchsorted(self._feature_ids, feature_id))
+        if pos >= len(self._feature_ids) or self._feature_ids[pos] != feature_id:
+            return None
+        offset = int(self._offsets[pos])
+        return self._mmap[offset:offset + int(self._lengths[pos])]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+
+class _DetailCache:
+    """Thread-safe LRU of parsed documents bounded by their raw JSON size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Tuple[str, int], document: Dict[str, Any], size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (document, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class DetailStore:
+    """Lookup of detailed feature JSON by (sae_id, feature_id)."""
+
+    def __init__(
+        self,
+        detailed_json_dir: Path,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        prefetch_radius: int = DEFAULT_PREFETCH_RADIUS
+    ):
+        self.detailed_json_dir = Path(detailed_json_dir)
+        # details_path values in the master parquet are relative to the project root
+        self.project_root = self.detailed_json_dir.parent.parent
+        self.prefetch_radius = prefetch_radius
+        # sae directory name -> (identity of the store files, packed store or None
+        # when the SAE has no packed store)
+        self._stores: Dict[str, Tuple[Optional[StoreIdentity], Optional[_PackedSAEStore]]] = {}
+        self._lock = threading.Lock()
+        self._cache = _DetailCache(cache_max_bytes)
+
+    def _get_store(self, sae_dir: str) -> Optional[_PackedSAEStore]:
+        directory = self.detailed_json_dir / sae_dir
+        identity = _store_identity(directory)
+        entry = self._stores.get(sae_dir)
+        if entry is not None and entry[0] == identity:
+            return entry[1]
+
+        with self._lock:
+            entry = self._stores.get(sae_dir)
+            if entry is None or entry[0] != identity:
+                if entry is not None:
+                    # The store was written, replaced or removed since it was opened.
+                    # The old mapping is not closed here because a concurrent lookup
+                    # may still be slicing it; it is released with its last reference.
+                    logger.info(f"Packed detail store for {sae_dir} changed, reopening")
+                    self._cache.clear()
+                store = None
+                if identity is not None:
+                    try:
+                        store = _PackedSAEStore(directory)
+                        logger.info(f"Opened packed detail store for {sae_dir} ({len(store)} features)")
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.warning(f"Failed to open packed detail store in {directory}: {e}")
+                self._stores[sae_dir] = (identity, store)
+            return self._stores[sae_dir][1]
+
+    def get_raw(
+        self, sae_id: str, feature_id: int, details_path: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        Get the raw JSON bytes for a feature.
+
+        Uses the packed store when available, otherwise reads the per-feature JSON
+        file (details_path if given, else the default file name in the SAE directory).
+        Returns None when the feature has no detailed JSON.
+        """
+        sae_dir = sanitize_sae_id_for_path(sae_id)
+        store = self._get_store(sae_dir)
+        if store is not None:
+            raw = store.get_raw(feature_id)
+            if raw is not None:
+                return raw
+
+        if details_path:
+            path = self.project_root / details_path
+        else:
+            path = self.detailed_json_dir / sae_dir / FEATURE_FILENAME_PATTERN.format(feature_id=feature_id)
+
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def get(
+        self, sae_id: str, feature_id: int, details_path: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the parsed detailed JSON for a feature, or None if it does not exist.
+
+        Returned documents are shared with the cache and must not be mutated.
+        """
+        # Drops cached documents first if the SAE's packed store has changed
+        self._get_store(sanitize_sae_id_for_path(sae_id))
+
+        key = (sae_id, feature_id)
+        document = self._cache.get(key)
+        if document is not None:
+            return document
+
+        raw = self.get_raw(sae_id, feature_id, details_path)
+        if raw is None:
+            return None
+        document = json.loads(raw)
+        self._cache.put(key, document, len(raw))
+        return document
+
+    def prefetch(self, sae_id: str, feature_id: int, radius: Optional[int] = None) -> int:
+        """
+        Load the features within radius ids of feature_id into the cache.
+
+        Features that are already cached or do not exist are skipped. Returns the
+        number of documents loaded.
+        """
+        radius = self.prefetch_radius if radius is None else radius
+        loaded = 0
+        for distance in range(1, radius + 1):
+            for neighbor_id in (feature_id + distance, feature_id - distance):
+                if neighbor_id < 0 or (sae_id, neighbor_id) in self._cache:
+                    continue
+                raw = self.get_raw(sae_id, neighbor_id)
+                if raw is None:
+                    continue
+                self._cache.put((sae_id, neighbor_id), json.loads(raw), len(raw))
+                loaded += 1
+        return loaded
+
+    def version(self) -> str:
+        """
+        Identity of the detailed JSON on disk, for cache validation.
+
+        Covers each SAE directory's mtime, which changes when feature files or
+        store files are added, removed or replaced, and the identity of its packed
+        store files, which also changes when they are rewritten in place.
+        """
+        try:
+            entries = sorted(
+                (entry for entry in os.scandir(self.detailed_json_dir) if entry.is_dir()),
+                key=lambda entry: entry.name
+            )
+        except OSError:
+            return ""
+        return "|".join(
+            f"{entry.name}:{entry.stat().st_mtime_ns}:{_store_identity(Path(entry.path))}"
+            for entry in entries
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Current size and hit/miss counters of the parsed document cache."""
+        return self._cache.stats()
+
+    def close(self):
+        """Unmap all open packed stores and drop cached documents."""
+        with self._lock:
+            for _, store in self._stores.values():
+                if store is not None:
+                    store.close()
+            self._stores.clear()
+        self._cache.clear()
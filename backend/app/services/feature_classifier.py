@@ -9,6 +9,7 @@ This module provides the core classification functionality that:
 """
 
 import polars as pl
+import numpy as np
 import logging
 import re
 from typing import Dict, List, Any, Optional, Tuple, Set
@@ -18,9 +19,8 @@ from ..models.threshold import (
     ThresholdStructure,
     SankeyThreshold,
     CategoryType,
-    ParentPathInfo,
 )
-from .rule_evaluators import SplitEvaluator
+from .compiled_tree import compile_threshold_structure
 from .data_constants import COL_FEATURE_ID
 from .node_labeler import NodeDisplayNameGenerator
 
@@ -39,7 +39,6 @@ class ClassificationEngine:
         """
         Initialize ClassificationEngine.
         """
-        self.evaluator = SplitEvaluator()
         # Performance optimization: cache for classification results
         self._classification_cache = {}
         self._cache_max_size = 100  # Limit cache size to avoid memory issues
@@ -67,138 +66,47 @@ class ClassificationEngine:
             - classification_path: JSON string of the complete path
             - node_at_stage_X: Node ID at each stage (for compatibility)
         """
-        # OPTIMIZATION: Use cached node lookup from ThresholdStructure
-        # This avoids rebuilding the lookup dictionary every time
-        if threshold_structure._nodes_by_id is None:
-            threshold_structure._build_lookup_caches()
-        nodes_by_id = threshold_structure._nodes_by_id
-
-        # Get root node
-        root = threshold_structure.get_root()
-        if not root:
-            raise ValueError("No root node found in threshold structure")
-
-        # Convert to list of dicts for batch processing (more efficient than iter_rows)
-        rows = df.to_dicts()
-
-        # Batch classify all features
-        feature_classifications = self._classify_features_batch(rows, root, nodes_by_id)
-
-        # Create classification DataFrame
-        classification_df = pl.DataFrame(feature_classifications)
-
-        # Ensure feature_id column has the same type as original DataFrame
-        # Also cast _row_idx to match with_row_count output (u32)
-        original_feature_id_type = df.schema[COL_FEATURE_ID]
-        classification_df = classification_df.with_columns([
-            pl.col(COL_FEATURE_ID).cast(original_feature_id_type),
-            pl.col("_row_idx").cast(pl.UInt32)
-        ])
+        compiled_tree = compile_threshold_structure(threshold_structure)
+
+        # Route all rows through the tree level by level
+        paths = compiled_tree.traverse(df)
+        path_lengths = (paths >= 0).sum(axis=1)
+        final_nodes = paths[np.arange(len(paths)), path_lengths - 1]
+
+        # Node ID lookup with a trailing null entry for padded (-1) positions
+        node_id_series = pl.Series(list(compiled_tree.node_ids) + [None], dtype=pl.Utf8)
+        null_position = compiled_tree.num_nodes
+
+        # Paths are shared by many rows: materialize each distinct path once
+        unique_paths, path_inverse = np.unique(paths, axis=0, return_inverse=True)
+        path_lists = pl.Series(
+            [[compiled_tree.node_ids[i] for i in path if i >= 0] for path in unique_paths],
+            dtype=pl.List(pl.Utf8)
+        )
 
-        # Add row index to original DataFrame for proper join
-        df_with_idx = df.with_row_count("_row_idx")
+        classification_columns = [
+            node_id_series.gather(final_nodes).alias("final_node_id"),
+            path_lists.gather(path_inverse.ravel()).alias("classification_path"),
+        ]
+
+        # node_at_stage_X holds the last node of the path at stage X
+        visited_stages = compiled_tree.stages[np.where(paths >= 0, paths, compiled_tree.root)]
+        for stage in np.unique(visited_stages[paths >= 0]):
+            stage_nodes = np.full(len(paths), null_position, dtype=np.int64)
+            for depth in range(paths.shape[1]):
+                at_stage = (paths[:, depth] >= 0) & (visited_stages[:, depth] == stage)
+                stage_nodes[at_stage] = paths[at_stage, depth]
+            classification_columns.append(
+                node_id_series.gather(stage_nodes).alias(f"node_at_stage_{stage}")
+            )
 
-        # Join using row index to avoid duplication from duplicate feature_ids
-        result_df = df_with_idx.join(classification_df, on="_row_idx", how="left").drop("_row_idx")
+        result_df = df.with_columns(classification_columns)
 
         # Log classification summary
         self._log_classification_summary(result_df)
 
         return result_df
 
-    def _classify_features_batch(
-        self,
-        rows: List[Dict[str, Any]],
-        root: SankeyThreshold,
-        nodes_by_id: Dict[str, SankeyThreshold],
-    ) -> List[Dict[str, Any]]:
-        """
-        Batch classify all features efficiently.
-
-        Args:
-            rows: List of feature row dictionaries
-            root: Root node
-            nodes_by_id: Node lookup dictionary
-
-        Returns:
-            List of classification result dictionaries
-        """
-        feature_classifications = []
-
-        for i, row_dict in enumerate(rows):
-            feature_id = row_dict.get(COL_FEATURE_ID)
-
-            # Track the classification path for this feature
-            path_info = self._classify_single_feature(row_dict, root, nodes_by_id)
-
-            # Store classification info with row index for proper join
-            feature_classifications.append(
-                {
-                    "_row_idx": i,  # Track original row index (will be cast to u32)
-                    COL_FEATURE_ID: feature_id,
-                    "final_node_id": path_info["final_node_id"],
-                    "classification_path": path_info["path"],
-                    **path_info[
-                        "stage_nodes"
-                    ],  # node_at_stage_0, node_at_stage_1, etc.
-                }
-            )
-
-        return feature_classifications
-
-    def _classify_single_feature(
-        self,
-        feature_row: Dict[str, Any],
-        root: SankeyThreshold,
-        nodes_by_id: Dict[str, SankeyThreshold],
-    ) -> Dict[str, Any]:
-        """
-        Classify a single feature through the threshold tree.
-
-        Returns:
-            Dictionary with:
-            - final_node_id: The leaf node reached
-            - path: List of node IDs traversed
-            - stage_nodes: Dict of stage -> node_id mappings
-        """
-        current_node = root
-        path = [root.id]
-        stage_nodes = {f"node_at_stage_{root.stage}": root.id}
-        parent_path = []
-
-        # Traverse until we reach a leaf node
-        while current_node.split_rule is not None:
-            # Evaluate split rule
-            evaluation = self.evaluator.evaluate(
-                feature_row, current_node.split_rule, current_node.children_ids
-            )
-
-            # Build parent path info
-            parent_info = ParentPathInfo(
-                parent_id=current_node.id,
-                parent_split_rule=evaluation.split_info,
-                branch_index=evaluation.branch_index,
-                triggering_values=evaluation.triggering_values,
-            )
-            parent_path.append(parent_info)
-
-            # Move to selected child
-            child_id = evaluation.child_id
-            if child_id not in nodes_by_id:
-                logger.error(f"Child node '{child_id}' not found in structure")
-                break
-
-            current_node = nodes_by_id[child_id]
-            path.append(current_node.id)
-            stage_nodes[f"node_at_stage_{current_node.stage}"] = current_node.id
-
-        return {
-            "final_node_id": current_node.id,
-            "path": path,
-            "stage_nodes": stage_nodes,
-            "parent_path": parent_path,
-        }
-
     def build_sankey_data(
         self, classified_df: pl.DataFrame, threshold_structure: ThresholdStructure
     ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
@@ -208,14 +116,19 @@ class ClassificationEngine:
         This replaces the old build_sankey_nodes_and_links function
         with support for dynamic structures and aggregation.
 
+        Leaf nodes carry their feature IDs as a sorted numpy array under
+        "feature_ids"; the caller chooses how to encode them for the response.
+
         Returns:
             Tuple of (nodes, links) for Sankey diagram
         """
+        compiled_tree = compile_threshold_structure(threshold_structure)
+
         # Initialize display name generator
-        display_name_generator = NodeDisplayNameGenerator(threshold_structure)
+        display_name_generator = NodeDisplayNameGenerator(compiled_tree)
 
         # Calculate max_stage once (used by all aggregation methods)
-        max_stage = max(node.stage for node in threshold_structure.nodes)
+        max_stage = compiled_tree.max_stage
 
         # Single-pass aggregation: get both counts and feature IDs
         aggregated_node_counts, feature_ids_by_node = self._aggregate_node_data(
@@ -231,9 +144,9 @@ class ClassificationEngine:
         nodes = []
         aggregated_nodes_by_id = {}
 
-        for node in threshold_structure.nodes:
+        for node in range(compiled_tree.num_nodes):
             # Use actual node ID without aggregation
-            node_id = node.id
+            node_id = compiled_tree.node_ids[node]
             count = aggregated_node_counts.get(node_id, 0)
 
             # Don't skip any nodes - we need to show all nodes even if empty
@@ -242,16 +155,16 @@ class ClassificationEngine:
             node_dict = {
                 "id": node_id,
                 "name": display_name_generator.get_display_name(node),
-                "stage": node.stage,
+                "stage": int(compiled_tree.stages[node]),
                 "feature_count": count,  # Required by response model
-                "category": node.category.value,
+                "category": compiled_tree.categories[node].value,
             }
 
             # Add feature IDs only for leaf nodes (nodes with no children)
-            is_leaf_node = len(node.children_ids) == 0
+            is_leaf_node = compiled_tree.is_leaf(node)
             if is_leaf_node:
-                feature_ids = feature_ids_by_node.get(node_id, [])
-                if feature_ids:
+                feature_ids = feature_ids_by_node.get(node_id)
+                if feature_ids is not None and len(feature_ids) > 0:
                     node_dict["feature_ids"] = feature_ids
 
             nodes.append(node_dict)
@@ -269,19 +182,22 @@ class ClassificationEngine:
 
     def _aggregate_node_data(
         self, classified_df: pl.DataFrame, max_stage: int
-    ) -> Tuple[Dict[str, int], Dict[str, List[int]]]:
+    ) -> Tuple[Dict[str, int], Dict[str, np.ndarray]]:
         """
         Single-pass aggregation: count unique features AND collect feature IDs per node.
 
         This replaces the separate _count_unique_features_per_aggregated_node and
         _collect_feature_ids_per_node methods with a single efficient pass.
 
+        Feature IDs are collected as one sorted (node, feature_id) table per stage
+        and split into per-node numpy arrays, without per-ID Python conversion.
+
         Args:
             classified_df: Classified DataFrame with node_at_stage_X columns
             max_stage: Maximum stage number in threshold structure
 
         Returns:
-            Tuple of (node_counts, feature_ids_by_node)
+            Tuple of (node_counts, feature_ids_by_node) with sorted ID arrays
         """
         aggregated_counts = {}
         feature_ids_by_node = {}
@@ -291,22 +207,25 @@ class ClassificationEngine:
             if stage_col not in classified_df.columns:
                 continue
 
-            # Single aggregation with both n_unique and unique
-            stage_data = (
+            node_features = (
                 classified_df.filter(pl.col(stage_col).is_not_null())
-                .group_by(stage_col)
-                .agg([
-                    pl.col(COL_FEATURE_ID).n_unique().alias("unique_count"),
-                    pl.col(COL_FEATURE_ID).unique().alias("feature_ids")
-                ])
+                .select([stage_col, COL_FEATURE_ID])
+                .unique()
+                .sort([stage_col, COL_FEATURE_ID])
+            )
+            node_sizes = node_features.group_by(stage_col, maintain_order=True).agg(
+                pl.count().alias("unique_count")
+            )
+
+            counts = node_sizes.get_column("unique_count").to_numpy()
+            id_arrays = np.split(
+                node_features.get_column(COL_FEATURE_ID).to_numpy(), np.cumsum(counts)[:-1]
             )
 
-            # Process results using Polars-native iteration
-            for row in stage_data.iter_rows(named=True):
-                node_id = row[stage_col]
+            for node_id, count, ids in zip(node_sizes.get_column(stage_col).to_list(), counts, id_arrays):
                 if node_id and node_id not in aggregated_counts:
-                    aggregated_counts[node_id] = row["unique_count"]
-                    feature_ids_by_node[node_id] = [int(fid) for fid in row["feature_ids"]]
+                    aggregated_counts[node_id] = int(count)
+                    feature_ids_by_node[node_id] = ids
 
         return aggregated_counts, feature_ids_by_node
 
@@ -485,41 +404,16 @@ class ClassificationEngine:
         """
         Perform targeted classification up to the required stage only.
         This avoids classifying beyond what's needed for intermediate nodes.
-        Uses cached node lookups from ThresholdStructure for O(1) access.
+        Rows are routed through the compiled tree, stopping at the target's stage.
         """
-        # Get root node using cached lookup
-        root = threshold_structure.get_root()
-        if not root:
-            raise ValueError("No root node found in threshold structure")
-
-        target_stage = target_node.stage
-        rows = df.to_dicts()
-        matching_feature_ids = []
-
-        # Classify each feature but stop at target stage
-        for row_dict in rows:
-            feature_id = row_dict.get(COL_FEATURE_ID)
-            current_node = root
-            current_stage = 0
-
-            # Traverse until we reach target stage or a leaf
-            while current_stage < target_stage and current_node.split_rule is not None:
-                evaluation = self.evaluator.evaluate(
-                    row_dict, current_node.split_rule, current_node.children_ids
-                )
-
-                child_id = evaluation.child_id
-                # Use cached lookup instead of dictionary check
-                child_node = threshold_structure.get_node_by_id(child_id)
-                if not child_node:
-                    break
-
-                current_node = child_node
-                current_stage = current_node.stage
-
-            # Check if we reached the target node
-            if current_node.id == target_node.id:
-                matching_feature_ids.append(feature_id)
+        compiled_tree = compile_threshold_structure(threshold_structure)
+        paths = compiled_tree.traverse(df, max_stage=target_node.stage)
+        final_nodes = paths[np.arange(len(paths)), (paths >= 0).sum(axis=1) - 1]
+
+        # Compare by ID: the target may be a duplicate ID of the resolved node
+        target_indices = [i for i, node_id in enumerate(compiled_tree.node_ids) if node_id == target_node.id]
+        reached = np.isin(final_nodes, target_indices)
+        matching_feature_ids = df.get_column(COL_FEATURE_ID).filter(pl.Series(reached)).to_list()
 
         # Filter original DataFrame
         if not matching_feature_ids:
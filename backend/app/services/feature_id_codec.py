@@ -0,0 +1,99 @@
+"""
+Compact encodings for Sankey leaf node membership (sets of feature IDs).
+
+All encoders take a sorted array of unique feature IDs:
+
+- runs:   run-length ranges, delta encoded as a flat list
+          [gap_0, len_0, gap_1, len_1, ...] where gap_0 is the first ID and each
+          later gap is the distance from the end of the previous run.
+- bitmap: little-endian bit-packed membership bitmap starting at `base`,
+          base64 encoded (bit i of the bitmap is feature `base + i`).
+
+Neither wins everywhere: runs are compact for contiguous IDs but cost two
+numbers per isolated ID, and bitmaps cost a bit per ID in the covered range.
+encode_smallest picks whichever of list, runs and bitmap is shortest as JSON
+for each set.
+"""
+
+import base64
+from typing import Any, List, Tuple
+
+import numpy as np
+
+
+def encode_runs(feature_ids: np.ndarray) -> List[int]:
+    """Encode sorted unique feature IDs as delta-encoded run-length ranges."""
+    if len(feature_ids) == 0:
+        return []
+    ids = feature_ids.astype(np.int64, copy=False)
+    breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+    run_starts = ids[np.concatenate(([0], breaks))]
+    run_ends = ids[np.concatenate((breaks - 1, [len(ids) - 1]))] + 1
+    run_lengths = run_ends - run_starts
+    gaps = run_starts - np.concatenate(([0], run_ends[:-1]))
+    return np.column_stack((gaps, run_lengths)).ravel().tolist()
+
+
+def decode_runs(runs: List[int]) -> np.ndarray:
+    """Decode delta-encoded run-length ranges back to sorted feature IDs."""
+    pairs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+    if len(pairs) == 0:
+        return np.empty(0, dtype=np.int64)
+    gaps, lengths = pairs[:, 0], pairs[:, 1]
+    run_starts = np.cumsum(gaps + np.concatenate(([0], lengths[:-1])))
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(run_starts, lengths) + offsets
+
+
+def encode_bitmap(feature_ids: np.ndarray) -> Tuple[int, str]:
+    """Encode sorted unique feature IDs as (base, base64 little-endian bitmap)."""
+    if len(feature_ids) == 0:
+        return 0, ""
+    base = int(feature_ids[0])
+    bits = np.zeros(int(feature_ids[-1]) - base + 1, dtype=np.uint8)
+    bits[feature_ids.astype(np.int64, copy=False) - base] = 1
+    packed = np.packbits(bits, bitorder="little")
+    return base, base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def decode_bitmap(base: int, bitmap: str) -> np.ndarray:
+    """Decode a base64 little-endian bitmap back to sorted feature IDs."""
+    packed = np.frombuffer(base64.b64decode(bitmap), dtype=np.uint8)
+    bits = np.unpackbits(packed, bitorder="little")
+    return np.flatnonzero(bits) + base
+
+
+def _json_int_list_size(values: np.ndarray) -> int:
+    """Bytes of a compact JSON array of non-negative integers."""
+    if len(values) == 0:
+        return 2
+    digits = np.floor(np.log10(np.maximum(values, 1))).astype(np.int64) + 1
+    return int(digits.sum()) + len(values) + 1
+
+
+def encode_smallest(feature_ids: np.ndarray, preferred: str = "runs") -> Tuple[str, Any]:
+    """
+    Encode sorted unique feature IDs with the shortest of list, runs and bitmap.
+
+    Sizes are those of the JSON payloads; ties go to preferred. Returns
+    (encoding, payload) where payload is the ID list for "list", the runs list
+    for "runs" and a (base, bitmap) tuple for "bitmap".
+    """
+    ids = feature_ids.astype(np.int64, copy=False)
+    runs = encode_runs(ids)
+    # Quoted base64 string of ceil(span / 8) bytes, plus the digits of base
+    bitmap_bytes = (int(ids[-1]) - int(ids[0]) + 8) // 8 if len(ids) else 0
+    bitmap_size = 4 * ((bitmap_bytes + 2) // 3) + 2 + _json_int_list_size(ids[:1]) - 2
+    sizes = {
+        "list": _json_int_list_size(ids),
+        "runs": _json_int_list_size(np.asarray(runs, dtype=np.int64)),
+        "bitmap": bitmap_size
+    }
+    order = [preferred] + [name for name in ("list", "runs", "bitmap") if name != preferred]
+    encoding = min(order, key=sizes.__getitem__)
+
+    if encoding == "list":
+        return encoding, ids.tolist()
+    if encoding == "runs":
+        return encoding, runs
+    return encoding, encode_bitmap(ids)
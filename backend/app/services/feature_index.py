@@ -0,0 +1,215 @@
+"""
+Primary-key index over the master table for point and bulk feature lookups.
+
+Only the primary key columns (feature_id, sae_id, explanation_method,
+llm_explainer, llm_scorer) are loaded, together with each row's position in its
+parquet file, and sorted by the primary key; the sorted feature_id column is
+kept as a numpy array. A lookup binary-searches that array for the row range of
+a feature, evaluates the remaining key conditions on those few key rows, and
+then takes the requested columns of just the matching rows.
+
+When the master files are small enough (max_resident_bytes, on disk and once
+loaded), all columns are held in memory in key order and a lookup is a take of
+the matching rows. Otherwise only the key columns are held and the rows are read
+from the files that hold them; partitions whose rows are not requested are not
+read, but each file that is read is decoded in full, so such lookups cost about
+one scan per file touched.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import polars as pl
+
+from .data_constants import COL_FEATURE_ID, FILTER_COLUMNS, PRIMARY_KEY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Internal position columns: source file and row offset within that file
+FILE_COLUMN = "__file"
+ROW_COLUMN = "__row"
+# Position of a key row in the sorted index (and of its row in the resident table)
+KEY_COLUMN = "__key"
+
+# Largest master table (on disk and in memory) whose columns are kept resident
+DEFAULT_MAX_RESIDENT_BYTES = 256 * 1024 * 1024
+
+
+class FeatureIndex:
+    """Sorted primary key columns with row positions and a searchsorted index on feature_id."""
+
+    def __init__(self, keys: pl.DataFrame, paths: List[str], columns: List[str], resident: bool = False):
+        """
+        keys holds the primary key columns with each row's FILE_COLUMN and
+        ROW_COLUMN position; if resident, it holds all columns and is kept as the
+        in-memory table.
+        """
+        keys = keys.sort(PRIMARY_KEY_COLUMNS).with_row_count(KEY_COLUMN)
+        self._rows = keys.select(columns) if resident else None
+        self._keys = keys.select(PRIMARY_KEY_COLUMNS + [FILE_COLUMN, ROW_COLUMN, KEY_COLUMN])
+        self._feature_ids = self._keys.get_column(COL_FEATURE_ID).to_numpy()
+        self._paths = paths
+        self._columns = columns
+
+    @classmethod
+    def build(
+        cls, paths: Sequence[str], max_resident_bytes: int = DEFAULT_MAX_RESIDENT_BYTES
+    ) -> "FeatureIndex":
+        """
+        Read the master parquet files and build the index.
+
+        All columns are loaded when the files take at most max_resident_bytes
+        on disk and in memory, otherwise only the primary key columns.
+        """
+        paths = [str(path) for path in paths]
+        columns = cls._scan(paths[0]).columns
+
+        keys = None
+        if sum(os.path.getsize(path) for path in paths) <= max_resident_bytes:
+            keys = cls._read_positions(paths, columns)
+            if keys.estimated_size() > max_resident_bytes:
+                keys = None
+        resident = keys is not None
+        if not resident:
+            keys = cls._read_positions(paths, PRIMARY_KEY_COLUMNS)
+
+        index = cls(keys, paths, columns, resident=resident)
+        logger.info(
+            f"Built feature index over {len(index)} rows in {len(paths)} files "
+            f"({index.num_features} unique feature ids, "
+            f"{'all columns' if resident else 'key columns only'} in memory)"
+        )
+        return index
+
+    @classmethod
+    def _read_positions(cls, paths: List[str], columns: List[str]) -> pl.DataFrame:
+        """Read columns of all files with each row's file index and row offset."""
+        return pl.concat([
+            cls._scan(path)
+            .select(columns)
+            .with_row_count(ROW_COLUMN)
+            .with_columns(pl.lit(file_index, dtype=pl.UInt32).alias(FILE_COLUMN))
+            .collect()
+            for file_index, path in enumerate(paths)
+        ])
+
+    @staticmethod
+    def _scan(path: str) -> pl.LazyFrame:
+        return pl.scan_parquet(path, hive_partitioning=False)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def num_features(self) -> int:
+        if len(self._feature_ids) == 0:
+            return 0
+        return int(np.count_nonzero(np.diff(self._feature_ids)) + 1)
+
+    @property
+    def columns(self) -> List[str]:
+        return self._columns
+
+    @property
+    def resident(self) -> bool:
+        """Whether all columns are held in memory."""
+        return self._rows is not None
+
+    def row_range(self, feature_id: int) -> slice:
+        """Index offsets of all records for a feature_id."""
+        start = int(np.searchsorted(self._feature_ids, feature_id, side="left"))
+        stop = int(np.searchsorted(self._feature_ids, feature_id, side="right"))
+        return slice(start, stop)
+
+    def row_offsets(self, feature_ids: Sequence[int]) -> np.ndarray:
+        """
+        Index offsets of all records for the given feature_ids, in key order.
+
+        Duplicate and unknown ids are ignored.
+        """
+        ids = np.unique(np.asarray(feature_ids, dtype=self._feature_ids.dtype))
+        starts = np.searchsorted(self._feature_ids, ids, side="left")
+        stops = np.searchsorted(self._feature_ids, ids, side="right")
+        counts = stops - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Expand each [start, stop) range without a Python loop
+        run_starts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return run_starts + np.arange(total)
+
+    def get(self, feature_id: int, key_values: Optional[Dict[str, str]] = None) -> pl.DataFrame:
+        """Rows for a single feature_id matching the given key column values."""
+        conditions = [
+            pl.col(column) == value
+            for column, value in (key_values or {}).items()
+            if column in FILTER_COLUMNS and value
+        ]
+        return self.fetch(self._filter_keys(self._keys[self.row_range(feature_id)], conditions))
+
+    def gather(
+        self,
+        feature_ids: Sequence[int],
+        key_filters: Optional[Dict[str, List[str]]] = None,
+        columns: Optional[List[str]] = None
+    ) -> pl.DataFrame:
+        """
+        Rows for many feature_ids at once with one indexed gather.
+
+        key_filters maps filter columns to allowed values; columns optionally
+        projects the result. Rows come back in primary key order.
+        """
+        return self.fetch(self.select_keys(feature_ids, key_filters), columns)
+
+    def select_keys(
+        self,
+        feature_ids: Sequence[int],
+        key_filters: Optional[Dict[str, List[str]]] = None
+    ) -> pl.DataFrame:
+        """
+        Key rows for many feature_ids, in primary key order, without reading any rows.
+
+        The result can be counted or sliced (e.g. to a page) and passed to fetch.
+        """
+        offsets = self.row_offsets(feature_ids)
+        keys = self._keys[offsets] if len(offsets) else self._keys.clear()
+
+        conditions = [
+            pl.col(column).is_in(values)
+            for column, values in (key_filters or {}).items()
+            if column in FILTER_COLUMNS and values
+        ]
+        return self._filter_keys(keys, conditions)
+
+    def fetch(self, keys: pl.DataFrame, columns: Optional[List[str]] = None) -> pl.DataFrame:
+        """Read the given columns of the rows at keys' positions (from select_keys), in keys' order."""
+        columns = self._columns if columns is None else columns
+        if self._rows is not None:
+            return self._rows.select(columns)[keys.get_column(KEY_COLUMN)]
+
+        positions = keys.select([FILE_COLUMN, ROW_COLUMN])
+
+        frames = [
+            self._scan(self._paths[file_index])
+            .with_row_count(ROW_COLUMN)
+            .filter(pl.col(ROW_COLUMN).is_in(group.get_column(ROW_COLUMN)))
+            .select([ROW_COLUMN] + columns)
+            .with_columns(pl.lit(file_index, dtype=pl.UInt32).alias(FILE_COLUMN))
+            .collect()
+            for file_index, group in positions.group_by(FILE_COLUMN)
+        ]
+        if not frames:
+            return self._scan(self._paths[0]).select(columns).clear().collect()
+
+        # Left join keeps the key order of positions
+        rows = positions.join(pl.concat(frames), on=[FILE_COLUMN, ROW_COLUMN], how="left")
+        return rows.select(columns)
+
+    @staticmethod
+    def _filter_keys(keys: pl.DataFrame, conditions: List[pl.Expr]) -> pl.DataFrame:
+        if not conditions:
+            return keys
+        return keys.filter(pl.all_horizontal(conditions))
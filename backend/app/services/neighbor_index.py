@@ -0,0 +1,89 @@
+"""
+CSR index over the top-k decoder neighbors of every feature.
+
+Reads the neighbor table written next to the master parquet by
+create_master_parquet.py (sae_id, feature_id, neighbor_id, cosine_similarity)
+once and keeps, per SAE, the neighbor ids and similarities as flat numpy arrays
+ordered by feature_id and descending similarity, plus an indptr array indexed
+directly by feature_id. A lookup is two indptr reads and a slice, with no scan
+of the table.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from .data_constants import COL_FEATURE_ID, COL_SAE_ID, COL_NEIGHBOR_ID, COL_COSINE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+
+class _SAENeighbors:
+    """CSR arrays of one SAE: neighbors of feature f are [indptr[f], indptr[f + 1])."""
+
+    def __init__(self, feature_ids: np.ndarray, neighbor_ids: np.ndarray, similarities: np.ndarray):
+        counts = np.bincount(feature_ids, minlength=int(feature_ids.max()) + 1 if len(feature_ids) else 0)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.neighbor_ids = neighbor_ids
+        self.similarities = similarities
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def get(self, feature_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Neighbor ids and similarities of a feature, or None if it has no neighbors."""
+        if feature_id < 0 or feature_id >= len(self):
+            return None
+        start, stop = self.indptr[feature_id], self.indptr[feature_id + 1]
+        if start == stop:
+            return None
+        return self.neighbor_ids[start:stop], self.similarities[start:stop]
+
+
+class NeighborIndex:
+    """Top-k decoder neighbors per (sae_id, feature_id)."""
+
+    def __init__(self, df: pl.DataFrame):
+        self._saes: Dict[str, _SAENeighbors] = {}
+        df = df.with_columns(pl.col(COL_SAE_ID).cast(pl.Utf8)).sort(
+            [COL_SAE_ID, COL_FEATURE_ID, COL_COSINE_SIMILARITY], descending=[False, False, True]
+        )
+        for sae_id, group in df.group_by(COL_SAE_ID, maintain_order=True):
+            self._saes[sae_id] = _SAENeighbors(
+                group.get_column(COL_FEATURE_ID).to_numpy().astype(np.int64),
+                group.get_column(COL_NEIGHBOR_ID).to_numpy().astype(np.int64),
+                group.get_column(COL_COSINE_SIMILARITY).to_numpy().astype(np.float32)
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "NeighborIndex":
+        """Read the neighbor table and build the index."""
+        index = cls(pl.read_parquet(
+            path, columns=[COL_SAE_ID, COL_FEATURE_ID, COL_NEIGHBOR_ID, COL_COSINE_SIMILARITY]
+        ))
+        logger.info(f"Built neighbor index from {path} for {len(index.sae_ids)} SAE(s)")
+        return index
+
+    @property
+    def sae_ids(self) -> List[str]:
+        return list(self._saes)
+
+    def get(
+        self, sae_id: str, feature_id: int, k: Optional[int] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Up to k nearest neighbors of a feature, most similar first.
+
+        Returns (neighbor_ids, cosine_similarities) views into the index, or None
+        when the SAE or feature has no neighbors.
+        """
+        sae = self._saes.get(sae_id)
+        if sae is None:
+            return None
+        neighbors = sae.get(feature_id)
+        if neighbors is None or k is None:
+            return neighbors
+        return neighbors[0][:k], neighbors[1][:k]
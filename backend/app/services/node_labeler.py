@@ -5,39 +5,44 @@ This module handles generating human-readable display names for nodes
 based on their category, split rules, and position in the threshold tree.
 """
 
+import logging
 import re
 from typing import Optional
 
-from ..models.threshold import SankeyThreshold, CategoryType, ThresholdStructure
+from ..models.threshold import CategoryType
+from .compiled_tree import CompiledThresholdTree, OP_LEAF, OP_RANGE, OP_PATTERN, OP_EXPRESSION
+
+logger = logging.getLogger(__name__)
 
 
 class NodeDisplayNameGenerator:
     """Generates display names for Sankey nodes based on threshold structure."""
 
-    def __init__(self, threshold_structure: ThresholdStructure):
+    def __init__(self, compiled_tree: CompiledThresholdTree):
         """
         Initialize the display name generator.
 
         Args:
-            threshold_structure: The threshold tree structure for context
+            compiled_tree: The compiled threshold tree structure for context
         """
-        self.threshold_structure = threshold_structure
+        self.tree = compiled_tree
 
-    def get_display_name(self, node: SankeyThreshold) -> str:
+    def get_display_name(self, node: int) -> str:
         """
-        Generate display name for a node.
+        Generate display name for a node, given by its index in the compiled tree.
 
         Uses dynamic split rule analysis for flexible, stage-independent display names
         with consolidated legacy fallback patterns.
         """
-        base_name = self._get_category_name(node.category)
+        node_id = self.tree.node_ids[node]
+        base_name = self._get_category_name(self.tree.categories[node])
 
-        if node.id == "root":
+        if node_id == "root":
             return base_name
 
         # Special case for "others" node - handle early
-        if node.id == "others" or node.id.endswith("_others"):
-            print(f"[DEBUG] Found 'others' node: {node.id}")
+        if node_id == "others" or node_id.endswith("_others"):
+            logger.debug(f"Found 'others' node: {node_id}")
             return f"{base_name}: Others"
 
         # Try dynamic display name from split rules
@@ -58,69 +63,70 @@ class NodeDisplayNameGenerator:
         }
         return category_names.get(category, category.value.replace("_", " ").title())
 
-    def _get_dynamic_display_name(self, node: SankeyThreshold, base_name: str) -> Optional[str]:
+    def _get_dynamic_display_name(self, node: int, base_name: str) -> Optional[str]:
         """
         Generate display name using threshold structure and split rule information.
 
         Returns None if no dynamic name can be generated.
         """
-        if not node.parent_path:
+        if not self.tree.has_parent_path[node]:
             return None
 
-        parent_info = node.parent_path[-1]
-        parent_node = self.threshold_structure.get_node_by_id(parent_info.parent_id)
-
-        if not parent_node or not parent_node.split_rule:
+        parent = int(self.tree.parent_index[node])
+        if parent < 0 or self.tree.opcodes[parent] == OP_LEAF:
             return None
 
         return self._get_split_rule_display_name(
-            node, parent_node.split_rule, parent_info.branch_index, base_name
+            node, parent, int(self.tree.parent_branch[node]), base_name
         )
 
-    def _get_legacy_display_name(self, node: SankeyThreshold, base_name: str) -> str:
+    def _get_legacy_display_name(self, node: int, base_name: str) -> str:
         """Fallback to legacy pattern matching for display names."""
-        parts = node.id.split("_")
+        node_id = self.tree.node_ids[node]
+        category = self.tree.categories[node]
+        parts = node_id.split("_")
 
-        if node.category == CategoryType.FEATURE_SPLITTING:
+        if category == CategoryType.FEATURE_SPLITTING:
             if "true" in parts:
                 return "True"
             elif "false" in parts:
                 return "False"
 
-        elif node.category == CategoryType.SEMANTIC_DISTANCE:
+        elif category == CategoryType.SEMANTIC_DISTANCE:
             if "high" in parts:
                 return "High"
             elif "low" in parts:
                 return "Low"
 
-        elif node.category == CategoryType.SCORE_AGREEMENT:
-            return self._get_detailed_score_display_name(node.id)
+        elif category == CategoryType.SCORE_AGREEMENT:
+            return self._get_detailed_score_display_name(node_id)
 
         return base_name
 
     def _get_split_rule_display_name(
-        self, node: SankeyThreshold, split_rule, branch_index: int, base_name: str
+        self, node: int, parent: int, branch_index: int, base_name: str
     ) -> str:
-        """Generate display name based on the split rule that created this node."""
-        if split_rule.type == "range":
-            return self._format_range_display_name(node, split_rule, branch_index, base_name)
-        elif split_rule.type == "pattern":
+        """Generate display name based on the split rule of the parent that created this node."""
+        opcode = self.tree.opcodes[parent]
+        if opcode == OP_RANGE:
+            return self._format_range_display_name(node, parent, branch_index, base_name)
+        elif opcode == OP_PATTERN:
             return self._format_pattern_display_name(node, branch_index, base_name)
-        elif split_rule.type == "expression":
-            return self._format_expression_display_name(node, split_rule, branch_index, base_name)
+        elif opcode == OP_EXPRESSION:
+            return self._format_expression_display_name(node, parent, branch_index, base_name)
         return base_name
 
     def _format_range_display_name(
-        self, node: SankeyThreshold, split_rule, branch_index: int, base_name: str
+        self, node: int, parent: int, branch_index: int, base_name: str
     ) -> str:
         """Format display name for range-based splits."""
-        should_remove_prefix = node.category in [
+        should_remove_prefix = self.tree.categories[node] in [
             CategoryType.FEATURE_SPLITTING, CategoryType.SEMANTIC_DISTANCE
         ]
 
         if branch_index == 0:
             label = "Low"
-        elif branch_index == len(split_rule.thresholds):
+        elif branch_index == len(self.tree.rule_params[parent].thresholds):
             label = "High"
         else:
             label = f"Range {branch_index + 1}"
@@ -128,22 +134,23 @@ class NodeDisplayNameGenerator:
         return label if should_remove_prefix else f"{base_name}: {label}"
 
     def _format_pattern_display_name(
-        self, node: SankeyThreshold, branch_index: int, base_name: str
+        self, node: int, branch_index: int, base_name: str
     ) -> str:
         """Format display name for pattern-based splits."""
-        if node.category == CategoryType.SCORE_AGREEMENT:
-            return self._get_detailed_score_display_name(node.id)
+        node_id = self.tree.node_ids[node]
+        if self.tree.categories[node] == CategoryType.SCORE_AGREEMENT:
+            return self._get_detailed_score_display_name(node_id)
 
         # For non-score-agreement pattern rules
-        all_high_match = re.search(r"all_(\d+)_high", node.id)
+        all_high_match = re.search(r"all_(\d+)_high", node_id)
         if all_high_match:
             return f"{base_name}: All High"
 
-        all_low_match = re.search(r"all_(\d+)_low", node.id)
+        all_low_match = re.search(r"all_(\d+)_low", node_id)
         if all_low_match:
             return f"{base_name}: All Low"
 
-        k_of_n_match = re.search(r"(\d+)_of_(\d+)_high", node.id)
+        k_of_n_match = re.search(r"(\d+)_of_(\d+)_high", node_id)
         if k_of_n_match:
             k = int(k_of_n_match.group(1))
             n = int(k_of_n_match.group(2))
@@ -152,23 +159,25 @@ class NodeDisplayNameGenerator:
         return f"{base_name}: Pattern {branch_index + 1}"
 
     def _format_expression_display_name(
-        self, node: SankeyThreshold, split_rule, branch_index: int, base_name: str
+        self, node: int, parent: int, branch_index: int, base_name: str
     ) -> str:
         """Format display name for expression-based splits."""
-        should_remove_prefix = node.category in [
+        node_id = self.tree.node_ids[node]
+        params = self.tree.rule_params[parent]
+        should_remove_prefix = self.tree.categories[node] in [
             CategoryType.FEATURE_SPLITTING, CategoryType.SEMANTIC_DISTANCE
         ]
 
         # Use branch description if available
-        if branch_index < len(split_rule.branches):
-            branch = split_rule.branches[branch_index]
-            if branch.description:
-                return branch.description if should_remove_prefix else f"{base_name}: {branch.description}"
+        if branch_index < len(params.descriptions):
+            description = params.descriptions[branch_index]
+            if description:
+                return description if should_remove_prefix else f"{base_name}: {description}"
 
         # Check for default child
-        if hasattr(split_rule, "default_child_id") and split_rule.default_child_id == node.id:
+        if params.default_child_id == node_id:
             # Special case for "others" node
-            if node.id == "others" or node.id.endswith("_others"):
+            if node_id == "others" or node_id.endswith("_others"):
                 return "Others" if should_remove_prefix else f"{base_name}: Others"
             return "Default" if should_remove_prefix else f"{base_name}: Default"
 
@@ -234,23 +243,22 @@ class NodeDisplayNameGenerator:
         Used for CategoryGroup-based nodes to display the group name.
         """
         try:
-            node = self.threshold_structure.get_node_by_id(node_id)
-            if not node or not node.parent_path:
+            node = self.tree.index_by_id.get(node_id)
+            if node is None or not self.tree.has_parent_path[node]:
                 return None
 
-            parent_info = node.parent_path[-1]
-            parent_node = self.threshold_structure.get_node_by_id(parent_info.parent_id)
-
-            if not parent_node or not parent_node.split_rule:
+            parent = int(self.tree.parent_index[node])
+            if parent < 0 or self.tree.opcodes[parent] == OP_LEAF:
                 return None
 
             # For pattern rules, look up the pattern by branch index
-            if parent_node.split_rule.type == "pattern":
-                branch_idx = parent_info.branch_index
-                if branch_idx < len(parent_node.split_rule.patterns):
-                    pattern = parent_node.split_rule.patterns[branch_idx]
-                    if pattern.description:
-                        return pattern.description
+            if self.tree.opcodes[parent] == OP_PATTERN:
+                branch_idx = int(self.tree.parent_branch[node])
+                descriptions = self.tree.rule_params[parent].descriptions
+                if branch_idx < len(descriptions):
+                    description = descriptions[branch_idx]
+                    if description:
+                        return description
 
             return None
         except Exception:
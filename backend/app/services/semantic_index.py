@@ -0,0 +1,144 @@
+"""
+Approximate nearest neighbor search over explanation embeddings.
+
+Opens the IVF indexes written by build_semantic_index.py, one per data source
+under data/semantic_index/. The list vectors are memory-mapped; only the small
+centroid matrix, latent IDs and list offsets are held in memory. A query scores
+all centroids, scans the contiguous rows of the nprobe best lists and returns
+the top-k latents by cosine similarity.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CENTROIDS_FILENAME = "centroids.npy"
+VECTORS_FILENAME = "vectors.npy"
+LATENT_IDS_FILENAME = "latent_ids.npy"
+LIST_OFFSETS_FILENAME = "list_offsets.npy"
+INDEX_METADATA_FILENAME = "index.json"
+
+DEFAULT_NPROBE = 8
+
+
+class IVFIndex:
+    """Inverted-file index of one data source with memory-mapped list vectors."""
+
+    def __init__(self, directory: Path):
+        with open(directory / INDEX_METADATA_FILENAME, "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+
+        self.centroids = np.load(directory / CENTROIDS_FILENAME)
+        self.vectors = np.load(directory / VECTORS_FILENAME, mmap_mode="r")
+        self.latent_ids = np.load(directory / LATENT_IDS_FILENAME)
+        self.list_offsets = np.load(directory / LIST_OFFSETS_FILENAME)
+
+        if len(self.vectors) != len(self.latent_ids) or self.list_offsets[-1] != len(self.vectors):
+            raise ValueError(f"Semantic index {directory} is inconsistent")
+
+        # Row of each latent ID, for queries by feature
+        self._id_order = np.argsort(self.latent_ids, kind="stable")
+        self._sorted_ids = self.latent_ids[self._id_order]
+        self.default_nprobe = int(self.metadata.get("default_nprobe", DEFAULT_NPROBE))
+
+    def __len__(self) -> int:
+        return len(self.latent_ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def vector_of(self, feature_id: int) -> Optional[np.ndarray]:
+        """Normalized embedding of a feature's explanation, or None if it is not indexed."""
+        pos = int(np.searchsorted(self._sorted_ids, feature_id))
+        if pos >= len(self._sorted_ids) or self._sorted_ids[pos] != feature_id:
+            return None
+        return np.asarray(self.vectors[self._id_order[pos]])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        exclude_id: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k latents by cosine similarity to query, scanning nprobe lists.
+
+        Returns (latent_ids, similarities), most similar first. exclude_id drops
+        that latent (the query feature itself) from the results.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape != (self.embedding_dim,):
+            raise ValueError(
+                f"Query vector has {query.size} dimensions, index expects {self.embedding_dim}"
+            )
+        norm = float(np.linalg.norm(query))
+        if not np.isfinite(norm) or norm == 0.0:
+            raise ValueError("Query vector must be finite and non-zero")
+        query = query / norm
+
+        nprobe = max(1, min(nprobe or self.default_nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        # Each list is a contiguous row range, so the mapped vectors are read in slices
+        row_ranges = [(int(self.list_offsets[i]), int(self.list_offsets[i + 1])) for i in probed]
+        rows = np.concatenate([np.arange(start, stop) for start, stop in row_ranges])
+        scores = np.concatenate([self.vectors[start:stop] @ query for start, stop in row_ranges])
+
+        if exclude_id is not None:
+            keep = self.latent_ids[rows] != exclude_id
+            rows, scores = rows[keep], scores[keep]
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return self.latent_ids[rows[order]], scores[order]
+
+
+class SemanticIndex:
+    """IVF indexes keyed by data source."""
+
+    def __init__(self, indexes: Dict[str, IVFIndex]):
+        self._indexes = indexes
+
+    @classmethod
+    def load(cls, directory: Path) -> "SemanticIndex":
+        """Open every index directory below directory; unreadable ones are skipped."""
+        indexes = {}
+        for index_dir in sorted(Path(directory).iterdir()):
+            if not (index_dir / INDEX_METADATA_FILENAME).exists():
+                continue
+            try:
+                index = IVFIndex(index_dir)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to open semantic index in {index_dir}: {e}")
+                continue
+            data_source = index.metadata.get("data_source", index_dir.name)
+            indexes[data_source] = index
+            logger.info(
+                f"Opened semantic index for {data_source} "
+                f"({len(index)} embeddings, {index.nlist} lists, dim {index.embedding_dim})"
+            )
+        return cls(indexes)
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    @property
+    def data_sources(self) -> List[str]:
+        return list(self._indexes)
+
+    def get(self, data_source: str) -> Optional[IVFIndex]:
+        return self._indexes.get(data_source)
@@ -8,25 +8,39 @@ filtering, and visualization data generation for the SAE feature analysis projec
 import polars as pl
 import numpy as np
 import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional, Union, Any
+import secrets
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union, Any, Tuple
 from pathlib import Path
 
 # Enable Polars string cache for categorical operations
 pl.enable_string_cache()
 
-from ..models.common import Filters, MetricType
+from ..models.common import Filters, MetricType, FeatureIdEncoding
 from ..models.threshold import ThresholdStructure, PatternSplitRule
 from .rule_evaluators import SplitEvaluator
 from ..models.responses import (
     FilterOptionsResponse, HistogramResponse, SankeyResponse,
-    ComparisonResponse, FeatureResponse
+    ComparisonResponse, FeatureResponse, FeatureDetails, FeatureBatchResponse,
+    FeatureIdPageResponse
 )
 from .data_constants import *
 from .feature_classifier import ClassificationEngine
+from .detail_store import DetailStore
+from .feature_index import FeatureIndex
+from .neighbor_index import NeighborIndex
+from .semantic_index import SemanticIndex
+from .feature_id_codec import encode_smallest
 
 logger = logging.getLogger(__name__)
 
+# Number of Sankey leaf feature ID cursors kept before the oldest are dropped.
+# Cursors live in this process only, so they do not work across several workers.
+MAX_FEATURE_ID_CURSORS = 1024
+
 
 class DataService:
     """High-performance data service using Polars for Parquet operations."""
@@ -34,32 +48,162 @@ class DataService:
     def __init__(self, data_path: str = "../data"):
         self.data_path = Path(data_path)
         self.master_file = self.data_path / "master" / "feature_analysis.parquet"
+        self.dataset_dir = self.data_path / "master" / "feature_analysis"
+        self.dataset_manifest = self.dataset_dir / "_dataset.json"
         self.detailed_json_dir = self.data_path / "detailed_json"
+        self.detail_store = DetailStore(self.detailed_json_dir)
+        self.neighbors_file = self.data_path / "master" / "feature_neighbors.parquet"
+        self.semantic_index_dir = self.data_path / "semantic_index"
 
         # Cache for frequently accessed data
         self._filter_options_cache: Optional[Dict[str, List[str]]] = None
         self._df_lazy: Optional[pl.LazyFrame] = None
+        # Partitions of the hive-partitioned dataset (empty in single-file mode)
+        self._partitions: List[Dict[str, Any]] = []
+        # Primary-key index for point and bulk feature lookups
+        self._feature_index: Optional[FeatureIndex] = None
+        # Top-k decoder neighbors (None when no neighbor table was built)
+        self._neighbor_index: Optional[NeighborIndex] = None
+        # ANN indexes over explanation embeddings (None when none were built)
+        self._semantic_index: Optional[SemanticIndex] = None
+        # Sankey leaf feature ID arrays behind cursor handles (LRU)
+        self._feature_id_cursors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Identity of the files loaded at startup (see data_version)
+        self._source_version: Optional[str] = None
         self._ready = False
 
     async def initialize(self):
         """Initialize the data service with lazy loading."""
         try:
-            if not self.master_file.exists():
+            if self.dataset_manifest.exists():
+                self._load_partitioned_dataset()
+                source = self.dataset_dir
+            elif self.master_file.exists():
+                self._df_lazy = pl.scan_parquet(self.master_file)
+                source = self.master_file
+            else:
                 raise FileNotFoundError(f"Master parquet file not found: {self.master_file}")
 
-            self._df_lazy = pl.scan_parquet(self.master_file)
             await self._cache_filter_options()
+            self._feature_index = await asyncio.to_thread(
+                FeatureIndex.build,
+                [partition["path"] for partition in self._partitions] or [self.master_file]
+            )
+            await self._load_neighbor_index()
+            await self._load_semantic_index()
+            self._source_version = self._compute_source_version()
             self._ready = True
-            logger.info(f"DataService initialized with {self.master_file}")
+            logger.info(f"DataService initialized with {source}")
 
         except Exception as e:
             logger.error(f"Failed to initialize DataService: {e}")
             raise
 
+    async def _load_neighbor_index(self):
+        """Load the optional top-k neighbor table; the service works without it."""
+        if not self.neighbors_file.exists():
+            logger.info(f"No neighbor table at {self.neighbors_file}, neighbor lookups disabled")
+            return
+
+        try:
+            self._neighbor_index = await asyncio.to_thread(NeighborIndex.load, self.neighbors_file)
+        except Exception as e:
+            logger.warning(f"Failed to load neighbor table {self.neighbors_file}: {e}")
+            self._neighbor_index = None
+
+    async def _load_semantic_index(self):
+        """Open the optional explanation embedding indexes; the service works without them."""
+        if not self.semantic_index_dir.exists():
+            logger.info(f"No semantic index at {self.semantic_index_dir}, semantic search disabled")
+            return
+
+        index = await asyncio.to_thread(SemanticIndex.load, self.semantic_index_dir)
+        self._semantic_index = index if len(index) else None
+
+    def _compute_source_version(self) -> str:
+        """Version string for the data loaded at startup, derived from its files' identity."""
+        sources = [self.dataset_manifest if self._partitions else self.master_file]
+        if self._neighbor_index is not None:
+            sources.append(self.neighbors_file)
+        if self._semantic_index is not None:
+            sources.extend(sorted(path for path in self.semantic_index_dir.rglob("*") if path.is_file()))
+
+        identity = "|".join(
+            f"{source.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+            for source, stat in ((source, source.stat()) for source in sources)
+        )
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def data_version(self) -> Optional[str]:
+        """
+        Identifies the served data (None until initialized): the master table,
+        neighbor table and semantic index as loaded, plus the detailed JSON as it
+        is on disk now, since the detail store picks up rebuilt stores at runtime.
+        """
+        if self._source_version is None:
+            return None
+        identity = f"{self._source_version}|{self.detail_store.version()}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+    def _load_partitioned_dataset(self):
+        """Load the partition manifest and scan all partitions as one lazy frame."""
+        with open(self.dataset_manifest, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self._partitions = [
+            {"keys": partition["keys"], "path": str(self.dataset_dir / partition["path"])}
+            for partition in manifest["partitions"]
+        ]
+        if not self._partitions:
+            raise ValueError(f"Partitioned dataset has no partitions: {self.dataset_manifest}")
+
+        self._df_lazy = self._scan_partitions(self._partitions)
+        logger.info(
+            f"Using partitioned dataset with {len(self._partitions)} partitions "
+            f"(partition_by={manifest['partition_by']})"
+        )
+
+    @staticmethod
+    def _scan_partitions(partitions: List[Dict[str, Any]]) -> pl.LazyFrame:
+        """Scan partition files; partition columns are stored inside the files."""
+        return pl.scan_parquet([p["path"] for p in partitions], hive_partitioning=False)
+
+    def _scan_for_filters(self, filters: Filters) -> pl.LazyFrame:
+        """
+        Get the lazy frame to query for the given filters.
+
+        In partitioned mode, filters on partition keys prune whole partitions before
+        any file is opened; row-level filtering is still applied by _apply_filters.
+        """
+        if not self._partitions:
+            return self._df_lazy
+
+        selected = [
+            partition for partition in self._partitions
+            if all(
+                not getattr(filters, key, None) or value in getattr(filters, key)
+                for key, value in partition["keys"].items()
+            )
+        ]
+
+        if len(selected) == len(self._partitions):
+            return self._df_lazy
+        if not selected:
+            return self._df_lazy.limit(0)
+        return self._scan_partitions(selected)
+
     async def cleanup(self):
         """Clean up resources."""
         self._df_lazy = None
+        self._partitions = []
         self._filter_options_cache = None
+        self._feature_index = None
+        self._neighbor_index = None
+        self._semantic_index = None
+        self._feature_id_cursors.clear()
+        self._source_version = None
+        self.detail_store.close()
         self._ready = False
 
     def is_ready(self) -> bool:
@@ -168,41 +312,160 @@ class DataService:
         bins: Optional[int] = None,
         threshold_tree: Optional[ThresholdStructure] = None,
         node_id: Optional[str] = None,
-        group_by: Optional[str] = None
-    ) -> HistogramResponse:
-        """Generate histogram data for a specific metric, optionally filtered by node and/or grouped."""
+        group_by: Optional[str] = None,
+        validate: bool = True
+    ) -> Union[HistogramResponse, Dict[str, Any]]:
+        """
+        Generate histogram data for a specific metric, optionally filtered by node and/or grouped.
+
+        With validate=False the response is returned as a plain dict in the
+        HistogramResponse shape, for the fast JSON response path.
+        """
         if not self.is_ready():
             raise RuntimeError("DataService not ready")
 
         try:
             filtered_df = self._apply_filtered_data(filters, threshold_tree, node_id)
+            bin_edges, all_values, groups = self._compute_histograms(filtered_df, metric, bins, group_by)
+            bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+
+            def histogram(counts: List[int]) -> Dict[str, List[float]]:
+                return {"bins": bin_centers.tolist(), "counts": counts, "bin_edges": bin_edges.tolist()}
 
-            # If groupBy is specified, generate grouped histograms
             if group_by:
-                return self._generate_grouped_histogram(filtered_df, metric, bins, group_by)
+                payload = {
+                    "metric": metric.value,
+                    "histogram": histogram([0] * len(bin_centers)),  # Empty for grouped response
+                    "statistics": self._calculate_statistics(all_values),
+                    "total_features": len(all_values),
+                    "grouped_data": [
+                        {
+                            "group_value": group_value,
+                            "histogram": histogram(counts.tolist()),
+                            "statistics": self._calculate_statistics(group_values),
+                            "total_features": len(group_values)
+                        }
+                        for group_value, counts, group_values in groups
+                    ]
+                }
+            else:
+                _, counts, _ = groups[0]
+                payload = {
+                    "metric": metric.value,
+                    "histogram": histogram(counts.tolist()),
+                    "statistics": self._calculate_statistics(all_values),
+                    "total_features": len(all_values),
+                    "grouped_data": None
+                }
+
+            return HistogramResponse(**payload) if validate else payload
 
-            # Otherwise, generate regular histogram
-            values = self._extract_metric_values(filtered_df, metric)
-            bins = self._calculate_bins_if_needed(values, bins)
+        except Exception as e:
+            logger.error(f"Error generating histogram: {e}")
+            raise
 
-            counts, bin_edges = np.histogram(values, bins=bins)
-            bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+    async def get_histogram_table(
+        self,
+        filters: Filters,
+        metric: MetricType,
+        bins: Optional[int] = None,
+        threshold_tree: Optional[ThresholdStructure] = None,
+        node_id: Optional[str] = None,
+        group_by: Optional[str] = None
+    ) -> Tuple[pl.DataFrame, Dict[str, Any]]:
+        """
+        Generate histogram data as a flat table for Arrow responses.
 
-            return HistogramResponse(
-                metric=metric.value,
-                histogram={
-                    "bins": bin_centers.tolist(),
-                    "counts": counts.tolist(),
-                    "bin_edges": bin_edges.tolist()
-                },
-                statistics=self._calculate_statistics(values),
-                total_features=len(values)
-            )
+        Returns a table with one row per (group, bin) and columns group, bin_center,
+        bin_start, bin_end, count (group is null when not grouped), built directly
+        from the NumPy arrays, plus a metadata dict with the metric, statistics and
+        totals.
+        """
+        if not self.is_ready():
+            raise RuntimeError("DataService not ready")
+
+        try:
+            filtered_df = self._apply_filtered_data(filters, threshold_tree, node_id)
+            bin_edges, all_values, groups = self._compute_histograms(filtered_df, metric, bins, group_by)
+            n_bins = len(bin_edges) - 1
+
+            table = pl.DataFrame({
+                "group": pl.Series(
+                    "group", np.repeat([group for group, _, _ in groups], n_bins).tolist(), dtype=pl.Utf8
+                ),
+                "bin_center": np.tile((bin_edges[:-1] + bin_edges[1:]) / 2, len(groups)),
+                "bin_start": np.tile(bin_edges[:-1], len(groups)),
+                "bin_end": np.tile(bin_edges[1:], len(groups)),
+                "count": np.concatenate([counts for _, counts, _ in groups]).astype(np.int64)
+            })
+
+            metadata = {
+                "metric": metric.value,
+                "statistics": self._calculate_statistics(all_values),
+                "total_features": len(all_values),
+                "group_by": group_by,
+                "groups": [
+                    {
+                        "group_value": group_value,
+                        "statistics": self._calculate_statistics(group_values),
+                        "total_features": len(group_values)
+                    }
+                    for group_value, _, group_values in groups
+                ] if group_by else None
+            }
+            return table, metadata
 
         except Exception as e:
-            logger.error(f"Error generating histogram: {e}")
+            logger.error(f"Error generating histogram table: {e}")
             raise
 
+    def _compute_histograms(
+        self,
+        df: pl.DataFrame,
+        metric: MetricType,
+        bins: Optional[int],
+        group_by: Optional[str]
+    ) -> Tuple[np.ndarray, np.ndarray, List[Tuple[Optional[str], np.ndarray, np.ndarray]]]:
+        """
+        Compute histogram counts, optionally per group, over common bin edges.
+
+        Returns (bin_edges, all_values, groups) where groups holds
+        (group_value, counts, values) per group; without group_by it holds a single
+        (None, counts, values) entry for the whole dataset.
+        """
+        all_values = self._extract_metric_values(df, metric)
+        bins = self._calculate_bins_if_needed(all_values, bins)
+
+        if not group_by:
+            counts, bin_edges = np.histogram(all_values, bins=bins)
+            return bin_edges, all_values, [(None, counts, all_values)]
+
+        # Get unique values for the grouping field
+        if group_by not in df.columns:
+            raise ValueError(f"Group by field '{group_by}' not found in data")
+
+        group_values = df.select(pl.col(group_by)).unique().sort(group_by).to_series().to_list()
+
+        if not group_values:
+            raise ValueError(f"No unique values found for grouping field '{group_by}'")
+
+        # Calculate common bin edges based on all data
+        _, common_bin_edges = np.histogram(all_values, bins=bins)
+
+        # Generate histogram for each group
+        groups = []
+        for group_value in group_values:
+            group_df = df.filter(pl.col(group_by) == group_value)
+
+            if len(group_df) == 0:
+                continue
+
+            group_values_array = self._extract_metric_values(group_df, metric)
+            counts, _ = np.histogram(group_values_array, bins=common_bin_edges)
+            groups.append((str(group_value), counts, group_values_array))
+
+        return common_bin_edges, all_values, groups
+
     def _apply_filtered_data(
         self,
         filters: Filters,
@@ -210,7 +473,7 @@ class DataService:
         node_id: Optional[str]
     ) -> pl.DataFrame:
         """Apply filters and node-specific filtering to get final dataset."""
-        filtered_df = self._apply_filters(self._df_lazy, filters).collect()
+        filtered_df = self._apply_filters(self._scan_for_filters(filters), filters).collect()
 
         if len(filtered_df) == 0:
             raise ValueError("No data available after applying filters")
@@ -259,83 +522,14 @@ class DataService:
             "std": float(np.std(values))
         }
 
-    def _generate_grouped_histogram(
-        self,
-        df: pl.DataFrame,
-        metric: MetricType,
-        bins: Optional[int],
-        group_by: str
-    ) -> HistogramResponse:
-        """Generate grouped histogram data by the specified field."""
-        from ..models.responses import GroupedHistogramData
-
-        # Get unique values for the grouping field
-        if group_by not in df.columns:
-            raise ValueError(f"Group by field '{group_by}' not found in data")
-
-        group_values = df.select(pl.col(group_by)).unique().sort(group_by).to_series().to_list()
-
-        if not group_values:
-            raise ValueError(f"No unique values found for grouping field '{group_by}'")
-
-        # Extract all values to determine common bin edges
-        all_values = self._extract_metric_values(df, metric)
-        bins = self._calculate_bins_if_needed(all_values, bins)
-
-        # Calculate common bin edges based on all data
-        _, common_bin_edges = np.histogram(all_values, bins=bins)
-        bin_centers = (common_bin_edges[:-1] + common_bin_edges[1:]) / 2
-
-        # Generate histogram for each group
-        grouped_data = []
-        for group_value in group_values:
-            # Filter data for this group
-            group_df = df.filter(pl.col(group_by) == group_value)
-
-            if len(group_df) == 0:
-                continue
-
-            # Extract metric values for this group
-            group_values_array = self._extract_metric_values(group_df, metric)
-
-            # Calculate histogram with common bin edges
-            counts, _ = np.histogram(group_values_array, bins=common_bin_edges)
-
-            # Calculate statistics for this group
-            statistics = self._calculate_statistics(group_values_array)
-
-            grouped_data.append(
-                GroupedHistogramData(
-                    group_value=str(group_value),
-                    histogram={
-                        "bins": bin_centers.tolist(),
-                        "counts": counts.tolist(),
-                        "bin_edges": common_bin_edges.tolist()
-                    },
-                    statistics=statistics,
-                    total_features=len(group_values_array)
-                )
-            )
-
-        # Return response with grouped data
-        return HistogramResponse(
-            metric=metric.value,
-            histogram={
-                "bins": bin_centers.tolist(),
-                "counts": [0] * len(bin_centers),  # Empty for grouped response
-                "bin_edges": common_bin_edges.tolist()
-            },
-            statistics=self._calculate_statistics(all_values),
-            total_features=len(all_values),
-            grouped_data=grouped_data
-        )
-
     async def get_sankey_data(
         self,
         filters: Filters,
         threshold_data: Union[ThresholdStructure, Dict[str, Any]],
-        use_v2: Optional[bool] = None
-    ) -> SankeyResponse:
+        use_v2: Optional[bool] = None,
+        feature_id_encoding: FeatureIdEncoding = FeatureIdEncoding.LIST,
+        validate: bool = True
+    ) -> Union[SankeyResponse, Dict[str, Any]]:
         """
         Generate Sankey diagram data using the v2 threshold system.
 
@@ -343,32 +537,93 @@ class DataService:
             filters: Filter criteria
             threshold_data: ThresholdStructure as dict or ThresholdStructure object
             use_v2: Legacy parameter (ignored, always uses v2)
+            feature_id_encoding: How leaf node feature IDs are returned
+            validate: Build a SankeyResponse; if False, return the plain dict payload
 
         Returns:
-            SankeyResponse with nodes, links, and metadata
+            SankeyResponse (or dict in its shape) with nodes, links, and metadata
+        """
+        if not self.is_ready():
+            raise RuntimeError("DataService not ready")
+
+        filtered_df = self._apply_filters(self._scan_for_filters(filters), filters).collect()
+
+        if len(filtered_df) == 0:
+            raise ValueError("No data available after applying filters")
+
+        payload = await self._get_sankey_data_impl(
+            filtered_df, filters, threshold_data, feature_id_encoding
+        )
+        return SankeyResponse(**payload) if validate else payload
+
+    async def get_sankey_table(
+        self,
+        filters: Filters,
+        threshold_data: Union[ThresholdStructure, Dict[str, Any]]
+    ) -> Tuple[pl.DataFrame, Dict[str, Any]]:
+        """
+        Generate Sankey diagram data as one flat table for Arrow responses.
+
+        Nodes and links share a single table distinguished by the `kind` column
+        ("node" or "link"); node columns are null on link rows and vice versa. Leaf
+        node feature IDs are a list column built from the per-node ID arrays.
+        Returns the table and the response metadata dict.
         """
         if not self.is_ready():
             raise RuntimeError("DataService not ready")
 
-        filtered_df = self._apply_filters(self._df_lazy, filters).collect()
+        filtered_df = self._apply_filters(self._scan_for_filters(filters), filters).collect()
 
         if len(filtered_df) == 0:
             raise ValueError("No data available after applying filters")
 
-        return await self._get_sankey_data_impl(filtered_df, filters, threshold_data)
+        payload = await self._get_sankey_data_impl(filtered_df, filters, threshold_data, None)
+        nodes, links = payload["nodes"], payload["links"]
+
+        node_table = pl.DataFrame({
+            "kind": ["node"] * len(nodes),
+            "id": [node["id"] for node in nodes],
+            "name": [node["name"] for node in nodes],
+            "stage": pl.Series([node["stage"] for node in nodes], dtype=pl.Int32),
+            "feature_count": pl.Series([node["feature_count"] for node in nodes], dtype=pl.Int64),
+            "category": [node["category"] for node in nodes],
+            "feature_ids": pl.Series(
+                [
+                    pl.Series(node["feature_ids"]) if node.get("feature_ids") is not None else None
+                    for node in nodes
+                ],
+                dtype=pl.List(pl.UInt32)
+            )
+        })
+        link_table = pl.DataFrame({
+            "kind": ["link"] * len(links),
+            "source": pl.Series([link["source"] for link in links], dtype=pl.Utf8),
+            "target": pl.Series([link["target"] for link in links], dtype=pl.Utf8),
+            "value": pl.Series([link["value"] for link in links], dtype=pl.Int64)
+        })
+        table = pl.concat([node_table, link_table], how="diagonal")
+
+        return table, payload["metadata"]
 
     async def _get_sankey_data_impl(
         self,
         filtered_df: pl.DataFrame,
         filters: Filters,
-        threshold_data: Union[Dict[str, Any], ThresholdStructure]
-    ) -> SankeyResponse:
-        """Internal implementation using v2 classification engine."""
+        threshold_data: Union[Dict[str, Any], ThresholdStructure],
+        feature_id_encoding: Optional[FeatureIdEncoding] = FeatureIdEncoding.LIST
+    ) -> Dict[str, Any]:
+        """
+        Internal implementation using v2 classification engine (SankeyResponse shape).
+
+        With feature_id_encoding=None, leaf nodes keep their sorted feature ID arrays.
+        """
         threshold_structure = self._ensure_threshold_structure(threshold_data)
 
         engine = ClassificationEngine()
         classified_df = engine.classify_features(filtered_df, threshold_structure)
         nodes, links = engine.build_sankey_data(classified_df, threshold_structure)
+        if feature_id_encoding is not None:
+            self._encode_leaf_feature_ids(nodes, feature_id_encoding)
 
         metadata = {
             "total_features": filtered_df.select(pl.col("feature_id")).n_unique(),
@@ -376,7 +631,75 @@ class DataService:
             "applied_thresholds": self._extract_applied_thresholds(threshold_structure)
         }
 
-        return SankeyResponse(nodes=nodes, links=links, metadata=metadata)
+        return {"nodes": nodes, "links": links, "metadata": metadata}
+
+    def _encode_leaf_feature_ids(
+        self, nodes: List[Dict[str, Any]], encoding: FeatureIdEncoding
+    ):
+        """
+        Replace leaf node feature ID arrays with the requested response encoding.
+
+        runs and bitmap are preferences: each node gets whichever of runs, bitmap
+        and the plain list is smallest, so sparse or tiny leaves may come back as
+        feature_ids. Both fields are always set (null when unused) so the payload
+        serializes exactly like a validated SankeyResponse.
+        """
+        for node in nodes:
+            feature_ids = node.pop("feature_ids", None)
+            node["feature_ids"] = None
+            node["feature_ids_encoded"] = None
+            if feature_ids is None:
+                continue
+
+            if encoding == FeatureIdEncoding.LIST:
+                node["feature_ids"] = feature_ids.tolist()
+                continue
+
+            encoded = {
+                "encoding": encoding.value,
+                "count": len(feature_ids),
+                "runs": None,
+                "base": None,
+                "bitmap": None,
+                "cursor": None
+            }
+            if encoding == FeatureIdEncoding.CURSOR:
+                encoded["cursor"] = self._register_feature_id_cursor(feature_ids)
+            else:
+                chosen, payload = encode_smallest(feature_ids, preferred=encoding.value)
+                if chosen == FeatureIdEncoding.LIST.value:
+                    node["feature_ids"] = payload
+                    continue
+                encoded["encoding"] = chosen
+                if chosen == FeatureIdEncoding.RUNS.value:
+                    encoded["runs"] = payload
+                else:
+                    encoded["base"], encoded["bitmap"] = payload
+            node["feature_ids_encoded"] = encoded
+
+    def _register_feature_id_cursor(self, feature_ids: np.ndarray) -> str:
+        """Store a feature ID array behind a new cursor handle, evicting the oldest."""
+        cursor = secrets.token_urlsafe(12)
+        self._feature_id_cursors[cursor] = feature_ids
+        while len(self._feature_id_cursors) > MAX_FEATURE_ID_CURSORS:
+            self._feature_id_cursors.popitem(last=False)
+        return cursor
+
+    def get_feature_id_page(self, cursor: str, offset: int, limit: int) -> FeatureIdPageResponse:
+        """Get one page of the feature IDs behind a Sankey leaf cursor."""
+        feature_ids = self._feature_id_cursors.get(cursor)
+        if feature_ids is None:
+            raise KeyError(f"Feature ID cursor not found or expired: {cursor}")
+        self._feature_id_cursors.move_to_end(cursor)
+
+        total = len(feature_ids)
+        return FeatureIdPageResponse(
+            feature_ids=feature_ids[offset:offset + limit].tolist(),
+            total=total,
+            offset=offset,
+            limit=limit,
+            next_offset=offset + limit if offset + limit < total else None
+        )
 
     def _ensure_threshold_structure(
         self, threshold_data: Union[Dict[str, Any], ThresholdStructure]
@@ -437,56 +760,288 @@ class DataService:
         sae_id: Optional[str] = None,
         explanation_method: Optional[str] = None,
         llm_explainer: Optional[str] = None,
-        llm_scorer: Optional[str] = None
+        llm_scorer: Optional[str] = None,
+        include_details: bool = False
     ) -> FeatureResponse:
-        """Get detailed data for a specific feature."""
+        """
+        Get detailed data for a specific feature.
+
+        With include_details, the feature's detailed JSON (explanations, per-scorer
+        scores, distance pairs) is inlined from the detail store, and neighbouring
+        feature ids are prefetched into its cache in the background.
+        """
         if not self.is_ready():
             raise RuntimeError("DataService not ready")
 
         try:
-            combined_condition = self._build_feature_conditions(
-                feature_id, sae_id, explanation_method, llm_explainer, llm_scorer
-            )
-
-            result_df = self._df_lazy.filter(combined_condition).collect()
+            result_df = self._feature_index.get(feature_id, {
+                COL_SAE_ID: sae_id,
+                COL_EXPLANATION_METHOD: explanation_method,
+                COL_LLM_EXPLAINER: llm_explainer,
+                COL_LLM_SCORER: llm_scorer
+            })
 
             if len(result_df) == 0:
                 raise ValueError(f"Feature {feature_id} not found with specified parameters")
 
             row = result_df.row(0, named=True)
-            return self._build_feature_response(row)
+            response = self._build_feature_response(row)
+
+            if include_details:
+                details = await self.get_feature_details(
+                    row[COL_SAE_ID], row[COL_FEATURE_ID], row[COL_DETAILS_PATH]
+                )
+                if details is not None:
+                    response.details = FeatureDetails(**details)
+                self._schedule_detail_prefetch(row[COL_SAE_ID], row[COL_FEATURE_ID])
+
+            return response
 
         except Exception as e:
             logger.error(f"Error retrieving feature data: {e}")
             raise
 
-    def _build_feature_conditions(
+    async def get_feature_table(
         self,
         feature_id: int,
-        sae_id: Optional[str],
-        explanation_method: Optional[str],
-        llm_explainer: Optional[str],
-        llm_scorer: Optional[str]
-    ):
-        """Build combined condition for feature query."""
-        conditions = [pl.col(COL_FEATURE_ID) == feature_id]
-
-        filter_params = [
-            (sae_id, COL_SAE_ID),
-            (explanation_method, COL_EXPLANATION_METHOD),
-            (llm_explainer, COL_LLM_EXPLAINER),
-            (llm_scorer, COL_LLM_SCORER)
-        ]
+        sae_id: Optional[str] = None,
+        explanation_method: Optional[str] = None,
+        llm_explainer: Optional[str] = None,
+        llm_scorer: Optional[str] = None,
+        include_details: bool = False
+    ) -> pl.DataFrame:
+        """
+        Get the master row of a feature as a one-row table for Arrow responses.
 
-        for param_value, column_name in filter_params:
-            if param_value:
-                conditions.append(pl.col(column_name) == param_value)
+        With include_details, a `details` column holds the feature's detailed JSON
+        document as a string (null when there is none).
+        """
+        if not self.is_ready():
+            raise RuntimeError("DataService not ready")
 
-        combined_condition = conditions[0]
-        for condition in conditions[1:]:
-            combined_condition = combined_condition & condition
+        row_df = self._feature_index.get(feature_id, {
+            COL_SAE_ID: sae_id,
+            COL_EXPLANATION_METHOD: explanation_method,
+            COL_LLM_EXPLAINER: llm_explainer,
+            COL_LLM_SCORER: llm_scorer
+        }).head(1)
+
+        if len(row_df) == 0:
+            raise ValueError(f"Feature {feature_id} not found with specified parameters")
+
+        if include_details:
+            row = row_df.row(0, named=True)
+            raw = await asyncio.to_thread(
+                self.detail_store.get_raw, row[COL_SAE_ID], row[COL_FEATURE_ID], row[COL_DETAILS_PATH]
+            )
+            row_df = row_df.with_columns(
+                pl.Series("details", [raw.decode("utf-8") if raw is not None else None], dtype=pl.Utf8)
+            )
+            self._schedule_detail_prefetch(row[COL_SAE_ID], row[COL_FEATURE_ID])
+
+        return row_df
+
+    async def get_feature_details(
+        self,
+        sae_id: str,
+        feature_id: int,
+        details_path: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get the detailed JSON for a feature from the packed detail store."""
+        return await asyncio.to_thread(self.detail_store.get, sae_id, feature_id, details_path)
+
+    def _schedule_detail_prefetch(self, sae_id: str, feature_id: int):
+        """Prefetch neighbouring feature details into the detail cache without blocking."""
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self.detail_store.prefetch, sae_id, feature_id
+        )
+        future.add_done_callback(self._log_prefetch_error)
+
+    @staticmethod
+    def _log_prefetch_error(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Detail prefetch failed: {future.exception()}")
+
+    def has_feature_neighbors(self) -> bool:
+        """Whether a neighbor table was loaded."""
+        return self._neighbor_index is not None
+
+    def get_feature_neighbors(
+        self,
+        feature_id: int,
+        sae_id: Optional[str] = None,
+        k: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the nearest decoder neighbors of a feature from the neighbor index.
+
+        sae_id may be omitted when the index holds a single SAE. Returns a payload
+        shaped like FeatureNeighborsResponse, neighbors ordered by descending
+        cosine similarity.
+        """
+        if not self.is_ready() or self._neighbor_index is None:
+            raise RuntimeError("Neighbor index not available")
+
+        if sae_id is None:
+            sae_ids = self._neighbor_index.sae_ids
+            if len(sae_ids) != 1:
+                raise ValueError(f"sae_id is required when neighbors of several SAEs are loaded: {sae_ids}")
+            sae_id = sae_ids[0]
+
+        neighbors = self._neighbor_index.get(sae_id, feature_id, k)
+        if neighbors is None:
+            raise ValueError(f"Feature {feature_id} not found in neighbor table of {sae_id}")
+
+        neighbor_ids, similarities = neighbors
+        return {
+            "feature_id": feature_id,
+            "sae_id": sae_id,
+            "neighbors": [
+                {"feature_id": neighbor_id, "cosine_similarity": similarity}
+                for neighbor_id, similarity in zip(neighbor_ids.tolist(), similarities.tolist())
+            ]
+        }
+
+    def has_semantic_index(self) -> bool:
+        """Whether at least one explanation embedding index was loaded."""
+        return self._semantic_index is not None
+
+    def search_similar_explanations(
+        self,
+        k: int,
+        data_source: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        feature_id: Optional[int] = None,
+        vector: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Find the features whose explanations are closest to a query.
+
+        The query is either the explanation embedding of feature_id (which is
+        excluded from the results) or a raw vector. data_source selects the index
+        and may be omitted when only one is loaded. Returns a payload shaped like
+        SemanticSearchResponse.
+        """
+        if not self.is_ready() or self._semantic_index is None:
+            raise RuntimeError("Semantic index not available")
+
+        if data_source is None:
+            data_sources = self._semantic_index.data_sources
+            if len(data_sources) != 1:
+                raise ValueError(f"data_source is required when several indexes are loaded: {data_sources}")
+            data_source = data_sources[0]
+
+        index = self._semantic_index.get(data_source)
+        if index is None:
+            raise ValueError(f"Unknown data_source: {data_source}")
+
+        if feature_id is not None:
+            query = index.vector_of(feature_id)
+            if query is None:
+                raise ValueError(f"Feature {feature_id} not found in semantic index of {data_source}")
+        else:
+            query = np.asarray(vector, dtype=np.float32)
+
+        nprobe = max(1, min(nprobe or index.default_nprobe, index.nlist))
+        feature_ids, similarities = index.search(query, k, nprobe, exclude_id=feature_id)
+        return {
+            "data_source": data_source,
+            "query_feature_id": feature_id,
+            "nprobe": nprobe,
+            "results": [
+                {"feature_id": result_id, "similarity": similarity}
+                for result_id, similarity in zip(feature_ids.tolist(), similarities.tolist())
+            ]
+        }
+
+    async def get_feature_rows(
+        self,
+        feature_ids: List[int],
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None
+    ) -> pl.DataFrame:
+        """
+        Get the master rows for many feature ids with one indexed gather.
 
-        return combined_condition
+        Rows are returned in primary key order, restricted to the filter context and
+        optionally projected to the given columns.
+        """
+        if not self.is_ready():
+            raise RuntimeError("DataService not ready")
+
+        return self._feature_index.gather(feature_ids, self._key_filters(filters), columns)
+
+    @staticmethod
+    def _key_filters(filters: Optional[Filters]) -> Dict[str, Optional[List[str]]]:
+        """Feature index key filters for a filter context."""
+        if filters is None:
+            return {}
+        return {
+            COL_SAE_ID: filters.sae_id,
+            COL_EXPLANATION_METHOD: filters.explanation_method,
+            COL_LLM_EXPLAINER: filters.llm_explainer,
+            COL_LLM_SCORER: filters.llm_scorer
+        }
+
+    async def get_features_batch(
+        self,
+        feature_ids: List[int],
+        filters: Filters,
+        columns: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 1000
+    ) -> FeatureBatchResponse:
+        """Get one page of master rows for many feature ids as a columnar response."""
+        page, pagination = await self.get_features_batch_table(
+            feature_ids, filters, columns, offset, limit
+        )
+        return FeatureBatchResponse(columns=page.to_dict(as_series=False), **pagination)
+
+    async def get_features_batch_table(
+        self,
+        feature_ids: List[int],
+        filters: Filters,
+        columns: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 1000
+    ) -> Tuple[pl.DataFrame, Dict[str, Any]]:
+        """
+        Get one page of master rows for many feature ids as a table.
+
+        Returns the page and a dict with total_rows, offset, limit, next_offset and
+        missing_feature_ids. Row counts and missing ids come from the key index;
+        only the rows of the page are read.
+        """
+        if not self.is_ready():
+            raise RuntimeError("DataService not ready")
+
+        if columns is not None:
+            unknown = [column for column in columns if column not in self._feature_index.columns]
+            if unknown:
+                raise ValueError(f"Unknown columns: {unknown}")
+
+        try:
+            keys = self._feature_index.select_keys(feature_ids, self._key_filters(filters))
+
+            missing_ids = np.setdiff1d(
+                np.asarray(feature_ids, dtype=np.int64), keys.get_column(COL_FEATURE_ID).to_numpy()
+            ).tolist()
+
+            page = self._feature_index.fetch(keys.slice(offset, limit), columns)
+
+            total_rows = len(keys)
+            pagination = {
+                "total_rows": total_rows,
+                "offset": offset,
+                "limit": limit,
+                "next_offset": offset + limit if offset + limit < total_rows else None,
+                "missing_feature_ids": missing_ids
+            }
+            return page, pagination
+
+        except Exception as e:
+            logger.error(f"Error retrieving feature batch: {e}")
+            raise
 
     def _build_feature_response(self, row: Dict[str, Any]) -> FeatureResponse:
         """Build FeatureResponse from row data."""
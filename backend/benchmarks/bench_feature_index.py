@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark FeatureIndex point and bulk lookups against a full scan.
+
+Writes the synthetic master table of bench_parquet_layout.py in its default
+layout and times, for the same feature ids, a lazy scan -> filter -> collect of
+the master file (what a lookup costs without the index), FeatureIndex.get /
+gather with all columns resident, and the same with only the key columns
+resident (max_resident_bytes=0), where each lookup still decodes the file.
+
+Usage:
+    python benchmarks/bench_feature_index.py [--features N] [--explainers N] [--repeats N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.services.feature_index import DEFAULT_MAX_RESIDENT_BYTES, FeatureIndex  # noqa: E402
+from bench_parquet_layout import build_master_frame, write_layout  # noqa: E402
+
+pl.enable_string_cache()
+
+
+def time_ms(fn, repeats: int) -> float:
+    """Median wall time (ms) of fn()."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FeatureIndex lookups")
+    parser.add_argument("--features", type=int, default=131072, help="Features per SAE")
+    parser.add_argument("--saes", type=int, default=2, help="Number of SAEs")
+    parser.add_argument("--explainers", type=int, default=2, help="Number of LLM explainers")
+    parser.add_argument("--batch", type=int, default=1000, help="Feature ids per gather")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed repetitions per lookup")
+    args = parser.parse_args()
+
+    df = build_master_frame(args.features, args.saes, args.explainers)
+    print(f"Synthetic master table: {len(df):,} rows")
+    rng = np.random.default_rng(1)
+    point_id = int(rng.integers(args.features))
+    batch_ids = rng.choice(args.features, size=args.batch, replace=False).tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        master_file = write_layout(df, Path(tmp), optimized=False)
+        scan = pl.scan_parquet(master_file)
+        results = {
+            "full scan": (
+                time_ms(lambda: scan.filter(pl.col("feature_id") == point_id).collect(), args.repeats),
+                time_ms(lambda: scan.filter(pl.col("feature_id").is_in(batch_ids)).collect(), args.repeats),
+            )
+        }
+        for name, max_resident_bytes in [("resident", DEFAULT_MAX_RESIDENT_BYTES), ("key-only", 0)]:
+            start = time.perf_counter()
+            index = FeatureIndex.build([master_file], max_resident_bytes)
+            print(f"{name:>10}: built in {(time.perf_counter() - start) * 1000:.0f} ms")
+            results[name] = (
+                time_ms(lambda: index.get(point_id), args.repeats),
+                time_ms(lambda: index.gather(batch_ids), args.repeats),
+            )
+
+    print(f"\n{'lookup':<12}{'get (1 id)':>16}{f'gather ({args.batch} ids)':>22}")
+    for name, (get_ms, gather_ms) in results.items():
+        print(f"{name:<12}{get_ms:>13.2f} ms{gather_ms:>19.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fast JSON response path against response_model validation.
+
+Builds Sankey payloads shaped like sankey_response.json (leaf nodes carrying
+feature_ids lists sized from their feature_count), scaled up to larger SAEs, and
+an equally scaled grouped histogram. Each payload is served end to end through a
+FastAPI app twice: once as a pydantic model validated and encoded via
+response_model (the previous path), and once as the pre-built dict returned in
+a FastJSONResponse.
+
+Usage:
+    python benchmarks/bench_json_responses.py [--scales 1 10 100] [--repeats N]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.api import json_response  # noqa: E402
+from app.api.json_response import FastJSONResponse  # noqa: E402
+from app.models.responses import SankeyResponse, HistogramResponse  # noqa: E402
+
+SANKEY_RESPONSE_PATH = Path(__file__).resolve().parent.parent.parent / "sankey_response.json"
+
+
+def build_sankey_payload(scale: int) -> dict:
+    """Scale sankey_response.json and give every leaf node its feature_ids list."""
+    with open(SANKEY_RESPONSE_PATH, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    parents = {link["source"] for link in payload["links"]}
+    next_id = 0
+    for node in payload["nodes"]:
+        node["feature_count"] *= scale
+        if node["id"] not in parents and node["feature_count"] > 0:
+            node["feature_ids"] = list(range(next_id, next_id + node["feature_count"]))
+            next_id += node["feature_count"]
+        else:
+            node["feature_ids"] = None
+        node["feature_ids_encoded"] = None
+    for link in payload["links"]:
+        link["value"] *= scale
+    payload["metadata"]["total_features"] = next_id
+    return payload
+
+
+def build_histogram_payload(scale: int, groups: int = 4) -> dict:
+    """Grouped histogram with 50 * scale bins per group."""
+    rng = np.random.default_rng(0)
+    bins = 50 * scale
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    stats = {"min": 0.0, "max": 1.0, "mean": 0.5, "median": 0.5, "std": 0.29}
+
+    def histogram(counts):
+        return {"bins": centers.tolist(), "counts": counts, "bin_edges": edges.tolist()}
+
+    return {
+        "metric": "semdist_mean",
+        "histogram": histogram([0] * bins),
+        "statistics": stats,
+        "total_features": 1000 * scale,
+        "grouped_data": [
+            {
+                "group_value": f"explainer-{g}",
+                "histogram": histogram(rng.integers(0, 100, bins).tolist()),
+                "statistics": stats,
+                "total_features": 250 * scale
+            }
+            for g in range(groups)
+        ]
+    }
+
+
+def build_app(sankey: dict, histogram: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated/sankey", response_model=SankeyResponse)
+    async def validated_sankey():
+        return SankeyResponse(**sankey)
+
+    @app.get("/fast/sankey", response_model=SankeyResponse)
+    async def fast_sankey():
+        return FastJSONResponse(sankey)
+
+    @app.get("/validated/histogram", response_model=HistogramResponse)
+    async def validated_histogram():
+        return HistogramResponse(**histogram)
+
+    @app.get("/fast/histogram", response_model=HistogramResponse)
+    async def fast_histogram():
+        return FastJSONResponse(histogram)
+
+    return app
+
+
+def time_endpoint(client: TestClient, path: str, repeats: int):
+    """Median end-to-end latency (ms) and body size of a GET request."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return float(np.median(timings)), len(response.content), response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast JSON responses")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="Payload scale factors relative to sankey_response.json")
+    parser.add_argument("--repeats", type=int, default=7, help="Timed requests per endpoint")
+    args = parser.parse_args()
+
+    encoder = "orjson" if json_response.orjson is not None else "json (orjson not installed)"
+    print(f"Fast path encoder: {encoder}\n")
+    print(f"{'payload':<18}{'size':>10}{'validated':>14}{'fast':>12}{'speedup':>10}")
+
+    for scale in args.scales:
+        sankey = build_sankey_payload(scale)
+        histogram = build_histogram_payload(scale)
+        with TestClient(build_app(sankey, histogram)) as client:
+            for kind in ["sankey", "histogram"]:
+                validated_ms, size, validated_body = time_endpoint(client, f"/validated/{kind}", args.repeats)
+                fast_ms, _, fast_body = time_endpoint(client, f"/fast/{kind}", args.repeats)
+                if validated_body != fast_body:
+                    print(f"warning: {kind} x{scale} bodies differ between paths")
+                print(
+                    f"{kind + ' x' + str(scale):<18}{size / 1024:>8.0f}KB"
+                    f"{validated_ms:>11.1f} ms{fast_ms:>9.1f} ms{validated_ms / fast_ms:>9.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark master parquet layouts for DataService filter queries.
+
+Generates a synthetic master table, writes it once in feature-major order with
+default writer settings (the default layout of create_master_parquet.py) and
+once in the opt-in layout of create_master_parquet.py --sort (sorted by filter
+columns and feature_id, bounded row groups, column statistics), then times the
+lazy scan -> filter -> collect path that DataService uses for each query.
+
+At 655k rows the sorted layout is not faster and the file is larger, which is
+why create_master_parquet.py only sorts when asked to.
+
+Usage:
+    python benchmarks/bench_parquet_layout.py [--features N] [--explainers N] [--repeats N]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.common import Filters  # noqa: E402
+from app.services.visualization_service import DataService  # noqa: E402
+
+SORT_BY = ["sae_id", "explanation_method", "llm_explainer", "llm_scorer", "feature_id"]
+ROW_GROUP_SIZE = 16384
+
+
+def build_master_frame(n_features: int, n_saes: int, n_explainers: int, seed: int = 0) -> pl.DataFrame:
+    """Build a synthetic master table in feature-major (file glob) order."""
+    rng = np.random.default_rng(seed)
+    combos = [(s, e) for s in range(n_saes) for e in range(n_explainers)]
+    n_rows = n_features * len(combos)
+
+    feature_ids = np.repeat(np.arange(n_features, dtype=np.uint32), len(combos))
+    sae_idx = np.tile([s for s, _ in combos], n_features)
+    explainer_idx = np.tile([e for _, e in combos], n_features)
+
+    df = pl.DataFrame({
+        "feature_id": feature_ids,
+        "sae_id": [f"sae/layer_{i}" for i in sae_idx],
+        "explanation_method": ["quantiles"] * n_rows,
+        "llm_explainer": [f"explainer-{i}" for i in explainer_idx],
+        "llm_scorer": ["scorer-0"] * n_rows,
+        "feature_splitting": rng.random(n_rows, dtype=np.float32),
+        "semdist_mean": rng.random(n_rows, dtype=np.float32),
+        "semdist_max": rng.random(n_rows, dtype=np.float32),
+        "score_fuzz": rng.random(n_rows, dtype=np.float32),
+        "score_simulation": rng.random(n_rows, dtype=np.float32),
+        "score_detection": rng.random(n_rows, dtype=np.float32),
+        "score_embedding": rng.random(n_rows, dtype=np.float32),
+        "details_path": [f"data/detailed_json/sae/feature_{i}.json" for i in feature_ids],
+    })
+    return df.with_columns([
+        pl.col(col).cast(pl.Categorical)
+        for col in ["sae_id", "explanation_method", "llm_explainer", "llm_scorer"]
+    ])
+
+
+def write_layout(df: pl.DataFrame, data_dir: Path, optimized: bool) -> Path:
+    """Write the master parquet for one layout under data_dir/master/."""
+    output = data_dir / "master" / "feature_analysis.parquet"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if optimized:
+        df.sort(SORT_BY).write_parquet(output, statistics=True, row_group_size=ROW_GROUP_SIZE)
+    else:
+        df.write_parquet(output)
+    return output
+
+
+def time_query(service: DataService, filters: Filters, metric_range, repeats: int) -> float:
+    """Median wall time (ms) of DataService's filter path plus a metric range predicate."""
+    metric, low, high = metric_range
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        lazy_df = service._apply_filters(service._scan_for_filters(filters), filters)
+        lazy_df.filter(pl.col(metric).is_between(low, high)).collect()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+async def run(args):
+    df = build_master_frame(args.features, args.saes, args.explainers)
+    print(f"Synthetic master table: {len(df):,} rows")
+
+    queries = {
+        "one SAE": (Filters(sae_id=["sae/layer_0"]), ("score_fuzz", 0.0, 1.0)),
+        "one SAE + explainer": (
+            Filters(sae_id=["sae/layer_0"], llm_explainer=["explainer-1"]), ("score_fuzz", 0.0, 1.0)
+        ),
+        "one SAE + explainer + range": (
+            Filters(sae_id=["sae/layer_0"], llm_explainer=["explainer-1"]), ("semdist_mean", 0.2, 0.3)
+        ),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, optimized in [("default", False), ("sorted (--sort)", True)]:
+            data_dir = Path(tmp) / name.replace(" ", "_")
+            output = write_layout(df, data_dir, optimized)
+            service = DataService(str(data_dir))
+            await service.initialize()
+            results[name] = {
+                query: time_query(service, filters, metric_range, args.repeats)
+                for query, (filters, metric_range) in queries.items()
+            }
+            print(f"{name:>22}: {output.stat().st_size / 1e6:.1f} MB")
+
+    print(f"\n{'query':<30}" + "".join(f"{name:>22}" for name in results))
+    for query in queries:
+        print(f"{query:<30}" + "".join(f"{results[name][query]:>19.1f} ms" for name in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark master parquet layouts")
+    parser.add_argument("--features", type=int, default=131072, help="Features per SAE")
+    parser.add_argument("--saes", type=int, default=2, help="Number of SAEs")
+    parser.add_argument("--explainers", type=int, default=5, help="Number of LLM explainers")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per query")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
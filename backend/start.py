@@ -36,6 +36,11 @@ def check_data_files():
     """Check if required data files exist"""
     data_path = Path("../data")
     master_file = data_path / "master" / "feature_analysis.parquet"
+    dataset_manifest = data_path / "master" / "feature_analysis" / "_dataset.json"
+
+    if dataset_manifest.exists():
+        print(f"✅ Found partitioned master dataset: {dataset_manifest.parent}")
+        return True
 
     if not master_file.exists():
         print(f"⚠️  Warning: Master data file not found at {master_file}")
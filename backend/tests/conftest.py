@@ -0,0 +1,63 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+# Make the backend `app` package importable when pytest runs from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+N_FEATURES = 20
+EXPLAINERS = ["explainer-a", "explainer-b"]
+SAE_ID = "test/sae"
+
+
+@pytest.fixture
+def master_frame():
+    """Tiny master table: every feature has one row per explainer."""
+    rows = N_FEATURES * len(EXPLAINERS)
+    rng = np.random.default_rng(0)
+    return pl.DataFrame({
+        "feature_id": np.tile(np.arange(N_FEATURES, dtype=np.uint32), len(EXPLAINERS)),
+        "sae_id": [SAE_ID] * rows,
+        "explanation_method": ["quantiles"] * rows,
+        "llm_explainer": np.repeat(EXPLAINERS, N_FEATURES),
+        "llm_scorer": ["scorer"] * rows,
+        "feature_splitting": rng.random(rows, dtype=np.float32),
+        "semdist_mean": rng.random(rows, dtype=np.float32),
+        "semdist_max": rng.random(rows, dtype=np.float32),
+        "score_fuzz": rng.random(rows, dtype=np.float32),
+        "score_simulation": rng.random(rows, dtype=np.float32),
+        "score_detection": rng.random(rows, dtype=np.float32),
+        "score_embedding": rng.random(rows, dtype=np.float32),
+        "details_path": [f"detailed_json/feature_{i}.json" for i in range(rows)],
+    }).with_columns([
+        pl.col(column).cast(pl.Categorical)
+        for column in ["sae_id", "explanation_method", "llm_explainer", "llm_scorer"]
+    ])
+
+
+@pytest.fixture
+def data_service(tmp_path, master_frame):
+    from app.services.visualization_service import DataService
+
+    master_dir = tmp_path / "master"
+    master_dir.mkdir()
+    master_frame.write_parquet(master_dir / "feature_analysis.parquet")
+
+    service = DataService(str(tmp_path))
+    asyncio.run(service.initialize())
+    return service
+
+
+@pytest.fixture
+def client(data_service, monkeypatch):
+    """Test client for the API app serving the tiny dataset (startup is not run)."""
+    from fastapi.testclient import TestClient
+
+    import app.main
+
+    monkeypatch.setattr(app.main, "data_service", data_service)
+    return TestClient(app.main.app)
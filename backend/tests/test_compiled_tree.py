@@ -0,0 +1,188 @@
+import random
+
+import numpy as np
+import polars as pl
+import pytest
+
+from app.models.threshold import ThresholdStructure
+from app.services.compiled_tree import CompiledThresholdTree
+from app.services.rule_evaluators import SplitEvaluator
+
+METRICS = ["m_a", "m_b", "m_c", "s_d"]
+OPERATORS = [">", ">=", "<", "<=", "==", "!="]
+CATEGORIES = ["feature_splitting", "semantic_distance", "score_agreement"]
+
+
+class RandomTrees:
+    """Random threshold structures and metric tables from a seeded generator."""
+
+    def __init__(self, seed, rule_types=("range", "pattern", "expression")):
+        self.rng = random.Random(seed)
+        self.rule_types = list(rule_types)
+
+    def value(self):
+        r = self.rng.random()
+        if r < 0.1:
+            return None
+        if r < 0.15:
+            return float("nan")
+        if r < 0.35:
+            # Values on and next to the thresholds used below
+            return self.rng.choice([
+                0.0, 0.5, 1.0, -0.5, 0.25, 0.75, 1.5,
+                float(np.nextafter(0.5, 1)), float(np.nextafter(1.0, 2)), float("inf")
+            ])
+        return round(self.rng.uniform(-1, 2), 3)
+
+    def frame(self, n_rows, columns):
+        data = {m: [self.value() for _ in range(n_rows)] for m in columns}
+        data["feature_id"] = list(range(n_rows))
+        return pl.DataFrame(data, schema={**{m: pl.Float64 for m in columns}, "feature_id": pl.Int64})
+
+    def comparison(self):
+        rng = self.rng
+        metric = rng.choice(METRICS + ["missing_col"])
+        if rng.random() < 0.15:
+            return metric
+        expr = f"{metric} {rng.choice(OPERATORS)} {rng.choice(['0.5', '0', '1.0', rng.choice(METRICS)])}"
+        if rng.random() < 0.15:
+            expr += f" < {rng.choice(['1.5', rng.choice(METRICS)])}"
+        return expr
+
+    def expression(self, depth=0):
+        rng = self.rng
+        if depth > 2 or rng.random() < 0.4:
+            return self.comparison()
+        r = rng.random()
+        if r < 0.4:
+            return f"({self.expression(depth + 1)}) && ({self.expression(depth + 1)})"
+        if r < 0.8:
+            return f"({self.expression(depth + 1)}) || {self.expression(depth + 1)}"
+        return f"!({self.expression(depth + 1)})"
+
+    def split_rule(self, node_id):
+        rng = self.rng
+        rule_type = rng.choice(self.rule_types)
+        if rule_type == "range":
+            thresholds = sorted(rng.sample([-0.5, 0.0, 0.25, 0.5, 0.75, 1.0, 1.5], rng.randint(1, 3)))
+            children = [f"{node_id}_r{i}" for i in range(len(thresholds) + 1)]
+            rule = {"type": "range", "metric": rng.choice(METRICS + ["missing_col"]), "thresholds": thresholds}
+        elif rule_type == "pattern":
+            conditions = {}
+            for metric in rng.sample(METRICS + ["missing_col"], rng.randint(1, 3)):
+                r = rng.random()
+                if r < 0.5:
+                    conditions[metric] = {"threshold": 0.5}
+                elif r < 0.75:
+                    conditions[metric] = {"min": 0.0, "max": 1.0}
+                else:
+                    conditions[metric] = {"operator": rng.choice(OPERATORS), "value": 0.5}
+            patterns, children = [], []
+            for i in range(rng.randint(1, 3)):
+                keys = rng.sample(list(conditions) + ["other"], rng.randint(1, len(conditions)))
+                match = {m: rng.choice(["high", "low", "in_range", "out_range", None]) for m in keys}
+                patterns.append({"match": match, "child_id": f"p{i}", "description": None})
+                children.append(f"{node_id}_p{i}")
+            default = rng.choice([None, "others"])
+            if default:
+                children.append(f"{node_id}_{default}")
+            rule = {"type": "pattern", "conditions": conditions, "patterns": patterns, "default_child_id": default}
+        else:
+            branches = [
+                {"condition": self.expression(), "child_id": f"{node_id}_e{i}", "description": None}
+                for i in range(rng.randint(1, 3))
+            ]
+            children = [branch["child_id"] for branch in branches] + [f"{node_id}_others"]
+            rule = {
+                "type": "expression",
+                "available_metrics": rng.choice([METRICS, METRICS[:2], None]),
+                "branches": branches,
+                "default_child_id": f"{node_id}_others"
+            }
+        return rule_type, rule, children
+
+    def structure(self):
+        nodes = []
+
+        def add(node_id, stage, parent_path):
+            node = {
+                "id": node_id,
+                "stage": stage,
+                "category": self.rng.choice(CATEGORIES) if stage else "root",
+                "parent_path": parent_path,
+                "children_ids": []
+            }
+            nodes.append(node)
+            if stage >= 3 or (stage > 0 and self.rng.random() < 0.25):
+                return
+            rule_type, node["split_rule"], node["children_ids"] = self.split_rule(node_id)
+            for branch_index, child_id in enumerate(node["children_ids"]):
+                step = {"parent_id": node_id, "parent_split_rule": {"type": rule_type}, "branch_index": branch_index}
+                add(child_id, stage + 1, parent_path + [step])
+
+        add("root", 0, [])
+        return ThresholdStructure(nodes=nodes, metrics=METRICS)
+
+
+def rowwise_paths(structure, df, max_stage=None):
+    """Reference classification: SplitEvaluator on one row at a time."""
+    evaluator = SplitEvaluator()
+    nodes_by_id = {node.id: node for node in structure.nodes}
+    paths = []
+    for row in df.to_dicts():
+        node = structure.get_root()
+        path = [node.id]
+        while node.split_rule is not None and (max_stage is None or node.stage < max_stage):
+            child_id = evaluator.evaluate(row, node.split_rule, node.children_ids).child_id
+            if child_id not in nodes_by_id:
+                break
+            node = nodes_by_id[child_id]
+            path.append(node.id)
+        paths.append(path)
+    return paths
+
+
+def compiled_paths(tree, df, max_stage=None):
+    return [[tree.node_ids[i] for i in path if i >= 0] for path in tree.traverse(df, max_stage=max_stage)]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_compiled_tree_matches_split_evaluator(seed):
+    trees = RandomTrees(seed)
+    structure = trees.structure()
+    df = trees.frame(200, METRICS)
+    tree = CompiledThresholdTree(structure)
+    for max_stage in (None, 1, 2):
+        assert compiled_paths(tree, df, max_stage) == rowwise_paths(structure, df, max_stage)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_decision_table_matches_split_evaluator(seed):
+    trees = RandomTrees(seed, rule_types=("range", "pattern"))
+    structure = trees.structure()
+    columns = trees.rng.sample(METRICS, trees.rng.randint(2, 4))
+    df = trees.frame(300, columns)
+    tree = CompiledThresholdTree(structure)
+    assert compiled_paths(tree, df) == rowwise_paths(structure, df)
+
+
+def test_interval_only_tree_uses_decision_table():
+    structure = ThresholdStructure(metrics=["m_a", "m_b"], nodes=[
+        {
+            "id": "root", "stage": 0, "category": "root", "parent_path": [],
+            "split_rule": {"type": "range", "metric": "m_a", "thresholds": [0.5]},
+            "children_ids": ["low", "high"]
+        },
+        {
+            "id": "low", "stage": 1, "category": "feature_splitting", "children_ids": [],
+            "parent_path": [{"parent_id": "root", "parent_split_rule": {"type": "range"}, "branch_index": 0}]
+        },
+        {
+            "id": "high", "stage": 1, "category": "feature_splitting", "children_ids": [],
+            "parent_path": [{"parent_id": "root", "parent_split_rule": {"type": "range"}, "branch_index": 1}]
+        }
+    ])
+    df = pl.DataFrame({"m_a": [0.1, 0.5, 0.9, None], "m_b": [0.0] * 4, "feature_id": [0, 1, 2, 3]})
+    tree = CompiledThresholdTree(structure)
+    assert compiled_paths(tree, df) == rowwise_paths(structure, df)
+    assert any(table is not None for table in tree._decision_tables.values())
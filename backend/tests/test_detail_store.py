@@ -0,0 +1,154 @@
+import json
+import os
+
+import numpy as np
+
+from app.services.detail_store import DetailStore, PACK_DATA_FILENAME, PACK_INDEX_FILENAME
+
+SAE_ID = "test/sae"
+SAE_DIR = "test--sae"
+
+# Same layout as generate_detailed_json.py --pack
+PACK_INDEX_DTYPE = np.dtype([("feature_id", "<u4"), ("offset", "<u8"), ("length", "<u4")])
+
+
+def write_pack(directory, documents, suffix=""):
+    """Write a packed store for {feature_id: document}; suffix writes it under temporary names."""
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = []
+    offset = 0
+    with open(directory / (PACK_DATA_FILENAME + suffix), "wb") as f:
+        for feature_id in sorted(documents):
+            line = json.dumps(documents[feature_id]).encode()
+            f.write(line + b"\n")
+            entries.append((feature_id, offset, len(line)))
+            offset += len(line) + 1
+    with open(directory / (PACK_INDEX_FILENAME + suffix), "wb") as f:
+        np.save(f, np.array(entries, dtype=PACK_INDEX_DTYPE))
+
+
+def replace_pack(directory, documents):
+    """Rewrite a packed store the way a rebuild would, swapping the files in with os.replace."""
+    write_pack(directory, documents, suffix=".tmp")
+    for filename in (PACK_DATA_FILENAME, PACK_INDEX_FILENAME):
+        os.replace(directory / (filename + ".tmp"), directory / filename)
+
+
+def test_replaced_store_is_reopened(tmp_path):
+    write_pack(tmp_path / SAE_DIR, {1: {"version": 1}})
+    store = DetailStore(tmp_path)
+    assert store.get(SAE_ID, 1) == {"version": 1}
+
+    replace_pack(tmp_path / SAE_DIR, {1: {"version": 2}, 2: {"version": 2}})
+    assert store.get(SAE_ID, 1) == {"version": 2}
+    assert store.get(SAE_ID, 2) == {"version": 2}
+
+
+def test_store_written_after_a_miss_is_opened(tmp_path):
+    store = DetailStore(tmp_path)
+    assert store.get(SAE_ID, 1) is None
+
+    write_pack(tmp_path / SAE_DIR, {1: {"version": 1}})
+    assert store.get(SAE_ID, 1) == {"version": 1}
+
+
+def test_packed_lookups(tmp_path):
+    documents = {feature_id: {"feature_id": feature_id} for feature_id in (0, 2, 5)}
+    write_pack(tmp_path / SAE_DIR, documents)
+    store = DetailStore(tmp_path)
+
+    for feature_id, document in documents.items():
+        assert json.loads(store.get_raw(SAE_ID, feature_id)) == document
+        assert store.get(SAE_ID, feature_id) == document
+    assert store.get(SAE_ID, 3) is None
+    assert store.get(SAE_ID, 99) is None
+    assert store.get("other/sae", 0) is None
+
+
+def test_falls_back_to_feature_files(tmp_path):
+    detailed_json_dir = tmp_path / "data" / "detailed_json"
+    write_pack(detailed_json_dir / SAE_DIR, {0: {"source": "pack"}})
+    (detailed_json_dir / SAE_DIR / "feature_1.json").write_text(json.dumps({"source": "file"}))
+    elsewhere = tmp_path / "exports" / "feature_2.json"
+    elsewhere.parent.mkdir()
+    elsewhere.write_text(json.dumps({"source": "details_path"}))
+    store = DetailStore(detailed_json_dir)
+
+    assert store.get(SAE_ID, 0) == {"source": "pack"}
+    assert store.get(SAE_ID, 1) == {"source": "file"}
+    # details_path is relative to the project root, two levels above detailed_json/
+    assert store.get(SAE_ID, 2, details_path="exports/feature_2.json") == {"source": "details_path"}
+    assert store.get(SAE_ID, 3, details_path="exports/feature_3.json") is None
+
+
+def test_cache_evicts_least_recently_used_by_size(tmp_path):
+    documents = {feature_id: {"padding": "x" * 80} for feature_id in range(4)}
+    write_pack(tmp_path / SAE_DIR, documents)
+    document_size = len(json.dumps(documents[0]))
+    store = DetailStore(tmp_path, cache_max_bytes=3 * document_size)
+
+    for feature_id in range(3):
+        store.get(SAE_ID, feature_id)
+    store.get(SAE_ID, 0)  # 1 is now least recently used
+    store.get(SAE_ID, 3)
+
+    stats = store.cache_stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 3 * document_size
+    hits = stats["hits"]
+    store.get(SAE_ID, 0)
+    store.get(SAE_ID, 1)
+    assert store.cache_stats()["hits"] == hits + 1
+
+
+def test_oversized_documents_are_not_cached(tmp_path):
+    write_pack(tmp_path / SAE_DIR, {0: {"padding": "x" * 80}})
+    store = DetailStore(tmp_path, cache_max_bytes=10)
+
+    assert store.get(SAE_ID, 0) == {"padding": "x" * 80}
+    assert store.cache_stats()["entries"] == 0
+
+
+def test_prefetch_skips_cached_and_missing_ids(tmp_path):
+    # Feature 4 is missing; 0..6 exist otherwise
+    write_pack(tmp_path / SAE_DIR, {feature_id: {"feature_id": feature_id} for feature_id in (0, 1, 2, 3, 5, 6)})
+    store = DetailStore(tmp_path, prefetch_radius=2)
+    store.get(SAE_ID, 2)
+
+    # Neighbours of 3 within 2 ids: 1, 2 (cached), 4 (missing), 5
+    assert store.prefetch(SAE_ID, 3) == 2
+    assert store.cache_stats()["entries"] == 3
+    # Everything within reach is now cached or missing
+    assert store.prefetch(SAE_ID, 3) == 0
+
+    misses = store.cache_stats()["misses"]
+    assert store.get(SAE_ID, 5) == {"feature_id": 5}
+    assert store.cache_stats()["misses"] == misses
+
+
+def test_prefetch_stops_at_feature_zero(tmp_path):
+    write_pack(tmp_path / SAE_DIR, {feature_id: {"feature_id": feature_id} for feature_id in range(3)})
+    store = DetailStore(tmp_path)
+
+    assert store.prefetch(SAE_ID, 0, radius=1) == 1
+    assert store.cache_stats()["entries"] == 1
+
+
+def test_version_changes_when_the_store_changes(tmp_path):
+    store = DetailStore(tmp_path)
+    empty = store.version()
+
+    write_pack(tmp_path / SAE_DIR, {1: {"version": 1}})
+    written = store.version()
+    assert written != empty
+
+    replace_pack(tmp_path / SAE_DIR, {1: {"version": 2}})
+    assert store.version() != written
+
+
+def test_data_version_follows_the_detail_store(data_service, tmp_path):
+    version = data_service.data_version
+    assert version is not None
+
+    write_pack(tmp_path / "detailed_json" / SAE_DIR, {1: {"version": 1}})
+    assert data_service.data_version != version
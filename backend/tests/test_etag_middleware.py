@@ -0,0 +1,95 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.middleware import REQUEST_HASH_STATE_KEY, ETagMiddleware, requests_cursor
+
+
+def make_client(version="v1"):
+    app = FastAPI()
+    calls = []
+
+    @app.post("/api/sankey-data")
+    async def sankey(body: dict):
+        calls.append(body)
+        return {"ok": True}
+
+    @app.get("/api/sankey-data/feature-ids/{cursor}")
+    async def feature_ids(cursor: str):
+        calls.append(cursor)
+        return {"cursor": cursor}
+
+    app.add_middleware(ETagMiddleware, version_provider=lambda: version)
+    return TestClient(app), calls
+
+
+def test_matching_etag_returns_304_without_running_endpoint():
+    client, calls = make_client()
+    first = client.post("/api/sankey-data", json={"filters": {}, "b": 1})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+
+    # Key order does not change the canonical request
+    second = client.post("/api/sankey-data", json={"b": 1, "filters": {}}, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert len(calls) == 1
+
+
+def test_etag_changes_with_data_version():
+    client_v1, _ = make_client("v1")
+    client_v2, _ = make_client("v2")
+    body = {"filters": {}}
+    assert (
+        client_v1.post("/api/sankey-data", json=body).headers["etag"]
+        != client_v2.post("/api/sankey-data", json=body).headers["etag"]
+    )
+
+
+def test_wildcard_and_foreign_tags_do_not_match():
+    client, calls = make_client()
+    for header in ("*", 'W/"not-the-tag"'):
+        response = client.post("/api/sankey-data", json={}, headers={"If-None-Match": header})
+        assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_cursor_requests_are_not_tagged():
+    client, calls = make_client()
+    body = {"featureIdEncoding": "cursor"}
+    first = client.post("/api/sankey-data", json=body)
+    assert first.status_code == 200
+    assert "etag" not in first.headers
+
+    page = client.get("/api/sankey-data/feature-ids/abc")
+    assert page.status_code == 200
+    assert "etag" not in page.headers
+
+    again = client.get("/api/sankey-data/feature-ids/abc", headers={"If-None-Match": "*"})
+    assert again.status_code == 200
+    assert len(calls) == 3
+
+
+def test_requests_cursor_finds_nested_comparison_encodings():
+    assert requests_cursor({"sankey_left": {}, "sankey_right": {"featureIdEncoding": "cursor"}})
+    assert requests_cursor([{"featureIdEncoding": "cursor"}])
+    assert not requests_cursor({"sankey_left": {"featureIdEncoding": "runs"}})
+    assert not requests_cursor(None)
+
+
+def test_request_hash_is_shared_with_the_endpoint():
+    app = FastAPI()
+    hashes = []
+
+    @app.post("/api/sankey-data")
+    async def sankey(request: Request):
+        hashes.append(getattr(request.state, REQUEST_HASH_STATE_KEY, None))
+        return {"ok": True}
+
+    app.add_middleware(ETagMiddleware, version_provider=lambda: "v1")
+    client = TestClient(app)
+    client.post("/api/sankey-data", json={"a": 1, "b": 2})
+    client.post("/api/sankey-data", json={"b": 2, "a": 1})
+    client.post("/api/sankey-data", json={"featureIdEncoding": "cursor"})
+
+    assert hashes[0] is not None and hashes[0] == hashes[1]
+    assert hashes[2] is None
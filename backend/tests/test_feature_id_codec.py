@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.feature_id_codec import (
+    decode_bitmap,
+    decode_runs,
+    encode_bitmap,
+    encode_runs,
+    encode_smallest,
+)
+
+
+def random_id_sets(seed=0):
+    rng = np.random.default_rng(seed)
+    yield np.array([], dtype=np.int64)
+    yield np.array([0])
+    yield np.array([7, 8, 9, 20])
+    yield np.arange(100, 5000)
+    for size in (1, 10, 500, 5000, 15000):
+        yield np.sort(rng.choice(16384, size, replace=False))
+
+
+def compact_json_size(value):
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+@pytest.mark.parametrize("ids", list(random_id_sets()))
+def test_runs_round_trip(ids):
+    assert decode_runs(encode_runs(ids)).tolist() == ids.tolist()
+
+
+@pytest.mark.parametrize("ids", list(random_id_sets()))
+def test_bitmap_round_trip(ids):
+    base, bitmap = encode_bitmap(ids)
+    assert decode_bitmap(base, bitmap).tolist() == ids.tolist()
+
+
+def test_runs_format():
+    assert encode_runs(np.array([3, 4, 10])) == [3, 2, 5, 1]
+
+
+@pytest.mark.parametrize("ids", [ids for ids in random_id_sets() if len(ids)])
+def test_encode_smallest_picks_the_shortest_payload(ids):
+    base, bitmap = encode_bitmap(ids)
+    sizes = {
+        "list": compact_json_size(ids.tolist()),
+        "runs": compact_json_size(encode_runs(ids)),
+        "bitmap": compact_json_size(bitmap) + len(str(base)),
+    }
+    encoding, payload = encode_smallest(ids)
+    assert sizes[encoding] == min(sizes.values())
+
+    if encoding == "list":
+        decoded = payload
+    elif encoding == "runs":
+        decoded = decode_runs(payload).tolist()
+    else:
+        decoded = decode_bitmap(*payload).tolist()
+    assert decoded == ids.tolist()
+
+
+def test_encode_smallest_falls_back_to_list_for_isolated_ids():
+    # One run per ID costs more than the list, and the range is too wide for a bitmap
+    ids = np.array([5, 100000, 200000])
+    assert encode_smallest(ids, preferred="runs") == ("list", [5, 100000, 200000])
+
+
+def test_encode_smallest_prefers_requested_encoding_on_ties():
+    ids = np.array([], dtype=np.int64)
+    assert encode_smallest(ids, preferred="runs")[0] == "runs"
@@ -0,0 +1,87 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from app.services.feature_index import DEFAULT_MAX_RESIDENT_BYTES, FeatureIndex
+
+pl.enable_string_cache()
+
+EXPLAINERS = ["explainer-a", "explainer-b"]
+
+
+@pytest.fixture
+def master(tmp_path):
+    """Tiny master table split into one file per explainer, rows in shuffled order."""
+    rng = np.random.default_rng(0)
+    n_features = 50
+    df = pl.DataFrame({
+        "feature_id": np.tile(np.arange(n_features, dtype=np.uint32), 2),
+        "sae_id": ["sae"] * (2 * n_features),
+        "explanation_method": ["quantiles"] * (2 * n_features),
+        "llm_explainer": np.repeat(EXPLAINERS, n_features),
+        "llm_scorer": ["scorer"] * (2 * n_features),
+        "score_fuzz": rng.random(2 * n_features),
+        "details_path": [f"feature_{i}.json" for i in range(2 * n_features)],
+    }).with_columns(pl.col("llm_explainer").cast(pl.Categorical)).sample(fraction=1.0, shuffle=True, seed=1)
+
+    paths = []
+    for explainer in EXPLAINERS:
+        path = tmp_path / f"{explainer}.parquet"
+        df.filter(pl.col("llm_explainer") == explainer).write_parquet(path)
+        paths.append(path)
+    return df, paths
+
+
+@pytest.fixture(params=[DEFAULT_MAX_RESIDENT_BYTES, 0], ids=["resident", "key-only"])
+def max_resident_bytes(request):
+    return request.param
+
+
+def expected_rows(df, feature_ids, explainers=EXPLAINERS):
+    return df.filter(
+        pl.col("feature_id").is_in(feature_ids) & pl.col("llm_explainer").is_in(explainers)
+    ).sort(["feature_id", "sae_id", "explanation_method", "llm_explainer", "llm_scorer"])
+
+
+def test_build_reads_keys_and_schema(master, max_resident_bytes):
+    df, paths = master
+    index = FeatureIndex.build(paths, max_resident_bytes)
+    assert len(index) == len(df)
+    assert index.num_features == 50
+    assert index.columns == df.columns
+    assert index.resident == (max_resident_bytes > 0)
+
+
+def test_get_matches_filtered_table(master, max_resident_bytes):
+    df, paths = master
+    index = FeatureIndex.build(paths, max_resident_bytes)
+    assert index.get(7).equals(expected_rows(df, [7]))
+    assert index.get(7, {"llm_explainer": "explainer-b"}).equals(
+        expected_rows(df, [7], ["explainer-b"])
+    )
+    assert len(index.get(7, {"llm_explainer": "missing"})) == 0
+    assert len(index.get(500)) == 0
+
+
+def test_gather_returns_rows_in_key_order(master, max_resident_bytes):
+    df, paths = master
+    index = FeatureIndex.build(paths, max_resident_bytes)
+    ids = [40, 3, 3, 17, 999]
+    assert index.gather(ids).equals(expected_rows(df, ids))
+
+    projected = index.gather(ids, {"llm_explainer": ["explainer-a"]}, ["feature_id", "details_path"])
+    assert projected.equals(expected_rows(df, ids, ["explainer-a"]).select(["feature_id", "details_path"]))
+
+    empty = index.gather([999], columns=["score_fuzz"])
+    assert empty.shape == (0, 1)
+    assert empty.schema == {"score_fuzz": pl.Float64}
+
+
+def test_resident_lookups_do_not_read_the_files(master):
+    df, paths = master
+    index = FeatureIndex.build(paths)
+    for path in paths:
+        path.unlink()
+
+    assert index.get(7).equals(expected_rows(df, [7]))
+    assert index.gather([40, 3]).equals(expected_rows(df, [40, 3]))
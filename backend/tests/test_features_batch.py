@@ -0,0 +1,95 @@
+import io
+import json
+
+import polars as pl
+
+from app.api.arrow_response import ARROW_METADATA_HEADER, ARROW_STREAM_MEDIA_TYPE
+
+
+def post_batch(client, **body):
+    return client.post("/api/features/batch", json=body)
+
+
+def test_pages_cover_all_rows_in_key_order(client):
+    feature_ids = [12, 3, 7, 3]
+    pages, offset = [], 0
+    while offset is not None:
+        response = post_batch(client, feature_ids=feature_ids, columns=["feature_id", "llm_explainer"],
+                              offset=offset, limit=4)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_rows"] == 6
+        assert body["limit"] == 4
+        pages.append(body["columns"])
+        offset = body["next_offset"]
+
+    assert len(pages) == 2
+    rows = [
+        (fid, explainer)
+        for page in pages
+        for fid, explainer in zip(page["feature_id"], page["llm_explainer"])
+    ]
+    assert rows == [(fid, e) for fid in (3, 7, 12) for e in ("explainer-a", "explainer-b")]
+
+
+def test_missing_feature_ids_are_reported(client):
+    body = post_batch(client, feature_ids=[1, 500, 2, 999]).json()
+    assert body["missing_feature_ids"] == [500, 999]
+    assert sorted(set(body["columns"]["feature_id"])) == [1, 2]
+    assert "details_path" in body["columns"]
+
+
+def test_filters_and_columns_restrict_the_page(client):
+    body = post_batch(
+        client,
+        feature_ids=[1, 2],
+        filters={"llm_explainer": ["explainer-b"]},
+        columns=["score_fuzz"]
+    ).json()
+    assert list(body["columns"]) == ["score_fuzz"]
+    assert body["total_rows"] == 2
+    assert body["next_offset"] is None
+    assert body["missing_feature_ids"] == []
+
+
+def test_offset_past_the_end_returns_an_empty_page(client):
+    body = post_batch(client, feature_ids=[1], offset=10).json()
+    assert body["total_rows"] == 2
+    assert body["columns"]["feature_id"] == []
+    assert body["next_offset"] is None
+
+
+def test_invalid_requests_are_rejected(client):
+    assert post_batch(client, feature_ids=[-1]).status_code == 400
+    response = post_batch(client, feature_ids=[1], columns=["nope"])
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_REQUEST"
+
+
+def test_only_the_page_window_is_fetched(client, data_service, monkeypatch):
+    index = data_service._feature_index
+    fetched = []
+    fetch = index.fetch
+
+    def recording_fetch(keys, columns=None):
+        fetched.append(len(keys))
+        return fetch(keys, columns)
+
+    monkeypatch.setattr(index, "fetch", recording_fetch)
+    body = post_batch(client, feature_ids=list(range(10)), offset=4, limit=3).json()
+    assert body["total_rows"] == 20
+    assert len(body["columns"]["feature_id"]) == 3
+    assert fetched == [3]
+
+
+def test_arrow_metadata_counts_missing_ids(client):
+    response = client.post(
+        "/api/features/batch",
+        json={"feature_ids": [1, 500, 999], "columns": ["feature_id"]},
+        headers={"Accept": ARROW_STREAM_MEDIA_TYPE}
+    )
+    assert response.status_code == 200
+    metadata = json.loads(response.headers[ARROW_METADATA_HEADER])
+    assert metadata["missing_feature_count"] == 2
+    assert "missing_feature_ids" not in metadata
+    assert pl.read_ipc_stream(io.BytesIO(response.content)).get_column("feature_id").to_list() == [1, 1]
@@ -0,0 +1,46 @@
+import numpy as np
+import polars as pl
+
+from app.services.neighbor_index import NeighborIndex
+
+
+def neighbor_table():
+    # Rows deliberately out of order; feature 2 of sae-a has no neighbors
+    return pl.DataFrame({
+        "sae_id": ["sae-a", "sae-a", "sae-a", "sae-a", "sae-b", "sae-a"],
+        "feature_id": [3, 0, 0, 3, 0, 0],
+        "neighbor_id": [1, 5, 7, 0, 9, 3],
+        "cosine_similarity": [0.2, 0.9, 0.5, 0.8, 0.4, 0.7],
+    }).with_columns(pl.col("sae_id").cast(pl.Categorical))
+
+
+def test_neighbors_come_back_most_similar_first():
+    index = NeighborIndex(neighbor_table())
+    assert index.sae_ids == ["sae-a", "sae-b"]
+
+    neighbor_ids, similarities = index.get("sae-a", 0)
+    assert neighbor_ids.tolist() == [5, 3, 7]
+    np.testing.assert_allclose(similarities, [0.9, 0.7, 0.5])
+    assert index.get("sae-a", 3)[0].tolist() == [0, 1]
+    assert index.get("sae-b", 0)[0].tolist() == [9]
+
+
+def test_k_truncates_neighbors():
+    index = NeighborIndex(neighbor_table())
+    assert index.get("sae-a", 0, k=2)[0].tolist() == [5, 3]
+    assert index.get("sae-a", 0, k=10)[0].tolist() == [5, 3, 7]
+
+
+def test_unknown_sae_and_features_have_no_neighbors():
+    index = NeighborIndex(neighbor_table())
+    assert index.get("sae-c", 0) is None
+    assert index.get("sae-a", 2) is None
+    assert index.get("sae-a", 4) is None
+    assert index.get("sae-a", -1) is None
+    assert index.get("sae-b", 3) is None
+
+
+def test_load_reads_the_parquet_table(tmp_path):
+    path = tmp_path / "feature_neighbors.parquet"
+    neighbor_table().write_parquet(path)
+    assert NeighborIndex.load(path).get("sae-a", 3)[0].tolist() == [0, 1]
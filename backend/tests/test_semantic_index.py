@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.semantic_index import IVFIndex, SemanticIndex
+
+
+def write_index(directory, vectors, latent_ids, n_lists, data_source="source-a"):
+    """Write an IVF index whose lists are contiguous slices of the given rows."""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    list_offsets = np.linspace(0, len(vectors), n_lists + 1).astype(np.int64)
+    centroids = np.stack([
+        vectors[start:stop].mean(axis=0) for start, stop in zip(list_offsets[:-1], list_offsets[1:])
+    ])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    directory.mkdir(parents=True)
+    np.save(directory / "centroids.npy", centroids.astype(np.float32))
+    np.save(directory / "vectors.npy", vectors.astype(np.float32))
+    np.save(directory / "latent_ids.npy", np.asarray(latent_ids, dtype=np.int64))
+    np.save(directory / "list_offsets.npy", list_offsets)
+    (directory / "index.json").write_text(json.dumps({"data_source": data_source, "default_nprobe": 2}))
+    return vectors
+
+
+@pytest.fixture
+def clustered(tmp_path):
+    """Four well separated clusters of eight vectors each, one list per cluster."""
+    rng = np.random.default_rng(0)
+    centers = np.eye(4, 6) * 10
+    raw = np.concatenate([center + rng.normal(size=(8, 6)) for center in centers])
+    latent_ids = np.arange(100, 132)
+    vectors = write_index(tmp_path / "source-a", raw, latent_ids, n_lists=4)
+    return tmp_path, vectors, latent_ids
+
+
+def test_search_with_all_lists_is_exact(clustered):
+    root, vectors, latent_ids = clustered
+    index = IVFIndex(root / "source-a")
+    assert (len(index), index.nlist, index.embedding_dim, index.default_nprobe) == (32, 4, 6, 2)
+
+    query = vectors[5] + 0.01
+    ids, scores = index.search(query, k=5, nprobe=4)
+    expected = np.argsort(-(vectors @ (query / np.linalg.norm(query))), kind="stable")[:5]
+    assert ids.tolist() == latent_ids[expected].tolist()
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_probes_the_query_cluster(clustered):
+    root, vectors, latent_ids = clustered
+    index = IVFIndex(root / "source-a")
+    ids, _ = index.search(vectors[10], k=3, nprobe=1)
+    assert set(ids.tolist()) <= set(latent_ids[8:16].tolist())
+
+
+def test_vector_of_and_exclude_id(clustered):
+    root, vectors, latent_ids = clustered
+    index = IVFIndex(root / "source-a")
+    np.testing.assert_allclose(index.vector_of(103), vectors[3], rtol=1e-6)
+    assert index.vector_of(99) is None
+
+    ids, _ = index.search(index.vector_of(103), k=4, exclude_id=103)
+    assert 103 not in ids.tolist()
+    assert len(ids) == 4
+
+
+def test_invalid_queries_are_rejected(clustered):
+    root, _, _ = clustered
+    index = IVFIndex(root / "source-a")
+    with pytest.raises(ValueError):
+        index.search(np.ones(5), k=3)
+    with pytest.raises(ValueError):
+        index.search(np.zeros(6), k=3)
+
+
+def test_semantic_index_loads_every_data_source(clustered):
+    root, _, _ = clustered
+    rng = np.random.default_rng(1)
+    write_index(root / "source-b", rng.normal(size=(6, 6)), np.arange(6), n_lists=2, data_source="source-b")
+    (root / "not-an-index").mkdir()
+
+    semantic = SemanticIndex.load(root)
+    assert semantic.data_sources == ["source-a", "source-b"]
+    assert len(semantic.get("source-b")) == 6
+    assert semantic.get("missing") is None
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Build an approximate nearest neighbor (IVF) index over explanation embeddings.
+
+For every configured data source the embeddings are L2-normalized and clustered
+with spherical k-means into nlist inverted lists. The index directory
+(data/semantic_index/<data_source>/) holds:
+- centroids.npy: float32 (nlist, dim) normalized list centroids
+- vectors.npy: float32 (latents, dim) normalized embeddings, grouped by list
+- latent_ids.npy: int64 latent IDs aligned with vectors.npy
+- list_offsets.npy: int64 (nlist + 1) row offsets of each list in vectors.npy
+- index.json: metadata (data source, SAE ID, embedding model, sizes, default nprobe)
+
+A query scores the centroids, scans only the rows of the nprobe best lists and
+ranks them by cosine similarity; the backend memory-maps vectors.npy, so only
+the probed lists are paged in.
+"""
+
+import os
+import json
+import shutil
+import argparse
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, load_embedding_store
+
+INDEX_DIRNAME = "semantic_index"
+CENTROIDS_FILENAME = "centroids.npy"
+VECTORS_FILENAME = "vectors.npy"
+LATENT_IDS_FILENAME = "latent_ids.npy"
+LIST_OFFSETS_FILENAME = "list_offsets.npy"
+INDEX_METADATA_FILENAME = "index.json"
+
+# Rows per batched centroid assignment
+DEFAULT_CHUNK_SIZE = 8192
+DEFAULT_KMEANS_ITERATIONS = 20
+DEFAULT_KMEANS_SAMPLE_SIZE = 65536
+DEFAULT_NPROBE = 8
+
+
+def load_config(config_path: str) -> Dict:
+    """Load configuration from JSON file."""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows as float32; zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, np.float32(1e-12))
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int) -> np.ndarray:
+    """Index of the most similar centroid of every row, computed in row chunks."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int,
+    sample_size: int,
+    chunk_size: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Spherical k-means on a random sample of the normalized vectors.
+
+    The sample holds at least nlist rows so that every list gets a distinct
+    initial centroid. Empty clusters are re-seeded with random sample rows after
+    each iteration.
+    """
+    sample_size = min(max(sample_size, nlist), len(vectors))
+    sample_rows = rng.choice(len(vectors), size=sample_size, replace=False)
+    sample = vectors[np.sort(sample_rows)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for iteration in range(iterations):
+        assignments = assign_to_centroids(sample, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+
+        centroids = normalize_rows(sums)
+        print(f"  k-means iteration {iteration + 1}/{iterations}: {len(empty)} empty lists re-seeded")
+
+    return centroids
+
+
+def build_ivf_index(
+    store: EmbeddingStore,
+    nlist: Optional[int],
+    iterations: int,
+    sample_size: int,
+    chunk_size: int,
+    seed: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cluster a store's embeddings into an IVF index.
+
+    Returns:
+        Tuple of (centroids, vectors grouped by list, aligned latent_ids, list_offsets)
+    """
+    vectors = normalize_rows(store.matrix)
+    if nlist is None:
+        nlist = int(np.sqrt(len(vectors)))
+    nlist = max(1, min(nlist, len(vectors)))
+
+    print(f"Training {nlist} lists on {min(max(sample_size, nlist), len(vectors))} of {len(vectors)} embeddings")
+    rng = np.random.default_rng(seed)
+    centroids = train_centroids(vectors, nlist, iterations, sample_size, chunk_size, rng)
+
+    assignments = assign_to_centroids(vectors, centroids, chunk_size)
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+
+    return centroids, vectors[order], np.asarray(store.latent_ids, dtype=np.int64)[order], list_offsets
+
+
+def save_ivf_index(
+    output_dir: Path,
+    centroids: np.ndarray,
+    vectors: np.ndarray,
+    latent_ids: np.ndarray,
+    list_offsets: np.ndarray,
+    metadata: Dict
+) -> None:
+    """Write the index files to a staging directory and swap it into place."""
+    staging_dir = output_dir.with_name(output_dir.name + ".tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    np.save(staging_dir / CENTROIDS_FILENAME, np.ascontiguousarray(centroids, dtype=np.float32))
+    np.save(staging_dir / VECTORS_FILENAME, np.ascontiguousarray(vectors, dtype=np.float32))
+    np.save(staging_dir / LATENT_IDS_FILENAME, latent_ids)
+    np.save(staging_dir / LIST_OFFSETS_FILENAME, list_offsets)
+    with open(staging_dir / INDEX_METADATA_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(staging_dir, output_dir)
+
+
+def main():
+    """Build one IVF index per configured data source."""
+    parser = argparse.ArgumentParser(description="Build ANN indexes over explanation embeddings")
+    parser.add_argument(
+        "--config",
+        default="../config/semantic_index_config.json",
+        help="Path to configuration file (default: ../config/semantic_index_config.json)"
+    )
+    parser.add_argument(
+        "--data-source",
+        action="append",
+        help="Data source to index (repeatable; overrides the config's data_sources)"
+    )
+    args = parser.parse_args()
+
+    # Get script directory and project root
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent.parent.parent  # Go up to interface root
+
+    # Load configuration
+    config_path = script_dir / args.config
+    if not config_path.exists():
+        print(f"Config file not found: {config_path}")
+        return
+
+    config = load_config(config_path)
+    print(f"Loaded config from: {config_path}")
+
+    data_sources = args.data_source or config["data_sources"]
+    index_root = project_root / "data" / config.get("output_dir", INDEX_DIRNAME)
+    chunk_size = config.get("chunk_size", DEFAULT_CHUNK_SIZE)
+
+    built = 0
+    for data_source in data_sources:
+        embeddings_dir = project_root / "data" / "embeddings" / data_source
+        print(f"\nLoading embeddings: {embeddings_dir}")
+        store = load_embedding_store(embeddings_dir, config.get("embedding_filename", "embeddings.json"))
+        if store is None or len(store) == 0:
+            print(f"Error: No embeddings for {data_source}, skipping")
+            continue
+
+        centroids, vectors, latent_ids, list_offsets = build_ivf_index(
+            store,
+            config.get("nlist"),
+            config.get("kmeans_iterations", DEFAULT_KMEANS_ITERATIONS),
+            config.get("kmeans_sample_size", DEFAULT_KMEANS_SAMPLE_SIZE),
+            chunk_size,
+            config.get("seed", 42)
+        )
+
+        list_sizes = np.diff(list_offsets)
+        metadata = {
+            "data_source": data_source,
+            "sae_id": store.metadata.get("sae_id"),
+            "embedding_model": store.metadata.get("model"),
+            "metric": "cosine",
+            "total_latents": int(len(latent_ids)),
+            "embedding_dim": int(vectors.shape[1]),
+            "nlist": int(len(centroids)),
+            "default_nprobe": int(config.get("default_nprobe", DEFAULT_NPROBE)),
+            "list_size_stats": {
+                "min": int(list_sizes.min()),
+                "max": int(list_sizes.max()),
+                "mean": float(list_sizes.mean())
+            },
+            "config_used": config
+        }
+
+        output_dir = index_root / data_source
+        save_ivf_index(output_dir, centroids, vectors, latent_ids, list_offsets, metadata)
+        print(f"Saved index of {len(latent_ids)} embeddings in {len(centroids)} lists to: {output_dir}")
+        built += 1
+
+    print(f"\nCompleted: {built}/{len(data_sources)} indexes built in {index_root}")
+
+
+if __name__ == "__main__":
+    main()
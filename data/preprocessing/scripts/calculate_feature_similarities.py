@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """
 Compute feature similarities for SAE decoder weights using configurable parameters.
+
+The cosine similarities are searched in tiles with a running top-k per feature,
+so the full N x N similarity matrix is never materialized.
 """
 
 import torch
 import numpy as np
+import polars as pl
 import json
 import os
 import argparse
@@ -13,6 +17,9 @@ from pathlib import Path
 from typing import Dict, Tuple, Optional
 from huggingface_hub import hf_hub_download
 
+DEFAULT_TOP_K = 10
+DEFAULT_BLOCK_SIZE = 4096
+
 
 class JumpReluSae(nn.Module):
     def __init__(self, d_model, d_sae):
@@ -97,6 +104,71 @@ def apply_feature_range_filter(
     return filtered_weights, feature_indices
 
 
+def blocked_top_k_similarities(
+    normalized_weights: torch.Tensor,
+    top_k: int,
+    block_size: int
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Find the top_k most cosine-similar other features of every feature.
+
+    Similarities are computed one (block_size x block_size) tile at a time and
+    merged into a running top-k per row, so memory stays bounded by the tile
+    size instead of the full N x N similarity matrix. Self-similarity is excluded.
+
+    Args:
+        normalized_weights: L2-normalized decoder weights, one row per feature
+        top_k: Number of neighbors to keep per feature (capped at N - 1)
+        block_size: Rows and columns per similarity tile
+
+    Returns:
+        Tuple of (similarities, indices), both (N, top_k) and sorted by
+        descending similarity; indices are row positions in normalized_weights
+    """
+    n_features = normalized_weights.shape[0]
+    if n_features < 2:
+        raise ValueError(f"Need at least 2 features to search neighbors, got {n_features}")
+
+    top_k = max(1, min(top_k, n_features - 1))
+    device = normalized_weights.device
+    top_similarities = torch.empty((n_features, top_k), dtype=torch.float32, device=device)
+    top_indices = torch.empty((n_features, top_k), dtype=torch.long, device=device)
+
+    for row_start in range(0, n_features, block_size):
+        row_end = min(row_start + block_size, n_features)
+        rows = normalized_weights[row_start:row_end]
+        n_rows = row_end - row_start
+
+        best_similarities = torch.full((n_rows, top_k), float("-inf"), dtype=torch.float32, device=device)
+        best_indices = torch.zeros((n_rows, top_k), dtype=torch.long, device=device)
+
+        for col_start in range(0, n_features, block_size):
+            col_end = min(col_start + block_size, n_features)
+
+            # Since the vectors are normalized, the dot product is the cosine similarity
+            tile = (rows @ normalized_weights[col_start:col_end].T).float()
+
+            # Exclude self-similarity (which is 1.0) where the tile crosses the diagonal
+            diagonal_start = max(row_start, col_start)
+            diagonal_end = min(row_end, col_end)
+            if diagonal_start < diagonal_end:
+                diagonal = torch.arange(diagonal_start, diagonal_end, device=device)
+                tile[diagonal - row_start, diagonal - col_start] = float("-inf")
+
+            # Merge the tile into the running top-k of each row
+            column_indices = torch.arange(col_start, col_end, device=device).expand(n_rows, -1)
+            candidate_similarities = torch.cat([best_similarities, tile], dim=1)
+            candidate_indices = torch.cat([best_indices, column_indices], dim=1)
+            best_similarities, positions = torch.topk(candidate_similarities, top_k, dim=1)
+            best_indices = torch.gather(candidate_indices, 1, positions)
+
+        top_similarities[row_start:row_end] = best_similarities
+        top_indices[row_start:row_end] = best_indices
+        print(f"Processed features {row_start}-{row_end} of {n_features}")
+
+    return top_similarities, top_indices
+
+
 def compute_feature_similarities(config: Dict) -> Dict:
     """
     Main function to compute feature similarities based on configuration.
@@ -112,7 +184,8 @@ def compute_feature_similarities(config: Dict) -> Dict:
     position = config["position"]
     feature_range = config["feature_range"]
     use_float16 = config.get("use_float16", True)
-    memory_warning_threshold = config.get("memory_warning_threshold_gb", 2.0)
+    top_k = config.get("top_k", DEFAULT_TOP_K)
+    block_size = config.get("block_size", DEFAULT_BLOCK_SIZE)
 
     # Setup device
     device = get_device(config.get("device", "auto"))
@@ -144,47 +217,27 @@ def compute_feature_similarities(config: Dict) -> Dict:
     if device == "cuda":
         torch.cuda.empty_cache()
 
-    # 5. Compute all pairwise cosine similarity
-    print("Computing pairwise cosine similarity...")
-
-    # Check matrix size and warn if large
+    # 5. Blocked top-k search over all pairwise cosine similarities
     n_features = normalized_weights.shape[0]
-    matrix_size_gb = (n_features * n_features * 2) / (1024**3)  # float16 = 2 bytes
-    print(f"Estimated similarity matrix size: {matrix_size_gb:.2f} GB")
-
-    if matrix_size_gb > memory_warning_threshold:
-        print(f"Warning: Large matrix detected ({matrix_size_gb:.2f} GB > {memory_warning_threshold:.2f} GB threshold)")
-        print("Consider using a smaller feature range for very large matrices.")
-
-    # Since the vectors are normalized, the dot product is the cosine similarity
-    cosine_similarity_matrix = normalized_weights @ normalized_weights.T
-    print(f"Cosine similarity matrix shape: {cosine_similarity_matrix.shape}")
-
-    # 6. Find maximum cosine similarity for each feature
-    print("Computing maximum cosine similarity for each feature...")
+    tile_size_gb = (block_size * block_size * 4) / (1024**3)  # float32 tile
+    print(f"Searching top-{top_k} neighbors of {n_features} features in "
+          f"{block_size}x{block_size} tiles (~{tile_size_gb:.2f} GB per tile)")
 
-    # Set diagonal to a very negative value to exclude self-similarity (which is 1.0)
-    cosine_similarity_matrix.fill_diagonal_(float("-inf"))
-
-    # Find maximum cosine similarity for each feature
-    max_indices = torch.argmax(cosine_similarity_matrix, dim=1)
-    nearest_similarities = cosine_similarity_matrix[
-        torch.arange(cosine_similarity_matrix.shape[0]), max_indices
-    ]
-    print(f"Nearest similarities shape: {nearest_similarities.shape}")
+    top_similarities, top_indices = blocked_top_k_similarities(normalized_weights, top_k, block_size)
+    top_k = top_indices.shape[1]
 
     # Map indices back to original feature IDs (accounting for feature range filtering)
     source_feature_ids = list(feature_indices)
-    closest_feature_ids = [feature_indices[idx] for idx in max_indices.cpu().numpy()]
+    neighbor_feature_ids = (top_indices.cpu().numpy() + feature_indices.start).tolist()
+    neighbor_similarities = top_similarities.cpu().numpy()
+    nearest_similarities_np = neighbor_similarities[:, 0]
+    closest_feature_ids = [neighbors[0] for neighbors in neighbor_feature_ids]
 
     print(f"Source feature IDs range: {min(source_feature_ids)} to {max(source_feature_ids)}")
     print(f"Closest feature IDs range: {min(closest_feature_ids)} to {max(closest_feature_ids)}")
 
-    # Convert to CPU and numpy for JSON serialization
-    nearest_similarities_np = nearest_similarities.cpu().numpy()
-
     # Clear normalized_weights to free memory before saving
-    del normalized_weights, cosine_similarity_matrix
+    del normalized_weights, top_similarities, top_indices
     if device == "cuda":
         torch.cuda.empty_cache()
 
@@ -198,6 +251,8 @@ def compute_feature_similarities(config: Dict) -> Dict:
             "source_feature_id": int(source_feature_id),
             "closest_feature_id": int(closest_feature_ids[i]),
             "cosine_similarity": float(nearest_similarities_np[i]),
+            "neighbor_feature_ids": neighbor_feature_ids[i],
+            "neighbor_cosine_similarities": neighbor_similarities[i].tolist(),
         })
 
     # Calculate statistics
@@ -217,7 +272,8 @@ def compute_feature_similarities(config: Dict) -> Dict:
             "end": int(max(source_feature_ids) + 1),
             "total_features": len(source_feature_ids)
         },
-        "description": "Maximum cosine similarity for each SAE feature",
+        "top_k": int(top_k),
+        "description": "Maximum cosine similarity and top-k nearest features for each SAE feature",
         "model_info": {
             "model_name_or_path": model_name_or_path,
             "position": position
@@ -239,9 +295,11 @@ def save_feature_similarities(
     results: Dict,
     output_dir: str,
     json_filename: str,
-    config: Dict
+    config: Dict,
+    parquet_filename: Optional[str] = None,
+    neighbors_filename: Optional[str] = None
 ) -> None:
-    """Save feature similarity results to JSON file and copy config."""
+    """Save feature similarity results to JSON (and optionally parquet tables) and copy config."""
     os.makedirs(output_dir, exist_ok=True)
 
     # Save JSON results
@@ -250,6 +308,37 @@ def save_feature_similarities(
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"Saved results to: {json_output_file}")
 
+    # Save the feature mappings as a table (read by columnar_sources.py)
+    if parquet_filename:
+        parquet_output_file = os.path.join(output_dir, parquet_filename)
+        pl.DataFrame(
+            results["feature_mappings"],
+            schema={"source_feature_id": pl.UInt32, "closest_feature_id": pl.UInt32, "cosine_similarity": pl.Float32}
+        ).write_parquet(parquet_output_file)
+        print(f"Saved feature mappings to: {parquet_output_file}")
+
+    # Save the top-k neighbors as a long (feature_id, neighbor_id, cosine_similarity) table
+    if neighbors_filename:
+        neighbors_output_file = os.path.join(output_dir, neighbors_filename)
+        mappings = results["feature_mappings"]
+        pl.DataFrame(
+            {
+                "feature_id": [
+                    mapping["source_feature_id"]
+                    for mapping in mappings
+                    for _ in mapping["neighbor_feature_ids"]
+                ],
+                "neighbor_id": [
+                    neighbor_id for mapping in mappings for neighbor_id in mapping["neighbor_feature_ids"]
+                ],
+                "cosine_similarity": [
+                    similarity for mapping in mappings for similarity in mapping["neighbor_cosine_similarities"]
+                ],
+            },
+            schema={"feature_id": pl.UInt32, "neighbor_id": pl.UInt32, "cosine_similarity": pl.Float32}
+        ).write_parquet(neighbors_output_file)
+        print(f"Saved top-{results['top_k']} neighbors to: {neighbors_output_file}")
+
     # Save config file in the same directory
     config_file = os.path.join(output_dir, "config.json")
     with open(config_file, "w", encoding="utf-8") as f:
@@ -296,7 +385,9 @@ def main():
             results,
             str(output_dir),
             config["output_filename"],
-            config
+            config,
+            config.get("parquet_filename"),
+            config.get("neighbors_filename")
         )
 
         print(f"\nCompleted successfully!")
@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 """
 Calculate semantic distances between embedded explanations from two data sources.
+
+With --all-pairs, every source listed in the config's "data_sources" is loaded
+once and the distances of all source pairs are written to a single parquet
+file (one row per latent and pair) instead of one directory per comparison.
 """
 
 import os
 import json
 import argparse
-import math
+from itertools import combinations
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Tuple
+
+import numpy as np
+import polars as pl
+
+from embedding_store import EmbeddingStore, load_embedding_store
+
+# Latents per batched distance computation
+DEFAULT_CHUNK_SIZE = 8192
+
+# All-pairs output (read by columnar_sources.py)
+ALL_PAIRS_DIRNAME = "all_pairs"
+ALL_PAIRS_FILENAME = "semantic_distances.parquet"
 
 
 def load_config(config_path: str) -> Dict:
@@ -39,108 +55,212 @@ def extract_sae_id(run_config: Dict) -> str:
     return ""
 
 
-def load_embeddings(embeddings_path: str) -> Optional[Dict]:
-    """Load embeddings from JSON file."""
-    try:
-        with open(embeddings_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error loading embeddings from {embeddings_path}: {e}")
-        return None
+def cosine_distances(matrix1: np.ndarray, matrix2: np.ndarray) -> np.ndarray:
+    """Row-wise cosine distance between two aligned (n, dim) matrices."""
+    a = matrix1.astype(np.float64)
+    b = matrix2.astype(np.float64)
+    dot_products = np.einsum("ij,ij->i", a, b)
+    magnitudes = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosine_similarity = np.clip(dot_products / magnitudes, -1.0, 1.0)
+
+    # Maximum distance for zero vectors
+    return np.where(magnitudes == 0, 1.0, 1.0 - cosine_similarity)
+
+
+def euclidean_distances(matrix1: np.ndarray, matrix2: np.ndarray) -> np.ndarray:
+    """Row-wise euclidean distance between two aligned (n, dim) matrices."""
+    return np.linalg.norm(matrix1.astype(np.float64) - matrix2.astype(np.float64), axis=1)
 
 
-def calculate_cosine_distance(embedding1: List[float], embedding2: List[float]) -> float:
-    """Calculate cosine distance between two embeddings."""
-    # Calculate dot product
-    dot_product = sum(a * b for a, b in zip(embedding1, embedding2))
+DISTANCE_FUNCTIONS = {
+    "cosine": cosine_distances,
+    "euclidean": euclidean_distances,
+}
 
-    # Calculate magnitudes
-    magnitude1 = math.sqrt(sum(a * a for a in embedding1))
-    magnitude2 = math.sqrt(sum(b * b for b in embedding2))
 
-    # Avoid division by zero
-    if magnitude1 == 0 or magnitude2 == 0:
-        return 1.0  # Maximum distance for zero vectors
+def stack_common_embeddings(
+    store1: EmbeddingStore,
+    store2: EmbeddingStore
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gather the embeddings of latents present in both sources.
+
+    Returns the latent IDs (sorted numerically), the store row of each latent in
+    both sources and two row-aligned float32 matrices. Sources with different
+    embedding dimensions have no comparable latents.
+    """
+    common_latent_ids, rows_1, rows_2 = np.intersect1d(
+        store1.latent_ids, store2.latent_ids, assume_unique=True, return_indices=True
+    )
+    print(f"Found {len(common_latent_ids)} common latents between sources")
 
-    # Calculate cosine similarity
-    cosine_similarity = dot_product / (magnitude1 * magnitude2)
+    if len(common_latent_ids) and store1.embedding_dim != store2.embedding_dim:
+        print(f"Embedding dimension mismatch between sources: {store1.embedding_dim} vs {store2.embedding_dim}")
+        common_latent_ids, rows_1, rows_2 = common_latent_ids[:0], rows_1[:0], rows_2[:0]
 
-    # Clamp to [-1, 1] to handle floating point errors
-    cosine_similarity = max(-1.0, min(1.0, cosine_similarity))
+    matrix_1 = np.asarray(store1.matrix[rows_1], dtype=np.float32)
+    matrix_2 = np.asarray(store2.matrix[rows_2], dtype=np.float32)
+    return [str(latent_id) for latent_id in common_latent_ids.tolist()], rows_1, rows_2, matrix_1, matrix_2
+
+
+def calculate_distance_arrays(
+    matrix1: np.ndarray,
+    matrix2: np.ndarray,
+    distance_metrics: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, np.ndarray]:
+    """
+    Calculate each distance metric for all aligned rows of two matrices.
+
+    Rows are processed in chunks of chunk_size so the float64 temporaries stay
+    bounded regardless of the number of latents.
+    """
+    metrics = []
+    for metric in distance_metrics:
+        if metric in DISTANCE_FUNCTIONS:
+            metrics.append(metric)
+        else:
+            print(f"Unknown distance metric: {metric}")
 
-    # Return cosine distance (1 - cosine similarity)
-    return 1.0 - cosine_similarity
+    num_rows = len(matrix1)
+    results = {metric: np.empty(num_rows, dtype=np.float64) for metric in metrics}
 
+    for start in range(0, num_rows, chunk_size):
+        end = min(start + chunk_size, num_rows)
+        for metric in metrics:
+            results[metric][start:end] = DISTANCE_FUNCTIONS[metric](matrix1[start:end], matrix2[start:end])
+        print(f"Processed {end}/{num_rows} latents")
 
-def calculate_euclidean_distance(embedding1: List[float], embedding2: List[float]) -> float:
-    """Calculate euclidean distance between two embeddings."""
-    return math.sqrt(sum((a - b) ** 2 for a, b in zip(embedding1, embedding2)))
+    return results
 
 
 def calculate_semantic_distances(
-    embeddings1: Dict,
-    embeddings2: Dict,
-    distance_metrics: List[str]
+    store1: EmbeddingStore,
+    store2: EmbeddingStore,
+    distance_metrics: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
 ) -> Dict:
     """
     Calculate semantic distances between embeddings from two sources.
 
     Returns a dictionary with latent IDs as keys and distance metrics as values.
     """
-    distances_data = {}
-
-    # Get common latent IDs between both sources
-    latent_ids_1 = set(embeddings1.get("embeddings", {}).keys())
-    latent_ids_2 = set(embeddings2.get("embeddings", {}).keys())
-    common_latent_ids = latent_ids_1.intersection(latent_ids_2)
+    latent_ids, rows_1, rows_2, matrix_1, matrix_2 = stack_common_embeddings(store1, store2)
+    distance_arrays = calculate_distance_arrays(matrix_1, matrix_2, distance_metrics, chunk_size)
+    distance_lists = {metric: values.tolist() for metric, values in distance_arrays.items()}
 
-    print(f"Found {len(common_latent_ids)} common latents between sources")
+    distances_data = {}
+    for row, (latent_id, row_1, row_2) in enumerate(zip(latent_ids, rows_1.tolist(), rows_2.tolist())):
+        distances_data[latent_id] = {
+            "distances": {metric: values[row] for metric, values in distance_lists.items()},
+            "explanation_1": store1.explanations[row_1],
+            "explanation_2": store2.explanations[row_2],
+            "embedding_dim_1": store1.embedding_dim,
+            "embedding_dim_2": store2.embedding_dim
+        }
 
-    for latent_id in sorted(common_latent_ids, key=int):
-        embedding_data_1 = embeddings1["embeddings"][latent_id]
-        embedding_data_2 = embeddings2["embeddings"][latent_id]
+    return distances_data
 
-        embedding_1 = embedding_data_1.get("embedding")
-        embedding_2 = embedding_data_2.get("embedding")
 
-        if embedding_1 is None or embedding_2 is None:
-            print(f"Missing embedding for latent {latent_id}")
-            continue
+def build_shared_embedding_array(
+    source_matrices: List[Tuple[np.ndarray, np.ndarray]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Combine per-source (latent_ids, matrix) pairs into one (sources, latents, dim) array.
 
-        if len(embedding_1) != len(embedding_2):
-            print(f"Embedding dimension mismatch for latent {latent_id}: {len(embedding_1)} vs {len(embedding_2)}")
-            continue
+    Latents are the union over all sources; present[s, l] marks whether source s
+    has an embedding for latent l (missing rows are left as zeros).
+    """
+    dims = {matrix.shape[1] for _, matrix in source_matrices if len(matrix)}
+    if len(dims) > 1:
+        raise ValueError(f"Embedding dimensions differ between sources: {sorted(dims)}")
+    embedding_dim = dims.pop() if dims else 0
 
-        distances = {}
+    latent_ids = np.unique(np.concatenate([ids for ids, _ in source_matrices]))
+    shared = np.zeros((len(source_matrices), len(latent_ids), embedding_dim), dtype=np.float32)
+    present = np.zeros((len(source_matrices), len(latent_ids)), dtype=bool)
 
-        for metric in distance_metrics:
-            try:
-                if metric == "cosine":
-                    distance = calculate_cosine_distance(embedding_1, embedding_2)
-                elif metric == "euclidean":
-                    distance = calculate_euclidean_distance(embedding_1, embedding_2)
-                else:
-                    print(f"Unknown distance metric: {metric}")
-                    continue
+    for source_index, (ids, matrix) in enumerate(source_matrices):
+        positions = np.searchsorted(latent_ids, ids)
+        shared[source_index, positions] = matrix
+        present[source_index, positions] = True
 
-                distances[metric] = distance
+    return latent_ids, shared, present
 
-            except Exception as e:
-                print(f"Error calculating {metric} distance for latent {latent_id}: {e}")
-                distances[metric] = None
 
-        distances_data[latent_id] = {
-            "distances": distances,
-            "explanation_1": embedding_data_1.get("explanation"),
-            "explanation_2": embedding_data_2.get("explanation"),
-            "embedding_dim_1": embedding_data_1.get("embedding_dim"),
-            "embedding_dim_2": embedding_data_2.get("embedding_dim")
-        }
+def calculate_all_pair_distances(
+    shared: np.ndarray,
+    present: np.ndarray,
+    distance_metrics: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Calculate each distance metric for every pair of sources on every latent.
 
-        if int(latent_id) % 100 == 0:  # Progress update every 100 latents
-            print(f"Processed latent {latent_id}")
+    For each chunk of latents one batched matrix product yields the
+    (sources x sources) Gram matrix of every latent, from which cosine and
+    euclidean distances of all pairs follow. Only pairs where both sources
+    have an embedding are returned, ordered by latent then pair.
 
-    return distances_data
+    Returns the latent positions, the pair indices into
+    combinations(range(num_sources), 2), and one distance array per metric.
+    """
+    metrics = []
+    for metric in distance_metrics:
+        if metric in DISTANCE_FUNCTIONS:
+            metrics.append(metric)
+        else:
+            print(f"Unknown distance metric: {metric}")
+
+    num_sources, num_latents, _ = shared.shape
+    pair_sources = np.asarray(list(combinations(range(num_sources), 2)), dtype=np.int64).reshape(-1, 2)
+    first, second = pair_sources[:, 0], pair_sources[:, 1]
+
+    latent_chunks = []
+    pair_chunks = []
+    result_chunks = {metric: [] for metric in metrics}
+
+    for start in range(0, num_latents, chunk_size):
+        end = min(start + chunk_size, num_latents)
+
+        # (latents, sources, dim) @ (latents, dim, sources) -> per-latent Gram matrices
+        block = shared[:, start:end].astype(np.float64).transpose(1, 0, 2)
+        gram = block @ block.transpose(0, 2, 1)
+        squared_norms = np.diagonal(gram, axis1=1, axis2=2)
+
+        dot_products = gram[:, first, second]
+        squared_1 = squared_norms[:, first]
+        squared_2 = squared_norms[:, second]
+
+        valid = present[first, start:end].T & present[second, start:end].T
+        latent_positions, pair_indices = np.nonzero(valid)
+        latent_chunks.append(latent_positions + start)
+        pair_chunks.append(pair_indices)
+
+        if "cosine" in result_chunks:
+            magnitudes = np.sqrt(squared_1 * squared_2)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cosine_similarity = np.clip(dot_products / magnitudes, -1.0, 1.0)
+            # Maximum distance for zero vectors
+            cosine = np.where(magnitudes == 0, 1.0, 1.0 - cosine_similarity)
+            result_chunks["cosine"].append(cosine[valid])
+
+        if "euclidean" in result_chunks:
+            euclidean = np.sqrt(np.maximum(squared_1 + squared_2 - 2.0 * dot_products, 0.0))
+            result_chunks["euclidean"].append(euclidean[valid])
+
+        print(f"Processed {end}/{num_latents} latents")
+
+    def concat(chunks: List[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+
+    return (
+        concat(latent_chunks, np.int64),
+        concat(pair_chunks, np.int64),
+        {metric: concat(chunks, np.float64) for metric, chunks in result_chunks.items()}
+    )
 
 
 def save_semantic_distances(distances_data: Dict, output_dir: str, filename: str, config: Dict, sae_id_1: str, sae_id_2: str) -> None:
@@ -164,6 +284,124 @@ def save_semantic_distances(distances_data: Dict, output_dir: str, filename: str
     print(f"Config saved to: {config_file}")
 
 
+def save_all_pair_distances(
+    latent_ids: np.ndarray,
+    data_sources: List[str],
+    latent_positions: np.ndarray,
+    pair_indices: np.ndarray,
+    distance_arrays: Dict[str, np.ndarray],
+    output_dir: str,
+    filename: str,
+    config: Dict,
+    sae_ids: Dict[str, str]
+) -> pl.DataFrame:
+    """Save all-pairs distances as one parquet file (one row per latent and pair) and copy config."""
+    os.makedirs(output_dir, exist_ok=True)
+
+    pair_sources = list(combinations(data_sources, 2))
+    pair_source_1 = np.asarray([source_1 for source_1, _ in pair_sources], dtype=object)
+    pair_source_2 = np.asarray([source_2 for _, source_2 in pair_sources], dtype=object)
+
+    columns = {
+        "latent_id": pl.Series(latent_ids[latent_positions], dtype=pl.UInt32),
+        "data_source_1": pl.Series(pair_source_1[pair_indices].tolist(), dtype=pl.Utf8),
+        "data_source_2": pl.Series(pair_source_2[pair_indices].tolist(), dtype=pl.Utf8),
+    }
+    for metric, values in distance_arrays.items():
+        columns[f"{metric}_distance"] = pl.Series(values, dtype=pl.Float64)
+    df = pl.DataFrame(columns)
+
+    output_file = os.path.join(output_dir, filename)
+    df.write_parquet(output_file)
+
+    # Save config file with the sae_id of every source in the same directory
+    config_with_sae_ids = config.copy()
+    config_with_sae_ids["data_sources"] = data_sources
+    config_with_sae_ids["sae_ids"] = sae_ids
+    config_file = os.path.join(output_dir, "config.json")
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump(config_with_sae_ids, f, indent=2, ensure_ascii=False)
+
+    print(f"Semantic distances saved to: {output_file}")
+    print(f"Config saved to: {config_file}")
+    return df
+
+
+def run_all_pairs(config: Dict, project_root: Path) -> None:
+    """Calculate distances between every pair of the configured data sources in one pass."""
+    data_sources = config.get("data_sources") or [config["data_source_1"], config["data_source_2"]]
+    if len(data_sources) < 2:
+        print("Error: all-pairs mode needs at least two data sources")
+        return
+
+    embedding_filename = config["embedding_filename"]
+    output_dir = project_root / "data" / "semantic_distances" / config.get("all_pairs_output_dir", ALL_PAIRS_DIRNAME)
+    output_filename = config.get("all_pairs_output_filename", ALL_PAIRS_FILENAME)
+
+    print(f"Data sources: {', '.join(data_sources)}")
+    print(f"Output directory: {output_dir}")
+
+    # Open each source's store once; the matrices stay memory-mapped until copied
+    source_matrices = []
+    sae_ids = {}
+    embedding_models = {}
+    for data_source in data_sources:
+        embeddings_dir = project_root / "data" / "embeddings" / data_source
+        print(f"Loading embeddings: {embeddings_dir}")
+        store = load_embedding_store(embeddings_dir, embedding_filename)
+        if store is None:
+            print("Error: Failed to load embeddings")
+            return
+
+        sae_ids[data_source] = extract_sae_id(load_run_config(project_root / "data" / "raw" / data_source))
+        embedding_models[data_source] = store.metadata.get("model")
+        source_matrices.append((store.latent_ids, store.matrix))
+        print(f"Loaded {len(store)} embeddings from {data_source} (SAE ID: {sae_ids[data_source]})")
+
+    try:
+        latent_ids, shared, present = build_shared_embedding_array(source_matrices)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    del source_matrices
+
+    print(f"Shared embedding array: {shared.shape[0]} sources x {shared.shape[1]} latents x {shared.shape[2]} dims")
+
+    # Calculate semantic distances
+    print("Calculating semantic distances...")
+    latent_positions, pair_indices, distance_arrays = calculate_all_pair_distances(
+        shared,
+        present,
+        config["distance_metrics"],
+        config.get("chunk_size", DEFAULT_CHUNK_SIZE)
+    )
+
+    run_config = dict(config)
+    run_config["embedding_models"] = embedding_models
+    df = save_all_pair_distances(
+        latent_ids, data_sources, latent_positions, pair_indices, distance_arrays,
+        str(output_dir), output_filename, run_config, sae_ids
+    )
+
+    print(f"\nCompleted: {len(df)} semantic distance calculations "
+          f"({len(latent_ids)} latents, {len(data_sources) * (len(data_sources) - 1) // 2} pairs)")
+
+    # Print summary statistics per pair
+    if len(df):
+        summary_columns = [f"{metric}_distance" for metric in distance_arrays]
+        summary = (
+            df.group_by(["data_source_1", "data_source_2"], maintain_order=True)
+            .agg([pl.col(c).mean().alias(f"{c}_mean") for c in summary_columns]
+                 + [pl.col(c).std(ddof=0).alias(f"{c}_std") for c in summary_columns])
+        )
+        for row in summary.iter_rows(named=True):
+            print(f"{row['data_source_1']} vs {row['data_source_2']}:")
+            for metric in distance_arrays:
+                column = f"{metric}_distance"
+                print(f"  {metric.capitalize()} distance - Mean: {row[column + '_mean']:.4f}, "
+                      f"Std: {row[column + '_std']:.4f}")
+
+
 def main():
     """Main function to calculate semantic distances between embeddings."""
     parser = argparse.ArgumentParser(description="Calculate semantic distances between embeddings from two sources")
@@ -172,6 +410,11 @@ def main():
         default="../config/semantic_distance_config.json",
         help="Path to configuration file (default: ../config/semantic_distance_config.json)"
     )
+    parser.add_argument(
+        "--all-pairs",
+        action="store_true",
+        help="Compare every pair of the config's data_sources in one pass and write a single parquet file"
+    )
     args = parser.parse_args()
 
     # Get script directory and project root
@@ -187,6 +430,10 @@ def main():
     config = load_config(config_path)
     print(f"Loaded config from: {config_path}")
 
+    if args.all_pairs:
+        run_all_pairs(config, project_root)
+        return
+
     # Setup paths relative to project root
     data_source_1 = config["data_source_1"]
     data_source_2 = config["data_source_2"]
@@ -195,8 +442,8 @@ def main():
     data_source_dir_1 = project_root / "data" / "raw" / data_source_1
     data_source_dir_2 = project_root / "data" / "raw" / data_source_2
 
-    embeddings_path_1 = project_root / "data" / "embeddings" / data_source_1 / embedding_filename
-    embeddings_path_2 = project_root / "data" / "embeddings" / data_source_2 / embedding_filename
+    embeddings_dir_1 = project_root / "data" / "embeddings" / data_source_1
+    embeddings_dir_2 = project_root / "data" / "embeddings" / data_source_2
 
     output_dir = project_root / "data" / "semantic_distances" / f"{data_source_1}_vs_{data_source_2}"
 
@@ -206,39 +453,31 @@ def main():
     sae_id_1 = extract_sae_id(run_config_1)
     sae_id_2 = extract_sae_id(run_config_2)
 
-    print(f"Embeddings source 1: {embeddings_path_1}")
-    print(f"Embeddings source 2: {embeddings_path_2}")
+    print(f"Embeddings source 1: {embeddings_dir_1}")
+    print(f"Embeddings source 2: {embeddings_dir_2}")
     print(f"Output directory: {output_dir}")
     print(f"SAE ID 1: {sae_id_1}")
     print(f"SAE ID 2: {sae_id_2}")
 
-    # Validate input files exist
-    if not embeddings_path_1.exists():
-        print(f"Error: Embeddings file 1 does not exist: {embeddings_path_1}")
-        return
-
-    if not embeddings_path_2.exists():
-        print(f"Error: Embeddings file 2 does not exist: {embeddings_path_2}")
-        return
-
     # Load embeddings
     print("Loading embeddings...")
-    embeddings_1 = load_embeddings(str(embeddings_path_1))
-    embeddings_2 = load_embeddings(str(embeddings_path_2))
+    store_1 = load_embedding_store(embeddings_dir_1, embedding_filename)
+    store_2 = load_embedding_store(embeddings_dir_2, embedding_filename)
 
-    if embeddings_1 is None or embeddings_2 is None:
+    if store_1 is None or store_2 is None:
         print("Error: Failed to load embeddings")
         return
 
-    print(f"Loaded {len(embeddings_1.get('embeddings', {}))} embeddings from source 1")
-    print(f"Loaded {len(embeddings_2.get('embeddings', {}))} embeddings from source 2")
+    print(f"Loaded {len(store_1)} embeddings from source 1")
+    print(f"Loaded {len(store_2)} embeddings from source 2")
 
     # Calculate semantic distances
     print("Calculating semantic distances...")
     distances_data = calculate_semantic_distances(
-        embeddings_1,
-        embeddings_2,
-        config["distance_metrics"]
+        store_1,
+        store_2,
+        config["distance_metrics"],
+        config.get("chunk_size", DEFAULT_CHUNK_SIZE)
     )
 
     # Prepare final output data
@@ -250,8 +489,8 @@ def main():
             "sae_id_2": sae_id_2,
             "distance_metrics": config["distance_metrics"],
             "total_latents": len(distances_data),
-            "embedding_model_1": embeddings_1.get("metadata", {}).get("model"),
-            "embedding_model_2": embeddings_2.get("metadata", {}).get("model"),
+            "embedding_model_1": store_1.metadata.get("model"),
+            "embedding_model_2": store_2.metadata.get("model"),
             "config_used": config
         },
         "semantic_distances": distances_data
@@ -267,9 +506,8 @@ def main():
         for metric in config["distance_metrics"]:
             values = [d["distances"].get(metric) for d in distances_data.values() if d["distances"].get(metric) is not None]
             if values:
-                mean_val = sum(values) / len(values)
-                variance = sum((x - mean_val) ** 2 for x in values) / len(values)
-                std_val = math.sqrt(variance)
+                mean_val = float(np.mean(values))
+                std_val = float(np.std(values))
                 print(f"{metric.capitalize()} distance - Mean: {mean_val:.4f}, Std: {std_val:.4f}")
 
 
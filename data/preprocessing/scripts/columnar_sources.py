@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Load the per-source preprocessing outputs of one SAE as Polars frames.
+
+Every frame is keyed by latent_id (UInt32) so consumers can join them instead
+of walking nested per-source dicts:
+- explanations: embedding stores (explanations table and metadata)
+- scores: process_scores.py outputs (scores.parquet, or scores.json)
+- semantic distances: calculate_semantic_distances.py outputs (per-comparison
+  semantic_distances.json directories and all-pairs parquet files)
+- feature similarities: calculate_feature_similarities.py outputs
+  (feature_similarities.parquet, or the JSON file)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from embedding_store import load_embedding_store, has_embedding_store, LEGACY_JSON_FILENAME
+
+# All-pairs semantic distances (written by calculate_semantic_distances.py --all-pairs)
+ALL_PAIRS_DISTANCES_FILENAME = "semantic_distances.parquet"
+
+# Score columns of the consolidated outputs, in output order
+SCORE_METHODS = ["fuzz", "detection", "simulation", "embedding"]
+
+EXPLANATIONS_SCHEMA = {
+    "data_source": pl.Utf8,
+    "latent_id": pl.UInt32,
+    "explanation": pl.Utf8,
+    "explanation_method": pl.Utf8,
+    "llm_explainer": pl.Utf8,
+}
+
+SCORES_SCHEMA = {
+    "data_source": pl.Utf8,
+    "llm_scorer": pl.Utf8,
+    "latent_id": pl.UInt32,
+    **{f"score_{method}": pl.Float64 for method in SCORE_METHODS},
+}
+
+SIMILARITIES_SCHEMA = {
+    "latent_id": pl.UInt32,
+    "closest_feature_id": pl.UInt32,
+    "cosine_similarity": pl.Float32,
+}
+
+NEIGHBORS_SCHEMA = {
+    "feature_id": pl.UInt32,
+    "neighbor_id": pl.UInt32,
+    "cosine_similarity": pl.Float32,
+}
+
+DISTANCES_SCHEMA = {
+    "latent_id": pl.UInt32,
+    "data_source_1": pl.Utf8,
+    "data_source_2": pl.Utf8,
+    "cosine_distance": pl.Float64,
+    "euclidean_distance": pl.Float64,
+}
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError) as e:
+        print(f"Error loading {path}: {e}")
+        return None
+
+
+def load_explanations_frame(embeddings_dir: Path, sae_id: str) -> pl.DataFrame:
+    """One row per data source and latent with the explanation text and its explainer."""
+    frames = []
+
+    if not embeddings_dir.exists():
+        print(f"Embeddings directory not found: {embeddings_dir}")
+        return pl.DataFrame(schema=EXPLANATIONS_SCHEMA)
+
+    for data_source_dir in sorted(embeddings_dir.iterdir()):
+        if not data_source_dir.is_dir():
+            continue
+
+        if not has_embedding_store(data_source_dir) and not (data_source_dir / LEGACY_JSON_FILENAME).exists():
+            continue
+
+        store = load_embedding_store(data_source_dir)
+        if store is None or store.metadata.get("sae_id", "") != sae_id:
+            continue
+
+        config = store.metadata.get("config_used", {})
+        frames.append(pl.DataFrame({
+            "latent_id": pl.Series(store.latent_ids, dtype=pl.UInt32),
+            "explanation": pl.Series(store.explanations, dtype=pl.Utf8),
+        }).with_columns([
+            pl.lit(data_source_dir.name).alias("data_source"),
+            pl.lit(config.get("explanation_method", "unknown")).alias("explanation_method"),
+            pl.lit(config.get("llm_explainer", "unknown")).alias("llm_explainer"),
+        ]).select(list(EXPLANATIONS_SCHEMA)))
+        print(f"Loaded explanations from: {data_source_dir.name}")
+
+    if not frames:
+        return pl.DataFrame(schema=EXPLANATIONS_SCHEMA)
+    return pl.concat(frames)
+
+
+def assign_explanation_ids(explanations: pl.DataFrame) -> pl.DataFrame:
+    """
+    Add explanation_id ("exp_001", ...) numbered by data source, then latent ID.
+
+    This is the numbering generate_detailed_json.py has always used, so IDs stay
+    stable across reruns with the same inputs.
+    """
+    explanations = explanations.sort(["data_source", "latent_id"])
+    return explanations.with_columns(
+        pl.Series(
+            "explanation_id",
+            [f"exp_{n:03d}" for n in range(1, len(explanations) + 1)],
+            dtype=pl.Utf8
+        )
+    )
+
+
+def _scores_frame_from_json(data: Dict, data_source: str, llm_scorer: str) -> pl.DataFrame:
+    latent_scores = data.get("latent_scores", {})
+    columns: Dict[str, List] = {"latent_id": [int(latent_id) for latent_id in latent_scores]}
+    for method in SCORE_METHODS:
+        columns[f"score_{method}"] = [
+            score_info.get(method, {}).get("average_score") for score_info in latent_scores.values()
+        ]
+
+    return pl.DataFrame(
+        columns,
+        schema={"latent_id": pl.UInt32, **{f"score_{method}": pl.Float64 for method in SCORE_METHODS}}
+    ).with_columns([
+        pl.lit(data_source).alias("data_source"),
+        pl.lit(llm_scorer).alias("llm_scorer"),
+    ]).select(list(SCORES_SCHEMA))
+
+
+def _scores_frame_from_parquet(path: Path, data_source: str, llm_scorer: str) -> pl.DataFrame:
+    long_scores = pl.read_parquet(path, columns=["latent_id", "method", "average_score"])
+    latent_ids = long_scores.select(pl.col("latent_id").unique(maintain_order=True).cast(pl.UInt32))
+
+    wide = latent_ids
+    for method in SCORE_METHODS:
+        method_scores = long_scores.filter(pl.col("method") == method).select([
+            pl.col("latent_id").cast(pl.UInt32),
+            pl.col("average_score").cast(pl.Float64).alias(f"score_{method}"),
+        ])
+        wide = wide.join(method_scores, on="latent_id", how="left")
+
+    return wide.with_columns([
+        pl.lit(data_source).alias("data_source"),
+        pl.lit(llm_scorer).alias("llm_scorer"),
+    ]).select(list(SCORES_SCHEMA))
+
+
+def load_scores_frame(scores_dir: Path, sae_id: str) -> pl.DataFrame:
+    """
+    One row per data source and latent with the average score of every method.
+
+    The parquet table written by process_scores.py is preferred; sources that
+    only have scores.json are read from it.
+    """
+    frames = []
+
+    if not scores_dir.exists():
+        print(f"Scores directory not found: {scores_dir}")
+        return pl.DataFrame(schema=SCORES_SCHEMA)
+
+    for data_source_dir in sorted(scores_dir.iterdir()):
+        if not data_source_dir.is_dir():
+            continue
+
+        config = _read_json(data_source_dir / "config.json") if (data_source_dir / "config.json").exists() else None
+        parquet_filename = (config or {}).get("parquet_filename")
+        parquet_path = data_source_dir / parquet_filename if parquet_filename else None
+
+        if config is not None and parquet_path is not None and parquet_path.exists():
+            if config.get("sae_id", "") != sae_id:
+                continue
+            try:
+                frames.append(_scores_frame_from_parquet(
+                    parquet_path, data_source_dir.name, config.get("llm_scorer", "unknown")
+                ))
+                print(f"Loaded scores from: {data_source_dir.name}")
+                continue
+            except (OSError, pl.ComputeError) as e:
+                print(f"Error loading scores from {parquet_path}: {e}")
+
+        scores_file = data_source_dir / "scores.json"
+        if not scores_file.exists():
+            continue
+
+        data = _read_json(scores_file)
+        if data is None or data.get("metadata", {}).get("sae_id", "") != sae_id:
+            continue
+
+        llm_scorer = data.get("metadata", {}).get("config_used", {}).get("llm_scorer", "unknown")
+        frames.append(_scores_frame_from_json(data, data_source_dir.name, llm_scorer))
+        print(f"Loaded scores from: {data_source_dir.name}")
+
+    if not frames:
+        return pl.DataFrame(schema=SCORES_SCHEMA)
+    return pl.concat(frames)
+
+
+def _distances_frame_from_json(data: Dict) -> pl.DataFrame:
+    metadata = data.get("metadata", {})
+    semantic_distances = data.get("semantic_distances", {})
+    distances = [info.get("distances", {}) for info in semantic_distances.values()]
+
+    return pl.DataFrame(
+        {
+            "latent_id": [int(latent_id) for latent_id in semantic_distances],
+            "cosine_distance": [d.get("cosine") for d in distances],
+            "euclidean_distance": [d.get("euclidean") for d in distances],
+        },
+        schema={"latent_id": pl.UInt32, "cosine_distance": pl.Float64, "euclidean_distance": pl.Float64}
+    ).with_columns([
+        pl.lit(metadata.get("data_source_1", "")).alias("data_source_1"),
+        pl.lit(metadata.get("data_source_2", "")).alias("data_source_2"),
+    ]).select(list(DISTANCES_SCHEMA))
+
+
+def load_semantic_distances_frame(distances_dir: Path, sae_id: str) -> pl.DataFrame:
+    """
+    One row per latent and source pair with its cosine and euclidean distance.
+
+    Per-comparison JSON directories are read first; all-pairs parquet outputs
+    then contribute the source pairs no JSON directory provided.
+    """
+    frames = []
+
+    if not distances_dir.exists():
+        print(f"Semantic distances directory not found: {distances_dir}")
+        return pl.DataFrame(schema=DISTANCES_SCHEMA)
+
+    comparison_dirs = sorted(d for d in distances_dir.iterdir() if d.is_dir())
+    loaded_pairs = set()
+
+    for comparison_dir in comparison_dirs:
+        distances_file = comparison_dir / "semantic_distances.json"
+        if not distances_file.exists():
+            continue
+
+        data = _read_json(distances_file)
+        if data is None:
+            continue
+
+        # Check if this distance file matches our SAE ID
+        metadata = data.get("metadata", {})
+        if metadata.get("sae_id_1", "") != sae_id or metadata.get("sae_id_2", "") != sae_id:
+            continue
+
+        frames.append(_distances_frame_from_json(data))
+        loaded_pairs.add(frozenset((metadata.get("data_source_1"), metadata.get("data_source_2"))))
+        print(f"Loaded semantic distances from: {comparison_dir.name}")
+
+    for comparison_dir in comparison_dirs:
+        distances_file = comparison_dir / ALL_PAIRS_DISTANCES_FILENAME
+        if not distances_file.exists():
+            continue
+
+        config = _read_json(comparison_dir / "config.json")
+        if config is None:
+            continue
+        sae_ids = config.get("sae_ids", {})
+
+        try:
+            all_pairs = pl.read_parquet(distances_file)
+        except (OSError, pl.ComputeError) as e:
+            print(f"Error loading distances from {distances_file}: {e}")
+            continue
+
+        pairs = all_pairs.select(["data_source_1", "data_source_2"]).unique(maintain_order=True)
+        for source_1, source_2 in pairs.iter_rows():
+            if sae_ids.get(source_1) != sae_id or sae_ids.get(source_2) != sae_id:
+                continue
+            if frozenset((source_1, source_2)) in loaded_pairs:
+                print(f"Skipping {source_1} vs {source_2} from {comparison_dir.name}: already loaded")
+                continue
+
+            pair_df = all_pairs.filter(
+                (pl.col("data_source_1") == source_1) & (pl.col("data_source_2") == source_2)
+            )
+            frames.append(pair_df.select([
+                pl.col(column).cast(dtype) if column in pair_df.columns else pl.lit(None, dtype=dtype).alias(column)
+                for column, dtype in DISTANCES_SCHEMA.items()
+            ]))
+            loaded_pairs.add(frozenset((source_1, source_2)))
+            print(f"Loaded semantic distances for {source_1} vs {source_2} from: {comparison_dir.name}")
+
+    if not frames:
+        return pl.DataFrame(schema=DISTANCES_SCHEMA)
+    return pl.concat(frames)
+
+
+def load_feature_similarities_frame(similarity_dir: Path) -> pl.DataFrame:
+    """
+    One row per latent with its closest other feature and their cosine similarity.
+
+    Reads the parquet table named in the directory's config.json when present,
+    otherwise the JSON feature_mappings.
+    """
+    config = _read_json(similarity_dir / "config.json") if (similarity_dir / "config.json").exists() else {}
+    config = config or {}
+
+    parquet_filename = config.get("parquet_filename")
+    if parquet_filename and (similarity_dir / parquet_filename).exists():
+        try:
+            return pl.read_parquet(similarity_dir / parquet_filename).select([
+                pl.col("source_feature_id").cast(pl.UInt32).alias("latent_id"),
+                pl.col("closest_feature_id").cast(pl.UInt32),
+                pl.col("cosine_similarity").cast(pl.Float32),
+            ])
+        except (OSError, pl.ComputeError) as e:
+            print(f"Error loading feature similarities from {similarity_dir / parquet_filename}: {e}")
+
+    similarity_file = similarity_dir / config.get("output_filename", "feature_similarities.json")
+    if not similarity_file.exists():
+        print(f"Feature similarity file not found: {similarity_file}")
+        return pl.DataFrame(schema=SIMILARITIES_SCHEMA)
+
+    data = _read_json(similarity_file)
+    mappings = [
+        mapping for mapping in (data or {}).get("feature_mappings", [])
+        if mapping.get("source_feature_id") is not None and mapping.get("cosine_similarity") is not None
+    ]
+    return pl.DataFrame(
+        {
+            "latent_id": [mapping["source_feature_id"] for mapping in mappings],
+            "closest_feature_id": [mapping.get("closest_feature_id") for mapping in mappings],
+            "cosine_similarity": [float(mapping["cosine_similarity"]) for mapping in mappings],
+        },
+        schema=SIMILARITIES_SCHEMA
+    )
+
+
+def load_feature_neighbors_frame(similarity_dir: Path) -> pl.DataFrame:
+    """
+    Top-k decoder neighbors of every latent, one row per (feature_id, neighbor_id).
+
+    Reads the parquet table named by neighbors_filename in the directory's
+    config.json; returns an empty frame when there is none.
+    """
+    config = _read_json(similarity_dir / "config.json") if (similarity_dir / "config.json").exists() else {}
+    neighbors_filename = (config or {}).get("neighbors_filename")
+    if not neighbors_filename or not (similarity_dir / neighbors_filename).exists():
+        print(f"No feature neighbor table found in {similarity_dir}")
+        return pl.DataFrame(schema=NEIGHBORS_SCHEMA)
+
+    try:
+        return pl.read_parquet(similarity_dir / neighbors_filename).select([
+            pl.col(column).cast(dtype) for column, dtype in NEIGHBORS_SCHEMA.items()
+        ])
+    except (OSError, pl.ComputeError) as e:
+        print(f"Error loading feature neighbors from {similarity_dir / neighbors_filename}: {e}")
+        return pl.DataFrame(schema=NEIGHBORS_SCHEMA)
@@ -5,22 +5,57 @@ Create Master Parquet from Detailed JSON Files
 This script processes detailed JSON files containing SAE feature analysis data
 and creates a master parquet file with the specified schema for efficient querying.
 
-Input: Detailed JSON files in data/detailed_json/
+With --from-intermediates the master table is instead built with Polars joins
+over the columnar pipeline outputs (embedding stores, scores, semantic distances
+and feature similarities), so the detailed JSON files are not needed; they can
+still be written from the same frames with --export-details.
+
+Input: Detailed JSON files in data/detailed_json/, or the intermediates in data/
 Output: Master parquet file following the feature_analysis schema
 
 Usage:
-    python create_master_parquet.py [--config CONFIG_FILE]
+    python create_master_parquet.py [--config CONFIG_FILE] [--parallel] [--workers N] [--incremental]
+                                    [--partitioned] [--from-intermediates [--export-details {json,packed}]]
+                                    [--sort]
 """
 
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
 import argparse
 from datetime import datetime
 
 import polars as pl
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    orjson = None
+
+from columnar_sources import (
+    load_explanations_frame,
+    load_scores_frame,
+    load_semantic_distances_frame,
+    load_feature_similarities_frame,
+    load_feature_neighbors_frame,
+)
+from generate_detailed_json import (
+    build_latent_frame,
+    latent_records,
+    write_detailed_json_files,
+    save_packed_store,
+    sanitize_sae_id_for_path,
+)
+
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +64,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+FEATURE_FILE_PATTERN = re.compile(r"feature_(\d+)\.json$")
+DEFAULT_SHARD_SIZE = 1000
+MANIFEST_VERSION = 1
+DATASET_MANIFEST_NAME = "_dataset.json"
+DEFAULT_PARTITION_BY = ["sae_id", "llm_explainer"]
+
+# Physical layout of the master parquet. By default rows keep their build order and
+# the writer's default row groups; --sort (or a sort_by list in the config) clusters
+# rows by the filter columns and feature_id with bounded row groups, so row-group
+# statistics can skip non-matching groups. benchmarks/bench_parquet_layout.py shows
+# no gain from that on the current data sizes, hence opt-in.
+DEFAULT_SORT_BY: Optional[List[str]] = None
+DEFAULT_ROW_GROUP_SIZE: Optional[int] = None
+CLUSTERED_SORT_BY = ["sae_id", "explanation_method", "llm_explainer", "llm_scorer", "feature_id"]
+CLUSTERED_ROW_GROUP_SIZE = 16384
+
+DEFAULT_DETAILS_FILENAME_PATTERN = "feature_{latent_id}.json"
+DEFAULT_NEIGHBORS_FILENAME = "feature_neighbors.parquet"
+MASTER_SCORE_COLUMNS = ["score_fuzz", "score_simulation", "score_detection", "score_embedding"]
+
+# Creator instance shared by pool workers (set once per process by _init_worker)
+_worker_creator = None
+
+
+def read_json_file(path: Path) -> Dict:
+    """Decode a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _init_worker(creator: "MasterParquetCreator") -> None:
+    """Process pool initializer: keep one creator per worker process."""
+    global _worker_creator
+    _worker_creator = creator
+
+
+def _process_shard_worker(shard_key: str, json_files: List[Path], part_path: Path) -> Tuple[str, int, int, int]:
+    """Process one shard of feature files in a worker and write it as a parquet part."""
+    return _worker_creator.process_shard(shard_key, json_files, part_path)
+
 
 class MasterParquetCreator:
     """Creates master parquet file from detailed JSON files."""
@@ -58,6 +135,26 @@ class MasterParquetCreator:
             self.output_path = Path(output_path)
 
         self.sae_id_filter = config.get("sae_id_filter", None)
+        self.shard_size = config.get("shard_size", DEFAULT_SHARD_SIZE)
+
+        # Persistent per-shard parts and their source manifest (incremental mode)
+        self.parts_dir = self.output_path.parent / f"{self.output_path.stem}_parts"
+        self.manifest_path = self.parts_dir / "manifest.json"
+
+        # Hive-partitioned copy of the master table (e.g. data/master/feature_analysis/)
+        self.dataset_dir = self.output_path.with_suffix("")
+        self.partition_by = config.get("partition_by", DEFAULT_PARTITION_BY)
+
+        # Partition keys touched by the last incremental build (None = rewrite all)
+        self.changed_partitions: Optional[Set[Tuple[str, ...]]] = None
+
+        # Top-k decoder neighbor table served next to the master table
+        self.neighbors_path = self.output_path.parent / config.get("neighbors_filename", DEFAULT_NEIGHBORS_FILENAME)
+
+        # Parquet layout options
+        self.sort_by = config.get("sort_by", DEFAULT_SORT_BY)
+        self.row_group_size = config.get("row_group_size", DEFAULT_ROW_GROUP_SIZE)
+        self.write_statistics = config.get("write_statistics", True)
 
         # Load feature similarities data
         self.feature_similarities = self._load_feature_similarities()
@@ -65,6 +162,10 @@ class MasterParquetCreator:
         # Ensure output directory exists
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
 
+    def find_feature_files(self) -> List[Path]:
+        """Find all feature JSON files below the detailed JSON directory."""
+        return list(self.detailed_json_dir.rglob("feature_*.json"))
+
     def process_all_features(self) -> pl.DataFrame:
         """Process all feature JSON files and return consolidated DataFrame."""
         all_rows = []
@@ -72,7 +173,7 @@ class MasterParquetCreator:
         error_count = 0
 
         # Find all feature JSON files
-        json_files = list(self.detailed_json_dir.rglob("feature_*.json"))
+        json_files = self.find_feature_files()
         logger.info(f"Found {len(json_files)} feature JSON files to process")
 
         for json_file in json_files:
@@ -94,10 +195,459 @@ class MasterParquetCreator:
         # Convert to DataFrame with proper schema
         return self._create_dataframe(all_rows)
 
+    def shard_feature_files(self, json_files: List[Path]) -> Dict[str, List[Path]]:
+        """
+        Group feature files into shards keyed by SAE directory and feature id bucket.
+
+        Keys are stable across runs (e.g. "<sae_dir>/shard-00003" holds feature ids
+        3000-3999 for shard_size=1000), so a shard always covers the same features.
+        """
+        shards: Dict[str, List[Path]] = {}
+        for json_file in json_files:
+            match = FEATURE_FILE_PATTERN.search(json_file.name)
+            bucket = int(match.group(1)) // self.shard_size if match else 0
+            relative_dir = json_file.parent.relative_to(self.detailed_json_dir).as_posix()
+            shard_key = f"{relative_dir}/shard-{bucket:05d}"
+            shards.setdefault(shard_key, []).append(json_file)
+
+        for files in shards.values():
+            files.sort()
+        return dict(sorted(shards.items()))
+
+    def process_shard(self, shard_key: str, json_files: List[Path], part_path: Path) -> Tuple[str, int, int, int]:
+        """
+        Process the feature files of one shard and write the rows to a parquet part.
+
+        Returns:
+            Tuple of (shard_key, processed_files, errors, rows_written)
+        """
+        rows = []
+        processed_count = 0
+        error_count = 0
+
+        for json_file in json_files:
+            try:
+                rows.extend(self._process_single_feature(json_file))
+                processed_count += 1
+            except Exception as e:
+                logger.error(f"Error processing {json_file}: {e}")
+                error_count += 1
+
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        self._create_dataframe(rows).write_parquet(part_path)
+
+        return shard_key, processed_count, error_count, len(rows)
+
+    def build_parquet_parallel(self, num_workers: Optional[int] = None) -> int:
+        """
+        Build the master parquet with a process pool, streaming rows to disk.
+
+        Each worker decodes one shard of feature files and writes it as a parquet
+        part in a staging directory; the parts are then streamed into the output
+        file, so memory stays bounded by the shard size rather than the SAE width.
+
+        Returns:
+            Number of rows written
+        """
+        json_files = self.find_feature_files()
+        shards = self.shard_feature_files(json_files)
+        num_workers = num_workers or os.cpu_count() or 1
+        logger.info(f"Found {len(json_files)} feature JSON files in {len(shards)} shards, "
+                   f"processing with {num_workers} workers")
+
+        staging_dir = Path(tempfile.mkdtemp(prefix=".parts-", dir=self.output_path.parent))
+        try:
+            part_paths = {
+                shard_key: staging_dir / f"part-{index:05d}.parquet"
+                for index, shard_key in enumerate(shards)
+            }
+            results = self._run_shards(shards, part_paths, num_workers)
+            processed_count = sum(r[0] for r in results.values())
+            error_count = sum(r[1] for r in results.values())
+            row_count = sum(r[2] for r in results.values())
+            logger.info(f"Processing complete: {processed_count} files processed, "
+                       f"{error_count} errors, {row_count} total rows")
+
+            if row_count == 0:
+                return 0
+
+            self._write_parts(list(part_paths.values()))
+            return row_count
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _run_shards(
+        self,
+        shards: Dict[str, List[Path]],
+        part_paths: Dict[str, Path],
+        num_workers: int
+    ) -> Dict[str, Tuple[int, int, int]]:
+        """Process shards in a process pool and return (files, errors, rows) per shard."""
+        results = {}
+        if not shards:
+            return results
+
+        # Forking after Polars has started its thread pool can deadlock the workers
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self,)
+        ) as pool:
+            futures = [
+                pool.submit(_process_shard_worker, shard_key, files, part_paths[shard_key])
+                for shard_key, files in shards.items()
+            ]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                shard_key, shard_processed, shard_errors, shard_rows = future.result()
+                results[shard_key] = (shard_processed, shard_errors, shard_rows)
+                logger.info(f"Shard {shard_key} done ({completed}/{len(futures)}): "
+                           f"{shard_processed} files, {shard_rows} rows")
+
+        return results
+
+    def build_parquet_incremental(self, num_workers: Optional[int] = None) -> int:
+        """
+        Rebuild the master parquet, reprocessing only shards whose inputs changed.
+
+        Every shard keeps a persistent parquet part in parts_dir. The manifest stores
+        size, mtime and SHA-1 of each source file per shard; a shard is reprocessed
+        when a file was added, removed or changed content, or when an input shared by
+        all shards (feature similarities, SAE filter, shard size) changed.
+
+        The master parquet is a single file, so it is still rewritten in full by
+        streaming every part into it (skipped when no shard changed and the layout
+        options are the same). The partitioned dataset is updated incrementally:
+        each manifest entry records the partition keys of its part, and the keys
+        of changed or deleted shards end up in changed_partitions, so
+        write_partitioned_dataset only replaces those partitions.
+
+        Returns:
+            Number of rows written
+        """
+        json_files = self.find_feature_files()
+        shards = self.shard_feature_files(json_files)
+        num_workers = num_workers or os.cpu_count() or 1
+
+        manifest = self._load_manifest()
+        stored_shards = manifest.get("shards", {})
+        fingerprint = self._dependency_fingerprint()
+        previous_shards = stored_shards
+        if manifest.get("dependency_fingerprint") != fingerprint:
+            if stored_shards:
+                logger.info("Inputs shared by all shards changed, rebuilding every shard")
+            previous_shards = {}
+
+        shard_entries = {}
+        dirty_shards = {}
+        for shard_key, files in shards.items():
+            previous = previous_shards.get(shard_key)
+            entry = self._shard_manifest_entry(shard_key, files, previous)
+            shard_entries[shard_key] = entry
+            if (previous is None or self._file_digests(previous) != self._file_digests(entry)
+                    or not (self.parts_dir / entry["part"]).exists()):
+                dirty_shards[shard_key] = files
+            else:
+                entry["rows"] = previous["rows"]
+
+        deleted_shards = set(stored_shards) - set(shards)
+        changed_partitions = set()
+        for shard_key in set(dirty_shards) | deleted_shards:
+            changed_partitions.update(self._stored_partition_keys(manifest, stored_shards.get(shard_key)))
+
+        for shard_key in deleted_shards:
+            logger.info(f"Removing part of deleted shard {shard_key}")
+            (self.parts_dir / stored_shards[shard_key]["part"]).unlink(missing_ok=True)
+
+        logger.info(f"Found {len(json_files)} feature JSON files in {len(shards)} shards, "
+                   f"{len(dirty_shards)} changed, processing with {num_workers} workers")
+
+        part_paths = {key: self.parts_dir / shard_entries[key]["part"] for key in dirty_shards}
+        results = self._run_shards(dirty_shards, part_paths, num_workers)
+        for shard_key, (_, shard_errors, shard_rows) in results.items():
+            if shard_errors:
+                # Leave failed shards out of the manifest so the next run retries them
+                shard_entries[shard_key]["files"] = {}
+            shard_entries[shard_key]["rows"] = shard_rows
+
+        for shard_key, entry in shard_entries.items():
+            stored = None if shard_key in dirty_shards else stored_shards.get(shard_key)
+            partitions = self._stored_partition_keys(manifest, stored)
+            if stored is None or "partitions" not in stored or manifest.get("partition_by") != self.partition_by:
+                partitions = self._part_partition_keys(self.parts_dir / entry["part"])
+            entry["partitions"] = [list(keys) for keys in sorted(partitions)]
+            if shard_key in dirty_shards:
+                changed_partitions.update(partitions)
+        # Without valid stored keys the partitions of deleted rows are unknown
+        valid_keys = manifest.get("partition_by") == self.partition_by
+        self.changed_partitions = changed_partitions if valid_keys else None
+
+        layout = {
+            "sort_by": self.sort_by,
+            "row_group_size": self.row_group_size,
+            "write_statistics": self.write_statistics
+        }
+        self._save_manifest({
+            "version": MANIFEST_VERSION,
+            "updated_at": datetime.now().isoformat(),
+            "dependency_fingerprint": fingerprint,
+            "partition_by": self.partition_by,
+            "layout": layout,
+            "shards": shard_entries
+        })
+
+        row_count = sum(entry["rows"] for entry in shard_entries.values())
+        if row_count == 0:
+            return 0
+
+        if (not dirty_shards and not deleted_shards and manifest.get("layout") == layout
+                and self.output_path.exists()):
+            logger.info(f"No shard changed, keeping {self.output_path}")
+            return row_count
+
+        self._write_parts([self.parts_dir / entry["part"] for entry in shard_entries.values()])
+        return row_count
+
+    def _stored_partition_keys(self, manifest: Dict, entry: Optional[Dict]) -> Set[Tuple[str, ...]]:
+        """Partition keys recorded for a shard by a previous build, if still valid."""
+        if entry is None or manifest.get("partition_by") != self.partition_by:
+            return set()
+        return {tuple(keys) for keys in entry.get("partitions", [])}
+
+    def _part_partition_keys(self, part_path: Path) -> Set[Tuple[str, ...]]:
+        """Distinct partition key values of the rows in a parquet part."""
+        if not part_path.exists():
+            return set()
+        with pl.StringCache():
+            keys = (
+                pl.scan_parquet(part_path, hive_partitioning=False)
+                .select([pl.col(col).cast(pl.Utf8) for col in self.partition_by])
+                .unique()
+                .collect()
+            )
+        return set(keys.rows())
+
+    def _shard_manifest_entry(self, shard_key: str, files: List[Path], previous: Optional[Dict]) -> Dict:
+        """Build the manifest entry for a shard, hashing only files whose stat changed."""
+        previous_files = previous["files"] if previous else {}
+        file_records = {}
+
+        for json_file in files:
+            relative_path = json_file.relative_to(self.detailed_json_dir).as_posix()
+            stat = json_file.stat()
+            known = previous_files.get(relative_path)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                digest = known["sha1"]
+            else:
+                digest = hashlib.sha1(json_file.read_bytes()).hexdigest()
+            file_records[relative_path] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha1": digest
+            }
+
+        return {"part": f"{shard_key}.parquet", "files": file_records, "rows": 0}
+
+    @staticmethod
+    def _file_digests(entry: Dict) -> Dict[str, str]:
+        """Map each source file of a shard manifest entry to its content hash."""
+        return {path: record["sha1"] for path, record in entry["files"].items()}
+
+    def _dependency_fingerprint(self) -> str:
+        """Fingerprint of the inputs that affect every shard."""
+        dependencies = {
+            "manifest_version": MANIFEST_VERSION,
+            "sae_id_filter": self.sae_id_filter,
+            "shard_size": self.shard_size,
+            "feature_similarities": None
+        }
+        similarity_file = self._find_similarity_file()
+        if similarity_file is not None and similarity_file.exists():
+            dependencies["feature_similarities"] = hashlib.sha1(similarity_file.read_bytes()).hexdigest()
+
+        return hashlib.sha1(json.dumps(dependencies, sort_keys=True).encode()).hexdigest()
+
+    def _load_manifest(self) -> Dict:
+        """Load the incremental build manifest, or an empty one."""
+        if not self.manifest_path.exists():
+            return {"shards": {}}
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {"shards": {}}
+
+        if manifest.get("version") != MANIFEST_VERSION:
+            logger.info("Manifest version changed, rebuilding every shard")
+            return {"shards": {}}
+        return manifest
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        """Atomically write the incremental build manifest."""
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_parts(self, part_paths: List[Path]) -> None:
+        """Stream parquet parts into the master parquet file without collecting them."""
+        logger.info(f"Streaming {len(part_paths)} parts into {self.output_path}")
+        with pl.StringCache():
+            lf = pl.scan_parquet([str(p) for p in part_paths], hive_partitioning=False)
+            self._sorted(lf).sink_parquet(
+                self.output_path,
+                statistics=self.write_statistics,
+                row_group_size=self.row_group_size
+            )
+
+    def _sorted(self, frame):
+        """
+        Sort a DataFrame/LazyFrame by sort_by; a no-op unless sorting is enabled.
+
+        Only contiguity of equal filter values matters for row-group skipping.
+        Polars orders categorical columns by their physical codes unless lexical
+        ordering is requested, so the columns are sorted by name as they are;
+        sorting by expressions instead would make sink_parquet fall back to the
+        non-streaming engine, which it does not support.
+        """
+        if not self.sort_by:
+            return frame
+        return frame.sort(self.sort_by)
+
+    def write_partitioned_dataset(self, changed_partitions: Optional[Set[Tuple[str, ...]]] = None) -> int:
+        """
+        Write the master parquet as a hive-partitioned dataset keyed by partition_by.
+
+        Layout: <dataset_dir>/sae_id=<value>/llm_explainer=<value>/part-0.parquet, with
+        values percent-encoded. Partition columns are also kept inside the files, and
+        a _dataset.json manifest lists every partition with its key values so readers
+        can prune partitions without parsing directory names.
+
+        With changed_partitions (from an incremental build) only those partitions
+        are rewritten, from the shard parts that contain them, and _dataset.json is
+        updated; otherwise the whole dataset is rewritten from the master parquet.
+
+        Returns:
+            Number of partitions written
+        """
+        if changed_partitions is not None:
+            dataset = self._load_dataset_manifest()
+            if dataset is not None and dataset.get("partition_by") == self.partition_by:
+                return self._update_partitions(dataset, changed_partitions)
+            logger.info("No compatible partitioned dataset to update, writing it in full")
+
+        logger.info(f"Writing partitioned dataset to {self.dataset_dir} (partition_by={self.partition_by})")
+
+        with pl.StringCache():
+            master = pl.scan_parquet(self.output_path, hive_partitioning=False)
+            partition_keys = (
+                master.select([pl.col(col).cast(pl.Utf8) for col in self.partition_by])
+                .unique()
+                .sort(self.partition_by)
+                .collect()
+                .to_dicts()
+            )
+
+            staging_dir = Path(tempfile.mkdtemp(prefix=".dataset-", dir=self.output_path.parent))
+            try:
+                partitions = [self._write_partition(master, keys, staging_dir) for keys in partition_keys]
+                self._save_dataset_manifest(staging_dir, partitions)
+
+                shutil.rmtree(self.dataset_dir, ignore_errors=True)
+                os.replace(staging_dir, self.dataset_dir)
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        logger.info(f"Partitioned dataset complete: {len(partitions)} partitions")
+        return len(partitions)
+
+    def _update_partitions(self, dataset: Dict, changed_partitions: Set[Tuple[str, ...]]) -> int:
+        """Rewrite or remove the changed partitions of an existing dataset from the shard parts."""
+        if not changed_partitions:
+            # Leave _dataset.json untouched so the backend's data version stays the same
+            logger.info(f"No partition of {self.dataset_dir} changed")
+            return 0
+
+        logger.info(f"Updating {len(changed_partitions)} partitions of {self.dataset_dir}")
+        entries = list(self._load_manifest().get("shards", {}).values())
+        partitions = {
+            tuple(partition["keys"][col] for col in self.partition_by): partition
+            for partition in dataset["partitions"]
+        }
+
+        with pl.StringCache():
+            for key_tuple in sorted(changed_partitions):
+                keys = dict(zip(self.partition_by, key_tuple))
+                sources = [
+                    str(self.parts_dir / entry["part"]) for entry in entries
+                    if list(key_tuple) in entry.get("partitions", [])
+                ]
+                if not sources:
+                    logger.info(f"Removing empty partition {keys}")
+                    partitions.pop(key_tuple, None)
+                    shutil.rmtree(self.dataset_dir / self._partition_dir(keys), ignore_errors=True)
+                    continue
+
+                source = self._sorted(pl.scan_parquet(sources, hive_partitioning=False))
+                partitions[key_tuple] = self._write_partition(source, keys, self.dataset_dir)
+
+        self._save_dataset_manifest(self.dataset_dir, [partitions[key] for key in sorted(partitions)])
+        logger.info(f"Partitioned dataset updated: {len(partitions)} partitions")
+        return len(changed_partitions)
+
+    def _partition_dir(self, keys: Dict[str, str]) -> Path:
+        return Path(*[f"{col}={quote(str(keys[col]), safe='')}" for col in self.partition_by])
+
+    def _write_partition(self, source: pl.LazyFrame, keys: Dict[str, str], dataset_dir: Path) -> Dict:
+        """Sink the rows of one partition to its part file and return its manifest entry."""
+        relative_dir = self._partition_dir(keys)
+        part_path = dataset_dir / relative_dir / "part-0.parquet"
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+
+        condition = pl.all_horizontal([
+            pl.col(col).cast(pl.Utf8) == keys[col] for col in self.partition_by
+        ])
+        tmp_path = part_path.with_suffix(".parquet.tmp")
+        source.filter(condition).sink_parquet(
+            tmp_path,
+            statistics=self.write_statistics,
+            row_group_size=self.row_group_size
+        )
+        os.replace(tmp_path, part_path)
+
+        return {
+            "keys": keys,
+            "path": (relative_dir / part_path.name).as_posix(),
+            "rows": pl.scan_parquet(part_path, hive_partitioning=False)
+            .select(pl.count()).collect().item()
+        }
+
+    def _load_dataset_manifest(self) -> Optional[Dict]:
+        """Load the partitioned dataset manifest, or None if there is no readable one."""
+        manifest_path = self.dataset_dir / DATASET_MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def _save_dataset_manifest(self, dataset_dir: Path, partitions: List[Dict]) -> None:
+        """Atomically write the partitioned dataset manifest."""
+        tmp_path = dataset_dir / (DATASET_MANIFEST_NAME + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "partition_by": self.partition_by,
+                "partitions": partitions
+            }, f, indent=2)
+        os.replace(tmp_path, dataset_dir / DATASET_MANIFEST_NAME)
+
     def _process_single_feature(self, json_file: Path) -> List[Dict]:
         """Process a single feature JSON file and return rows for master table."""
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = read_json_file(json_file)
 
         # Extract basic feature information
         feature_id = data["feature_id"]
@@ -192,28 +742,34 @@ class MasterParquetCreator:
                 return score
         return None
 
+    def _find_similarity_file(self) -> Optional[Path]:
+        """Locate the feature similarities file for the filtered SAE ID."""
+        if not self.sae_id_filter:
+            return None
+
+        # Try to resolve relative to project root first
+        project_root = Path.cwd()
+        while project_root.name != "interface" and project_root.parent != project_root:
+            project_root = project_root.parent
+
+        # Convert slashes to double dashes for directory name
+        sae_dir_name = self.sae_id_filter.replace("/", "--")
+        # If we found the interface directory, use it as base
+        if project_root.name == "interface":
+            similarity_dir = project_root / "data" / "feature_similarity" / sae_dir_name
+        else:
+            # Fallback to relative path from current directory
+            similarity_dir = Path("../../../feature_similarity") / sae_dir_name
+
+        return similarity_dir / "feature_similarities.json"
+
     def _load_feature_similarities(self) -> Dict[int, float]:
         """Load feature similarities data and return mapping of feature_id to cosine_similarity."""
         similarities = {}
 
         # Look for similarity data based on SAE ID
-        if self.sae_id_filter:
-            # Try to resolve relative to project root first
-            project_root = Path.cwd()
-            while project_root.name != "interface" and project_root.parent != project_root:
-                project_root = project_root.parent
-
-            # Convert slashes to double dashes for directory name
-            sae_dir_name = self.sae_id_filter.replace("/", "--")
-            # If we found the interface directory, use it as base
-            if project_root.name == "interface":
-                similarity_dir = project_root / "data" / "feature_similarity" / sae_dir_name
-            else:
-                # Fallback to relative path from current directory
-                similarity_dir = Path("../../../feature_similarity") / sae_dir_name
-
-            similarity_file = similarity_dir / "feature_similarities.json"
-
+        similarity_file = self._find_similarity_file()
+        if similarity_file is not None:
             if similarity_file.exists():
                 try:
                     with open(similarity_file, 'r', encoding='utf-8') as f:
@@ -246,17 +802,166 @@ class MasterParquetCreator:
             logger.debug(f"No similarity data for feature {feature_id}, using fallback value 0.0")
             return 0.0
 
+    def load_intermediates(self) -> Dict[str, pl.DataFrame]:
+        """
+        Load the columnar pipeline outputs of the filtered SAE ID.
+
+        Returns frames keyed by explanations, scores, distances and similarities,
+        read from the data directory holding detailed_json_directory.
+        """
+        if not self.sae_id_filter:
+            raise ValueError("sae_id_filter is required to build from intermediates")
+
+        data_dir = self.detailed_json_dir.parent
+        sae_id = self.sae_id_filter
+        frames = {
+            "explanations": load_explanations_frame(data_dir / "embeddings", sae_id),
+            "scores": load_scores_frame(data_dir / "scores", sae_id),
+            "distances": load_semantic_distances_frame(data_dir / "semantic_distances", sae_id),
+            "similarities": load_feature_similarities_frame(self._similarity_dir())
+        }
+
+        for name, frame in frames.items():
+            logger.info(f"Loaded {len(frame)} {name} rows")
+        return frames
+
+    def build_from_intermediates(self, frames: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+        """
+        Build the master table by joining the intermediate frames.
+
+        Produces the same rows as the detailed JSON route: one row per explanation
+        with a score set from the same data source, semantic distance statistics
+        over the pairs whose sources both have an explanation for the feature, and
+        the absolute closest-feature similarity (0.0 when missing).
+        """
+        explanations = frames["explanations"]
+        present = explanations.select(["latent_id", "data_source"])
+
+        semdist = (
+            frames["distances"]
+            .join(present.rename({"data_source": "data_source_1"}), on=["latent_id", "data_source_1"])
+            .join(present.rename({"data_source": "data_source_2"}), on=["latent_id", "data_source_2"])
+            .group_by("latent_id")
+            .agg([
+                pl.col("cosine_distance").mean().alias("semdist_mean"),
+                pl.col("cosine_distance").max().alias("semdist_max")
+            ])
+        )
+
+        similarities = frames["similarities"].select([
+            "latent_id",
+            pl.col("cosine_similarity").abs().alias("feature_splitting")
+        ])
+
+        rows = explanations.join(
+            frames["scores"].select(["latent_id", "data_source", "llm_scorer"] + MASTER_SCORE_COLUMNS),
+            on=["latent_id", "data_source"],
+            how="inner"
+        )
+        missing = len(explanations) - len(rows)
+        if missing:
+            logger.warning(f"{missing} explanations have no matching score set and were skipped")
+
+        if rows.is_empty():
+            logger.warning("No rows to process, creating empty DataFrame")
+            return self._create_empty_dataframe()
+
+        details_dir = Path(self.config["detailed_json_directory"]) / sanitize_sae_id_for_path(self.sae_id_filter)
+        details_prefix, _, details_suffix = (details_dir / self.config.get(
+            "details_filename_pattern", DEFAULT_DETAILS_FILENAME_PATTERN
+        )).as_posix().partition("{latent_id}")
+
+        df = (
+            rows
+            .join(semdist, on="latent_id", how="left")
+            .join(similarities, on="latent_id", how="left")
+            .select([
+                pl.col("latent_id").alias("feature_id"),
+                pl.lit(self.sae_id_filter).alias("sae_id"),
+                "explanation_method",
+                "llm_explainer",
+                "llm_scorer",
+                pl.col("feature_splitting").fill_null(0.0),
+                "semdist_mean",
+                "semdist_max",
+                *MASTER_SCORE_COLUMNS,
+                pl.concat_str([
+                    pl.lit(details_prefix), pl.col("latent_id").cast(pl.Utf8), pl.lit(details_suffix)
+                ]).alias("details_path")
+            ])
+        )
+        return self._apply_schema(df)
+
+    def _similarity_dir(self) -> Path:
+        """Feature similarity output directory of the filtered SAE in the data directory."""
+        return self.detailed_json_dir.parent / "feature_similarity" / sanitize_sae_id_for_path(self.sae_id_filter)
+
+    def save_neighbor_table(self) -> int:
+        """
+        Write the top-k decoder neighbor table of the filtered SAE next to the master parquet.
+
+        Rows are (sae_id, feature_id, neighbor_id, cosine_similarity), sorted by
+        feature_id and descending similarity, which is the order the backend
+        neighbor index relies on. Returns the number of rows written (0 when
+        calculate_feature_similarities.py produced no neighbor table).
+        """
+        if not self.sae_id_filter:
+            logger.info("No SAE ID filter specified, skipping neighbor table")
+            return 0
+
+        neighbors = load_feature_neighbors_frame(self._similarity_dir())
+        if neighbors.is_empty():
+            logger.info(f"No feature neighbor table for {self.sae_id_filter}, skipping")
+            return 0
+
+        table = neighbors.select([
+            pl.lit(self.sae_id_filter).cast(pl.Categorical).alias("sae_id"),
+            pl.all()
+        ]).sort(["feature_id", "cosine_similarity"], descending=[False, True])
+
+        table.write_parquet(
+            self.neighbors_path,
+            statistics=self.write_statistics,
+            row_group_size=self.row_group_size
+        )
+        logger.info(f"Neighbor table saved to {self.neighbors_path}: {len(table)} rows "
+                   f"({table['feature_id'].n_unique()} features)")
+        return len(table)
+
+    def export_details(self, frames: Dict[str, pl.DataFrame], mode: str, num_workers: Optional[int] = None) -> int:
+        """
+        Write the detailed JSON of the filtered SAE from the intermediate frames.
+
+        mode is "json" for per-feature files or "packed" for the packed JSONL store.
+        Returns the number of features written.
+        """
+        sae_id = self.sae_id_filter
+        output_dir = self.detailed_json_dir / sanitize_sae_id_for_path(sae_id)
+        latent_frame = build_latent_frame(frames["explanations"], frames["scores"], frames["distances"])
+
+        if mode == "packed":
+            written = save_packed_store(latent_records(latent_frame, sae_id), output_dir)
+        else:
+            written = write_detailed_json_files(
+                latent_frame, sae_id, output_dir,
+                self.config.get("details_filename_pattern", DEFAULT_DETAILS_FILENAME_PATTERN),
+                num_workers or os.cpu_count() or 1, self.shard_size
+            )
+
+        logger.info(f"Exported {written} feature details ({mode}) to {output_dir}")
+        return written
+
     def _create_dataframe(self, rows: List[Dict]) -> pl.DataFrame:
         """Create Polars DataFrame with proper schema."""
         if not rows:
             logger.warning("No rows to process, creating empty DataFrame")
             return self._create_empty_dataframe()
 
-        # Create DataFrame
-        df = pl.DataFrame(rows)
+        return self._apply_schema(pl.DataFrame(rows))
 
-        # Apply proper data types according to schema
-        df = df.with_columns([
+    def _apply_schema(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Cast master table columns to the feature_analysis schema."""
+        return df.with_columns([
             pl.col("feature_id").cast(pl.UInt32),
             pl.col("sae_id").cast(pl.Categorical),
             pl.col("explanation_method").cast(pl.Categorical),
@@ -272,8 +977,6 @@ class MasterParquetCreator:
             pl.col("details_path").cast(pl.Utf8)
         ])
 
-        return df
-
     def _create_empty_dataframe(self) -> pl.DataFrame:
         """Create empty DataFrame with correct schema."""
         return pl.DataFrame(
@@ -332,13 +1035,21 @@ class MasterParquetCreator:
     def save_parquet(self, df: pl.DataFrame) -> None:
         """Save DataFrame as parquet file."""
         logger.info(f"Saving parquet file to {self.output_path}")
-        df.write_parquet(self.output_path)
+        self._sorted(df).write_parquet(
+            self.output_path,
+            statistics=self.write_statistics,
+            row_group_size=self.row_group_size
+        )
 
-        # Save metadata
+        self.save_metadata(len(df), len(df.select("feature_id").unique()))
+        logger.info(f"Master parquet creation complete: {len(df)} rows saved")
+
+    def save_metadata(self, total_rows: int, total_features: int) -> None:
+        """Save the metadata JSON next to the master parquet file."""
         metadata = {
             "created_at": datetime.now().isoformat(),
-            "total_rows": len(df),
-            "total_features": len(df.select("feature_id").unique()),
+            "total_rows": total_rows,
+            "total_features": total_features,
             "schema_version": "1.0",
             "source_directory": str(self.detailed_json_dir),
             "config": self.config
@@ -349,7 +1060,6 @@ class MasterParquetCreator:
             json.dump(metadata, f, indent=2)
 
         logger.info(f"Metadata saved to {metadata_path}")
-        logger.info(f"Master parquet creation complete: {len(df)} rows saved")
 
 
 def load_config(config_path: Optional[str] = None) -> Dict:
@@ -357,7 +1067,21 @@ def load_config(config_path: Optional[str] = None) -> Dict:
     default_config = {
         "detailed_json_directory": "data/detailed_json",
         "output_path": "data/master/feature_analysis.parquet",
-        "sae_id_filter": None  # Process all SAE IDs by default
+        "sae_id_filter": None,  # Process all SAE IDs by default
+        "parallel": False,
+        "incremental": False,
+        "write_partitioned_dataset": False,
+        "partition_by": DEFAULT_PARTITION_BY,
+        "sort_by": DEFAULT_SORT_BY,
+        "row_group_size": DEFAULT_ROW_GROUP_SIZE,
+        "write_statistics": True,
+        "num_workers": None,  # Defaults to CPU count in parallel mode
+        "shard_size": DEFAULT_SHARD_SIZE,
+        "from_intermediates": False,
+        "export_details": None,  # "json" or "packed" when building from intermediates
+        "details_filename_pattern": DEFAULT_DETAILS_FILENAME_PATTERN,
+        "write_neighbor_table": True,
+        "neighbors_filename": DEFAULT_NEIGHBORS_FILENAME
     }
 
     if config_path and Path(config_path).exists():
@@ -371,15 +1095,114 @@ def load_config(config_path: Optional[str] = None) -> Dict:
     return default_config
 
 
+def run_serial(creator: MasterParquetCreator) -> int:
+    """Build the master parquet in a single process."""
+    # Process all features
+    logger.info("Starting master parquet creation...")
+    df = creator.process_all_features()
+
+    if len(df) == 0:
+        logger.error("No data to save")
+        return 1
+
+    # Validate output
+    if not creator.validate_output(df):
+        logger.error("Validation failed")
+        return 1
+
+    # Save parquet file
+    creator.save_parquet(df)
+
+    logger.info("Master parquet creation completed successfully")
+    return 0
+
+
+def run_from_intermediates(
+    creator: MasterParquetCreator,
+    export_details: Optional[str] = None,
+    num_workers: Optional[int] = None
+) -> int:
+    """Build the master parquet from the columnar intermediates, optionally exporting details."""
+    logger.info("Starting master parquet creation from intermediates...")
+    try:
+        frames = creator.load_intermediates()
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    df = creator.build_from_intermediates(frames)
+
+    if len(df) == 0:
+        logger.error("No data to save")
+        return 1
+
+    if not creator.validate_output(df):
+        logger.error("Validation failed")
+        return 1
+
+    creator.save_parquet(df)
+
+    if export_details:
+        creator.export_details(frames, export_details, num_workers)
+
+    logger.info("Master parquet creation completed successfully")
+    return 0
+
+
+def run_parallel(creator: MasterParquetCreator, num_workers: Optional[int], incremental: bool = False) -> int:
+    """Build the master parquet in parallel (optionally incremental) mode, then validate it from disk."""
+    if incremental:
+        logger.info("Starting incremental master parquet creation...")
+        row_count = creator.build_parquet_incremental(num_workers)
+    else:
+        logger.info("Starting parallel master parquet creation...")
+        row_count = creator.build_parquet_parallel(num_workers)
+
+    if row_count == 0:
+        logger.error("No data to save")
+        return 1
+
+    # Validate from the written file; details_path is not needed for validation
+    df = pl.read_parquet(creator.output_path, columns=[
+        "feature_id", "sae_id", "explanation_method", "llm_explainer", "llm_scorer", "feature_splitting"
+    ])
+    if not creator.validate_output(df):
+        logger.error("Validation failed")
+        return 1
+
+    creator.save_metadata(len(df), df["feature_id"].n_unique())
+    logger.info(f"Master parquet creation completed successfully: {row_count} rows saved")
+    return 0
+
+
 def main():
     """Main execution function."""
     parser = argparse.ArgumentParser(description="Create master parquet from detailed JSON files")
     parser.add_argument("--config", help="Path to configuration file")
     parser.add_argument("--validate-only", action="store_true",
                        help="Only validate existing parquet file")
+    parser.add_argument("--parallel", action="store_true",
+                       help="Process feature files in a process pool and stream rows to disk")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Number of worker processes for --parallel (default: CPU count)")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Reprocess only shards whose source files changed since the last build")
+    parser.add_argument("--partitioned", action="store_true",
+                       help="Also write a hive-partitioned dataset next to the master parquet")
+    parser.add_argument("--from-intermediates", action="store_true",
+                       help="Join the embedding, score, distance and similarity outputs instead of "
+                            "reading detailed JSON files")
+    parser.add_argument("--export-details", choices=["json", "packed"], default=None,
+                       help="With --from-intermediates, also write the detailed JSON files or packed store")
+    parser.add_argument("--sort", action="store_true",
+                       help="Cluster rows by the filter columns and feature_id with bounded row groups "
+                            "(applies to every build mode)")
     args = parser.parse_args()
 
     config = load_config(args.config)
+    if args.sort:
+        config["sort_by"] = config.get("sort_by") or CLUSTERED_SORT_BY
+        config["row_group_size"] = config.get("row_group_size") or CLUSTERED_ROW_GROUP_SIZE
     creator = MasterParquetCreator(config)
 
     if args.validate_only:
@@ -393,24 +1216,26 @@ def main():
         creator.validate_output(df)
         return 0
 
-    # Process all features
-    logger.info("Starting master parquet creation...")
-    df = creator.process_all_features()
-
-    if len(df) == 0:
-        logger.error("No data to save")
-        return 1
+    if args.from_intermediates or config.get("from_intermediates", False):
+        status = run_from_intermediates(
+            creator,
+            args.export_details or config.get("export_details"),
+            args.workers or config.get("num_workers")
+        )
+    elif args.incremental or config.get("incremental", False):
+        status = run_parallel(creator, args.workers or config.get("num_workers"), incremental=True)
+    elif args.parallel or config.get("parallel", False):
+        status = run_parallel(creator, args.workers or config.get("num_workers"))
+    else:
+        status = run_serial(creator)
 
-    # Validate output
-    if not creator.validate_output(df):
-        logger.error("Validation failed")
-        return 1
+    if status == 0 and (args.partitioned or config.get("write_partitioned_dataset", False)):
+        creator.write_partitioned_dataset(creator.changed_partitions)
 
-    # Save parquet file
-    creator.save_parquet(df)
+    if status == 0 and config.get("write_neighbor_table", True):
+        creator.save_neighbor_table()
 
-    logger.info("Master parquet creation completed successfully")
-    return 0
+    return status
 
 
 if __name__ == "__main__":
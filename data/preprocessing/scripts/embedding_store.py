@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Binary embedding store shared by the embedding pipeline scripts.
+
+Each data source directory under data/embeddings/ holds:
+- embeddings.npy: float32 (latents, dim) matrix, one row per latent
+- latent_ids.npy: int64 latent IDs, sorted, aligned with the matrix rows
+- explanations.parquet: latent_id / explanation table
+- metadata.json: run metadata (model, task_type, dataset, sae_id, config_used)
+
+Consumers open the matrix with np.load(mmap_mode='r'), so loading is
+independent of the embedding dimension and only touched rows are paged in.
+Directories that only have the legacy embeddings.json are converted in memory
+on load; run this script to convert them on disk once.
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+EMBEDDINGS_MATRIX_FILENAME = "embeddings.npy"
+LATENT_IDS_FILENAME = "latent_ids.npy"
+EXPLANATIONS_FILENAME = "explanations.parquet"
+METADATA_FILENAME = "metadata.json"
+LEGACY_JSON_FILENAME = "embeddings.json"
+
+
+class EmbeddingStore:
+    """Row-aligned latent IDs, embedding matrix and explanations of one data source."""
+
+    def __init__(self, metadata: Dict, latent_ids: np.ndarray, matrix: np.ndarray, explanations: List[str]):
+        self.metadata = metadata
+        self.latent_ids = latent_ids
+        self.matrix = matrix
+        self.explanations = explanations
+
+    def __len__(self) -> int:
+        return len(self.latent_ids)
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @classmethod
+    def from_json_data(cls, data: Dict) -> "EmbeddingStore":
+        """
+        Build a store from the legacy embeddings.json structure.
+
+        Latents with a missing embedding or a dimension differing from the first
+        one are skipped.
+        """
+        latent_ids = []
+        rows = []
+        explanations = []
+        embedding_dim = None
+
+        for latent_id in sorted(data.get("embeddings", {}).keys(), key=int):
+            embedding_info = data["embeddings"][latent_id]
+            embedding = embedding_info.get("embedding")
+
+            if embedding is None:
+                print(f"Missing embedding for latent {latent_id}")
+                continue
+
+            if embedding_dim is None:
+                embedding_dim = len(embedding)
+            elif len(embedding) != embedding_dim:
+                print(f"Embedding dimension mismatch for latent {latent_id}: {len(embedding)} vs {embedding_dim}")
+                continue
+
+            latent_ids.append(int(latent_id))
+            rows.append(embedding)
+            explanations.append(embedding_info.get("explanation", ""))
+
+        matrix = np.asarray(rows, dtype=np.float32).reshape(len(latent_ids), embedding_dim or 0)
+        return cls(dict(data.get("metadata", {})), np.asarray(latent_ids, dtype=np.int64), matrix, explanations)
+
+    @classmethod
+    def open(cls, directory: Path, mmap: bool = True) -> "EmbeddingStore":
+        """Open a store written by save(); the matrix is memory-mapped unless mmap is False."""
+        directory = Path(directory)
+        with open(directory / METADATA_FILENAME, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        latent_ids = np.load(directory / LATENT_IDS_FILENAME)
+        matrix = np.load(directory / EMBEDDINGS_MATRIX_FILENAME, mmap_mode='r' if mmap else None)
+        explanations_df = pl.read_parquet(directory / EXPLANATIONS_FILENAME)
+
+        if len(matrix) != len(latent_ids) or len(explanations_df) != len(latent_ids):
+            raise ValueError(
+                f"Embedding store {directory} is inconsistent: {len(latent_ids)} latent IDs, "
+                f"{len(matrix)} embeddings, {len(explanations_df)} explanations"
+            )
+
+        return cls(metadata, latent_ids, matrix, explanations_df["explanation"].to_list())
+
+    def save(self, directory: Path) -> None:
+        """Write the store files into directory."""
+        os.makedirs(directory, exist_ok=True)
+        directory = Path(directory)
+
+        np.save(directory / EMBEDDINGS_MATRIX_FILENAME, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        np.save(directory / LATENT_IDS_FILENAME, np.asarray(self.latent_ids, dtype=np.int64))
+        pl.DataFrame({
+            "latent_id": pl.Series(self.latent_ids, dtype=pl.Int64),
+            "explanation": pl.Series(self.explanations, dtype=pl.Utf8)
+        }).write_parquet(directory / EXPLANATIONS_FILENAME)
+
+        metadata = dict(self.metadata)
+        metadata["total_latents"] = len(self)
+        metadata["embedding_dim"] = self.embedding_dim
+        with open(directory / METADATA_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    def explanation_records(self) -> Dict[str, Dict]:
+        """Per-latent explanation entries keyed like embeddings.json, without the vectors."""
+        embedding_dim = self.embedding_dim
+        return {
+            str(latent_id): {"explanation": explanation, "embedding_dim": embedding_dim}
+            for latent_id, explanation in zip(self.latent_ids.tolist(), self.explanations)
+        }
+
+
+def has_embedding_store(directory: Path) -> bool:
+    """Whether directory contains all files of a binary embedding store."""
+    directory = Path(directory)
+    return all(
+        (directory / filename).exists()
+        for filename in (EMBEDDINGS_MATRIX_FILENAME, LATENT_IDS_FILENAME, EXPLANATIONS_FILENAME, METADATA_FILENAME)
+    )
+
+
+def load_embedding_store(directory: Path, json_filename: str = LEGACY_JSON_FILENAME) -> Optional[EmbeddingStore]:
+    """
+    Open the embedding store in directory, falling back to its legacy JSON file.
+
+    Returns None (after printing the reason) when neither can be loaded.
+    """
+    directory = Path(directory)
+    try:
+        if has_embedding_store(directory):
+            return EmbeddingStore.open(directory)
+
+        json_path = directory / json_filename
+        if not json_path.exists():
+            print(f"No embedding store or {json_filename} found in {directory}")
+            return None
+
+        print(f"No embedding store in {directory}, reading {json_filename} (convert it with embedding_store.py)")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return EmbeddingStore.from_json_data(json.load(f))
+
+    except (OSError, ValueError, pl.ComputeError) as e:
+        print(f"Error loading embeddings from {directory}: {e}")
+        return None
+
+
+def convert_json_to_store(directory: Path, json_filename: str = LEGACY_JSON_FILENAME, remove_json: bool = False) -> bool:
+    """Convert directory's embeddings.json into a binary store next to it."""
+    json_path = Path(directory) / json_filename
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            store = EmbeddingStore.from_json_data(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error loading embeddings from {json_path}: {e}")
+        return False
+
+    store.save(directory)
+    print(f"Converted {len(store)} embeddings ({store.embedding_dim} dims) in {directory}")
+
+    if remove_json:
+        os.remove(json_path)
+        print(f"Removed {json_path}")
+    return True
+
+
+def main():
+    """Convert legacy embeddings.json files into binary embedding stores."""
+    parser = argparse.ArgumentParser(description="Convert embeddings.json files into npy embedding stores")
+    parser.add_argument(
+        "--data-source",
+        action="append",
+        help="Data source directory name under data/embeddings (repeatable; default: all with embeddings.json)"
+    )
+    parser.add_argument(
+        "--json-filename",
+        default=LEGACY_JSON_FILENAME,
+        help=f"Legacy embeddings filename (default: {LEGACY_JSON_FILENAME})"
+    )
+    parser.add_argument(
+        "--remove-json",
+        action="store_true",
+        help="Delete the JSON file after a successful conversion"
+    )
+    args = parser.parse_args()
+
+    # Get script directory and project root
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent.parent.parent  # Go up to interface root
+    embeddings_dir = project_root / "data" / "embeddings"
+
+    if args.data_source:
+        source_dirs = [embeddings_dir / data_source for data_source in args.data_source]
+    else:
+        source_dirs = sorted(
+            d for d in embeddings_dir.iterdir() if d.is_dir() and (d / args.json_filename).exists()
+        ) if embeddings_dir.exists() else []
+
+    if not source_dirs:
+        print(f"No {args.json_filename} files found in {embeddings_dir}")
+        return
+
+    converted = sum(convert_json_to_store(d, args.json_filename, args.remove_json) for d in source_dirs)
+    print(f"\nCompleted: {converted}/{len(source_dirs)} data sources converted")
+
+
+if __name__ == "__main__":
+    main()
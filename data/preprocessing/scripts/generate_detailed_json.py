@@ -2,15 +2,41 @@
 """
 Generate detailed JSON files for each latent by consolidating all available data
 (embeddings, scores, semantic distances) for a specific SAE ID.
+
+The inputs are loaded as Polars frames keyed by latent_id (columnar_sources.py)
+and joined into one row per latent; per-latent files are written by a pool of
+worker processes, each serializing a slice of that frame.
+
+Optionally writes a packed store instead of (or alongside) the per-latent files:
+one JSONL blob per SAE with a compact record per line, plus an offset index
+(feature_id, offset, length) sorted by feature_id that the backend memory-maps.
 """
 
 import os
 import json
 import argparse
-import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Optional, Set
-from collections import defaultdict
+from typing import Dict, Iterable
+
+import numpy as np
+import polars as pl
+
+from columnar_sources import (
+    load_explanations_frame,
+    load_scores_frame,
+    load_semantic_distances_frame,
+    assign_explanation_ids,
+    SCORE_METHODS,
+)
+
+DEFAULT_SHARD_SIZE = 1000
+
+# Packed store layout (read by backend/app/services/detail_store.py)
+PACK_DATA_FILENAME = "features.jsonl"
+PACK_INDEX_FILENAME = "features.idx.npy"
+PACK_INDEX_DTYPE = np.dtype([("feature_id", "<u4"), ("offset", "<u8"), ("length", "<u4")])
 
 
 def load_config(config_path: str) -> Dict:
@@ -24,239 +50,82 @@ def sanitize_sae_id_for_path(sae_id: str) -> str:
     return sae_id.replace("/", "--")
 
 
-def load_embeddings_data(embeddings_dir: Path, sae_id: str) -> Dict[str, Dict]:
-    """Load all embedding files that match the given SAE ID."""
-    embeddings_data = {}
-
-    # Find all embedding directories
-    if not embeddings_dir.exists():
-        print(f"Embeddings directory not found: {embeddings_dir}")
-        return embeddings_data
-
-    for data_source_dir in embeddings_dir.iterdir():
-        if not data_source_dir.is_dir():
-            continue
-
-        embeddings_file = data_source_dir / "embeddings.json"
-        if not embeddings_file.exists():
-            continue
-
-        try:
-            with open(embeddings_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Check if this embedding file matches our SAE ID
-            file_sae_id = data.get("metadata", {}).get("sae_id", "")
-            if file_sae_id == sae_id:
-                embeddings_data[data_source_dir.name] = data
-                print(f"Loaded embeddings from: {data_source_dir.name}")
-
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            print(f"Error loading embeddings from {embeddings_file}: {e}")
-
-    return embeddings_data
-
-
-def load_scores_data(scores_dir: Path, sae_id: str) -> Dict[str, Dict]:
-    """Load all score files that match the given SAE ID."""
-    scores_data = {}
-
-    # Find all score directories
-    if not scores_dir.exists():
-        print(f"Scores directory not found: {scores_dir}")
-        return scores_data
-
-    for data_source_dir in scores_dir.iterdir():
-        if not data_source_dir.is_dir():
-            continue
-
-        scores_file = data_source_dir / "scores.json"
-        if not scores_file.exists():
-            continue
-
-        try:
-            with open(scores_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Check if this score file matches our SAE ID
-            file_sae_id = data.get("metadata", {}).get("sae_id", "")
-            if file_sae_id == sae_id:
-                scores_data[data_source_dir.name] = data
-                print(f"Loaded scores from: {data_source_dir.name}")
-
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            print(f"Error loading scores from {scores_file}: {e}")
-
-    return scores_data
-
-
-def load_semantic_distances_data(distances_dir: Path, sae_id: str) -> Dict[str, Dict]:
-    """Load all semantic distance files that match the given SAE ID."""
-    distances_data = {}
-
-    # Find all distance directories
-    if not distances_dir.exists():
-        print(f"Semantic distances directory not found: {distances_dir}")
-        return distances_data
-
-    for comparison_dir in distances_dir.iterdir():
-        if not comparison_dir.is_dir():
-            continue
-
-        distances_file = comparison_dir / "semantic_distances.json"
-        if not distances_file.exists():
-            continue
-
-        try:
-            with open(distances_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Check if this distance file matches our SAE ID
-            file_sae_id_1 = data.get("metadata", {}).get("sae_id_1", "")
-            file_sae_id_2 = data.get("metadata", {}).get("sae_id_2", "")
-
-            if file_sae_id_1 == sae_id and file_sae_id_2 == sae_id:
-                distances_data[comparison_dir.name] = data
-                print(f"Loaded semantic distances from: {comparison_dir.name}")
-
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            print(f"Error loading distances from {distances_file}: {e}")
-
-    return distances_data
-
-
-def generate_explanation_ids(embeddings_data: Dict[str, Dict]) -> Dict[str, Dict[str, str]]:
-    """Generate unique explanation IDs for all explanations."""
-    explanation_mapping = {}  # {data_source: {latent_id: explanation_id}}
-    explanation_counter = 1
-
-    # Sort data sources for consistent ID assignment
-    for data_source in sorted(embeddings_data.keys()):
-        explanation_mapping[data_source] = {}
-        embeddings = embeddings_data[data_source].get("embeddings", {})
-
-        # Sort latent IDs for consistent ordering
-        for latent_id in sorted(embeddings.keys(), key=int):
-            exp_id = f"exp_{explanation_counter:03d}"
-            explanation_mapping[data_source][latent_id] = exp_id
-            explanation_counter += 1
-
-    return explanation_mapping
+def build_latent_frame(
+    explanations: pl.DataFrame,
+    scores: pl.DataFrame,
+    distances: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Join all inputs into one row per latent (latents with an explanation).
+
+    Columns: feature_id, explanations, semantic_distance_pairs and scores, the
+    last three as lists of structs ordered by data source. Distance pairs are
+    kept only when both sources have an explanation for the latent.
+    """
+    explanations = assign_explanation_ids(explanations)
+
+    explanation_lists = explanations.group_by("latent_id", maintain_order=True).agg(
+        pl.struct([
+            "explanation_id",
+            pl.col("explanation").alias("text"),
+            "explanation_method",
+            "llm_explainer",
+            "data_source",
+        ]).alias("explanations")
+    )
 
+    explanation_ids = explanations.select(["latent_id", "data_source", "explanation_id"])
+    pair_lists = (
+        distances
+        .join(
+            explanation_ids.rename({"data_source": "data_source_1", "explanation_id": "explanation_id_1"}),
+            on=["latent_id", "data_source_1"]
+        )
+        .join(
+            explanation_ids.rename({"data_source": "data_source_2", "explanation_id": "explanation_id_2"}),
+            on=["latent_id", "data_source_2"]
+        )
+        .sort(["latent_id", "data_source_1", "data_source_2"])
+        .group_by("latent_id", maintain_order=True)
+        .agg(
+            pl.struct([
+                pl.concat_list(["explanation_id_1", "explanation_id_2"]).alias("pair"),
+                "cosine_distance",
+                "euclidean_distance",
+            ]).alias("semantic_distance_pairs")
+        )
+    )
 
-def build_explanations_for_latent(
-    latent_id: str,
-    embeddings_data: Dict[str, Dict],
-    explanation_mapping: Dict[str, Dict[str, str]]
-) -> List[Dict]:
-    """Build explanations array for a specific latent."""
-    explanations = []
+    score_lists = (
+        scores
+        .sort(["latent_id", "data_source"])
+        .group_by("latent_id", maintain_order=True)
+        .agg(
+            pl.struct(["data_source", "llm_scorer"] + [f"score_{method}" for method in SCORE_METHODS])
+            .alias("scores")
+        )
+    )
 
-    for data_source, data in embeddings_data.items():
-        embeddings = data.get("embeddings", {})
-        if latent_id not in embeddings:
-            continue
+    return (
+        explanation_lists
+        .join(pair_lists, on="latent_id", how="left")
+        .join(score_lists, on="latent_id", how="left")
+        .sort("latent_id")
+        .rename({"latent_id": "feature_id"})
+    )
 
-        embedding_info = embeddings[latent_id]
-        config = data.get("metadata", {}).get("config_used", {})
 
-        explanation = {
-            "explanation_id": explanation_mapping[data_source][latent_id],
-            "text": embedding_info.get("explanation", ""),
-            "explanation_method": config.get("explanation_method", "unknown"),
-            "llm_explainer": config.get("llm_explainer", "unknown"),
-            "data_source": data_source
+def latent_records(latent_frame: pl.DataFrame, sae_id: str) -> Iterable[Dict]:
+    """Yield the detailed JSON record of every row of a latent frame."""
+    for row in latent_frame.iter_rows(named=True):
+        yield {
+            "feature_id": row["feature_id"],
+            "sae_id": sae_id,
+            "explanations": row["explanations"],
+            "semantic_distance_pairs": row["semantic_distance_pairs"] or [],
+            "scores": row["scores"] or [],
+            "activating_examples": "TODO: Not implemented yet"
         }
-        explanations.append(explanation)
-
-    return explanations
-
-
-def build_semantic_distances_for_latent(
-    latent_id: str,
-    distances_data: Dict[str, Dict],
-    explanation_mapping: Dict[str, Dict[str, str]]
-) -> List[Dict]:
-    """Build semantic distance pairs for a specific latent."""
-    distance_pairs = []
-
-    for comparison_name, data in distances_data.items():
-        distances = data.get("semantic_distances", {})
-        if latent_id not in distances:
-            continue
-
-        distance_info = distances[latent_id]
-        distances_dict = distance_info.get("distances", {})
-
-        # Get data sources from metadata
-        metadata = data.get("metadata", {})
-        source_1 = metadata.get("data_source_1", "")
-        source_2 = metadata.get("data_source_2", "")
-
-        # Get explanation IDs
-        exp_id_1 = explanation_mapping.get(source_1, {}).get(latent_id)
-        exp_id_2 = explanation_mapping.get(source_2, {}).get(latent_id)
-
-        if exp_id_1 and exp_id_2:
-            pair_info = {
-                "pair": [exp_id_1, exp_id_2],
-                "cosine_distance": distances_dict.get("cosine"),
-                "euclidean_distance": distances_dict.get("euclidean")
-            }
-            distance_pairs.append(pair_info)
-
-    return distance_pairs
-
-
-def build_scores_for_latent(latent_id: str, scores_data: Dict[str, Dict]) -> List[Dict]:
-    """Build scores array for a specific latent."""
-    scores = []
-
-    for data_source, data in scores_data.items():
-        latent_scores = data.get("latent_scores", {})
-        if latent_id not in latent_scores:
-            continue
-
-        score_info = latent_scores[latent_id]
-        config = data.get("metadata", {}).get("config_used", {})
-
-        score_entry = {
-            "data_source": data_source,
-            "llm_scorer": config.get("llm_scorer", "unknown"),
-            "score_fuzz": score_info.get("fuzz", {}).get("average_score"),
-            "score_detection": score_info.get("detection", {}).get("average_score"),
-            "score_simulation": score_info.get("simulation", {}).get("average_score"),
-            "score_embedding": score_info.get("embedding", {}).get("average_score")  # May not exist
-        }
-        scores.append(score_entry)
-
-    return scores
-
-
-def consolidate_latent_data(
-    latent_id: str,
-    sae_id: str,
-    embeddings_data: Dict[str, Dict],
-    scores_data: Dict[str, Dict],
-    distances_data: Dict[str, Dict],
-    explanation_mapping: Dict[str, Dict[str, str]]
-) -> Dict:
-    """Consolidate all data for a single latent into detailed JSON format."""
-
-    explanations = build_explanations_for_latent(latent_id, embeddings_data, explanation_mapping)
-    semantic_distances = build_semantic_distances_for_latent(latent_id, distances_data, explanation_mapping)
-    scores = build_scores_for_latent(latent_id, scores_data)
-
-    detailed_json = {
-        "feature_id": int(latent_id),
-        "sae_id": sae_id,
-        "explanations": explanations,
-        "semantic_distance_pairs": semantic_distances,
-        "scores": scores,
-        "activating_examples": "TODO: Not implemented yet"
-    }
-
-    return detailed_json
 
 
 def save_detailed_json(latent_data: Dict, output_dir: Path, filename_pattern: str) -> None:
@@ -271,6 +140,121 @@ def save_detailed_json(latent_data: Dict, output_dir: Path, filename_pattern: st
         json.dump(latent_data, f, indent=2, ensure_ascii=False)
 
 
+def _write_detailed_json_shard(
+    latent_frame: pl.DataFrame,
+    sae_id: str,
+    output_dir: Path,
+    filename_pattern: str
+) -> int:
+    """Write the per-latent files of one frame slice (module-level for the process pool)."""
+    written = 0
+    for latent_data in latent_records(latent_frame, sae_id):
+        save_detailed_json(latent_data, output_dir, filename_pattern)
+        written += 1
+    return written
+
+
+def write_detailed_json_files(
+    latent_frame: pl.DataFrame,
+    sae_id: str,
+    output_dir: Path,
+    filename_pattern: str,
+    num_workers: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE
+) -> int:
+    """
+    Write one detailed JSON file per latent, sharding the frame over worker processes.
+
+    Returns the number of files written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = [latent_frame.slice(offset, shard_size) for offset in range(0, len(latent_frame), shard_size)]
+
+    if num_workers <= 1:
+        written = 0
+        for index, shard in enumerate(shards):
+            written += _write_detailed_json_shard(shard, sae_id, output_dir, filename_pattern)
+            print(f"Shard {index + 1}/{len(shards)} written: {len(shard)} latents")
+        return written
+
+    written = 0
+    # Forking after Polars has started its thread pool can deadlock the workers
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(_write_detailed_json_shard, shard, sae_id, output_dir, filename_pattern)
+            for shard in shards
+        ]
+        for completed, future in enumerate(as_completed(futures), start=1):
+            written += future.result()
+            print(f"Shard written ({completed}/{len(shards)}): {written} latents so far")
+    return written
+
+
+def save_packed_store(latent_records: Iterable[Dict], output_dir: Path) -> int:
+    """
+    Save latent records as a packed JSONL blob plus an offset index.
+
+    Each record is written as compact JSON on its own line; the index holds the
+    byte offset and length of every record sorted by feature_id, so a reader can
+    binary-search the index and slice the blob. Both files are written to
+    temporary names first and swapped in, so readers never see a partial store.
+    Returns the number of records written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    data_file = output_dir / PACK_DATA_FILENAME
+    index_file = output_dir / PACK_INDEX_FILENAME
+    tmp_data_file = output_dir / (PACK_DATA_FILENAME + ".tmp")
+    tmp_index_file = output_dir / (PACK_INDEX_FILENAME + ".tmp")
+
+    entries = []
+    offset = 0
+    with open(tmp_data_file, "wb") as f:
+        for latent_data in latent_records:
+            line = json.dumps(latent_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            f.write(line)
+            f.write(b"\n")
+            entries.append((latent_data["feature_id"], offset, len(line)))
+            offset += len(line) + 1
+
+    index = np.array(entries, dtype=PACK_INDEX_DTYPE)
+    index.sort(order="feature_id")
+    if len(index) > 1 and np.any(index["feature_id"][1:] == index["feature_id"][:-1]):
+        os.remove(tmp_data_file)
+        raise ValueError(f"Duplicate feature_id in packed store for {output_dir}")
+
+    with open(tmp_index_file, "wb") as f:
+        np.save(f, index)
+
+    os.replace(tmp_data_file, data_file)
+    os.replace(tmp_index_file, index_file)
+    return len(index)
+
+
+def iter_existing_detailed_json(output_dir: Path, filename_pattern: str) -> Iterable[Dict]:
+    """Yield per-latent detailed JSON records already on disk, in feature_id order."""
+    prefix, _, suffix = filename_pattern.partition("{latent_id}")
+    feature_files = []
+    for path in output_dir.glob(f"{prefix}*{suffix}"):
+        latent_id = path.name[len(prefix):len(path.name) - len(suffix)]
+        if latent_id.isdigit():
+            feature_files.append((int(latent_id), path))
+
+    for _, path in sorted(feature_files):
+        with open(path, "r", encoding="utf-8") as f:
+            yield json.load(f)
+
+
+def remove_detailed_json_files(output_dir: Path, filename_pattern: str) -> int:
+    """Remove per-latent detailed JSON files once they are covered by the packed store."""
+    prefix, _, suffix = filename_pattern.partition("{latent_id}")
+    removed = 0
+    for path in output_dir.glob(f"{prefix}*{suffix}"):
+        if path.name[len(prefix):len(path.name) - len(suffix)].isdigit():
+            path.unlink()
+            removed += 1
+    return removed
+
+
 def save_consolidation_config(config: Dict, sae_id: str, output_dir: Path, stats: Dict) -> None:
     """Save configuration and statistics for the consolidation process."""
     config_with_stats = config.copy()
@@ -290,6 +274,26 @@ def main():
         default="../config/detailed_json_config.json",
         help="Path to configuration file (default: ../config/detailed_json_config.json)"
     )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Also write the packed JSONL store with an offset index (overrides config)"
+    )
+    parser.add_argument(
+        "--pack-existing",
+        action="store_true",
+        help="Only pack the per-latent JSON files already in the output directory"
+    )
+    parser.add_argument(
+        "--no-json",
+        action="store_true",
+        help="Do not keep per-latent JSON files when packing (overrides config)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of processes writing per-latent JSON files (default: config num_workers, else CPU count)"
+    )
     args = parser.parse_args()
 
     # Get script directory and project root
@@ -307,6 +311,8 @@ def main():
 
     sae_id = config["sae_id"]
     filename_pattern = config["output_filename_pattern"]
+    pack = args.pack or args.pack_existing or config.get("pack", False)
+    write_json_files = not (pack and (args.no_json or not config.get("keep_json_files", True)))
 
     print(f"Processing SAE ID: {sae_id}")
 
@@ -321,61 +327,69 @@ def main():
 
     print(f"Output directory: {output_dir}")
 
+    if args.pack_existing:
+        packed = save_packed_store(iter_existing_detailed_json(output_dir, filename_pattern), output_dir)
+        print(f"Packed {packed} existing latents into {output_dir / PACK_DATA_FILENAME}")
+        if not write_json_files:
+            removed = remove_detailed_json_files(output_dir, filename_pattern)
+            print(f"Removed {removed} per-latent JSON files")
+        return
+
     # Load all data
     print("\nLoading data...")
-    embeddings_data = load_embeddings_data(embeddings_dir, sae_id)
-    scores_data = load_scores_data(scores_dir, sae_id)
-    distances_data = load_semantic_distances_data(distances_dir, sae_id)
+    explanations = load_explanations_frame(embeddings_dir, sae_id)
+    scores = load_scores_frame(scores_dir, sae_id)
+    distances = load_semantic_distances_frame(distances_dir, sae_id)
 
-    if not embeddings_data:
+    if explanations.is_empty():
         print("No embedding data found for the specified SAE ID!")
         return
 
-    # Generate explanation IDs
-    explanation_mapping = generate_explanation_ids(embeddings_data)
-
-    # Find all unique latent IDs across all data sources
-    all_latent_ids = set()
-    for data_source, data in embeddings_data.items():
-        embeddings = data.get("embeddings", {})
-        all_latent_ids.update(embeddings.keys())
-
-    print(f"\nFound {len(all_latent_ids)} unique latents")
-    print(f"Data sources - Embeddings: {len(embeddings_data)}, Scores: {len(scores_data)}, Distances: {len(distances_data)}")
-
-    # Process each latent
-    successful_consolidations = 0
-
-    for latent_id in sorted(all_latent_ids, key=int):
-        try:
-            latent_data = consolidate_latent_data(
-                latent_id, sae_id, embeddings_data, scores_data,
-                distances_data, explanation_mapping
-            )
-
-            save_detailed_json(latent_data, output_dir, filename_pattern)
-            successful_consolidations += 1
-
-            # Progress update
-            if int(latent_id) % 100 == 0:
-                print(f"Processed latent {latent_id}")
-
-        except Exception as e:
-            print(f"Error processing latent {latent_id}: {e}")
+    embedding_sources = explanations["data_source"].unique(maintain_order=True).to_list()
+    score_sources = scores["data_source"].unique(maintain_order=True).to_list()
+    distance_pairs = [
+        f"{source_1}_vs_{source_2}"
+        for source_1, source_2 in distances.select(["data_source_1", "data_source_2"]).unique(maintain_order=True).iter_rows()
+    ]
+
+    # Join everything into one row per latent
+    latent_frame = build_latent_frame(explanations, scores, distances)
+
+    print(f"\nFound {len(latent_frame)} unique latents")
+    print(f"Data sources - Embeddings: {len(embedding_sources)}, Scores: {len(score_sources)}, Distances: {len(distance_pairs)}")
+
+    successful_consolidations = len(latent_frame)
+
+    if write_json_files:
+        num_workers = args.workers or config.get("num_workers") or os.cpu_count() or 1
+        print(f"Writing detailed JSON files with {num_workers} worker{'s' if num_workers != 1 else ''}")
+        successful_consolidations = write_detailed_json_files(
+            latent_frame, sae_id, output_dir, filename_pattern,
+            num_workers, config.get("shard_size", DEFAULT_SHARD_SIZE)
+        )
+
+    if pack:
+        save_packed_store(latent_records(latent_frame, sae_id), output_dir)
+        print(f"Packed store saved to: {output_dir / PACK_DATA_FILENAME}")
+        if not write_json_files:
+            removed = remove_detailed_json_files(output_dir, filename_pattern)
+            if removed:
+                print(f"Removed {removed} stale per-latent JSON files")
 
     # Save configuration and stats
     stats = {
-        "total_latents_found": len(all_latent_ids),
+        "total_latents_found": len(latent_frame),
         "successful_consolidations": successful_consolidations,
-        "data_sources_embeddings": list(embeddings_data.keys()),
-        "data_sources_scores": list(scores_data.keys()),
-        "data_sources_distances": list(distances_data.keys())
+        "packed_store": pack,
+        "data_sources_embeddings": embedding_sources,
+        "data_sources_scores": score_sources,
+        "data_sources_distances": distance_pairs
     }
 
     save_consolidation_config(config, sae_id, output_dir, stats)
 
     print(f"\nConsolidation completed!")
-    print(f"Successfully processed: {successful_consolidations}/{len(all_latent_ids)} latents")
+    print(f"Successfully processed: {successful_consolidations}/{len(latent_frame)} latents")
     print(f"Detailed JSON files saved to: {output_dir}")
     print(f"Config and stats saved to: {output_dir / 'config.json'}")
 
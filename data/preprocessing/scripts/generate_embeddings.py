@@ -1,19 +1,46 @@
 #!/usr/bin/env python3
 """
 Generate embeddings for SAE feature explanations using configurable embedding models.
+
+Explanations are embedded in batches by a thread pool (max_concurrency workers)
+sharing a token-bucket rate limit (requests_per_second). Finished latents are
+appended to a checkpoint file in the output directory after every batch, so a
+rerun skips them and only embeds what is missing. The embedding backend is
+selected by the config's "backend": "gemini" (Google Generative AI) or "hash"
+(local, deterministic feature hashing, for tests and offline runs).
 """
 
 import os
+import re
 import json
 import glob
-import google.generativeai as genai
+import hashlib
+import threading
 import time
 import argparse
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
 from dotenv import load_dotenv
 
+from embedding_store import EmbeddingStore
+
+try:
+    import google.generativeai as genai
+except ImportError:  # only needed by the gemini backend
+    genai = None
+
+CHECKPOINT_FILENAME = "embeddings.checkpoint.jsonl"
+
+DEFAULT_BACKEND = "gemini"
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_HASH_EMBEDDING_DIM = 256
+
 
 def load_config(config_path: str) -> Dict:
     """Load configuration from JSON file."""
@@ -86,28 +113,245 @@ def read_explanation(filepath: str) -> str:
         return content
 
 
-def generate_embedding(
-    text: str, model_name: str, task_type: str = "semantic_similarity"
-) -> Optional[List[float]]:
-    """Generate embedding for text using specified embedding model."""
-    try:
-        result = genai.embed_content(
-            model=model_name, content=text, task_type=task_type
-        )
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeminiBackend:
+    """Embeddings from the Google Generative AI embed_content API."""
+
+    name = "gemini"
+
+    def __init__(self, config: Dict):
+        if genai is None:
+            raise ValueError("google-generativeai is not installed")
+        setup_gemini_api()
+        self.model_name = config["embedding_model"]
+        self.task_type = config["task_type"]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        result = genai.embed_content(model=self.model_name, content=texts, task_type=self.task_type)
         return result["embedding"]
-    except Exception as e:
-        print(f"Error generating embedding: {e}")
-        return None
 
 
-def save_embeddings(embeddings_data: Dict, output_dir: str, filename: str, config: Dict, sae_id: str) -> None:
-    """Save embeddings data to JSON file and copy config."""
+class HashBackend:
+    """
+    Deterministic local embeddings: hashed word unigrams and bigrams, L2-normalized.
+
+    Identical texts always get identical vectors and texts sharing words get
+    closer vectors, which is enough to exercise the pipeline without an API.
+    """
+
+    name = "hash"
+
+    def __init__(self, config: Dict):
+        self.embedding_dim = config.get("embedding_dim", DEFAULT_HASH_EMBEDDING_DIM)
+        self.model_name = f"hash-{self.embedding_dim}"
+
+    def embed_text(self, text: str) -> List[float]:
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = np.zeros(self.embedding_dim, dtype=np.float64)
+        for feature in features:
+            digest = hashlib.sha256(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:8], "little") % self.embedding_dim
+            vector[index] += 1.0 if digest[8] & 1 else -1.0
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_text(text) for text in texts]
+
+
+EMBEDDING_BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    HashBackend.name: HashBackend,
+}
+
+
+def create_backend(config: Dict):
+    """Instantiate the embedding backend named by config["backend"]."""
+    backend_name = config.get("backend", DEFAULT_BACKEND)
+    if backend_name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend_name} (available: {', '.join(EMBEDDING_BACKENDS)})")
+    return EMBEDDING_BACKENDS[backend_name](config)
+
+
+def requests_per_second(config: Dict) -> float:
+    """Rate limit from the config; falls back to the legacy delay_between_requests."""
+    if "requests_per_second" in config:
+        return float(config["requests_per_second"])
+    delay = config.get("delay_between_requests", 0)
+    return 1.0 / delay if delay > 0 else 0.0
+
+
+def generate_batch_embeddings(
+    backend,
+    texts: List[str],
+    rate_limiter: TokenBucket,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> List[Optional[List[float]]]:
+    """Embed one batch of texts, retrying with exponential backoff; None for each text on failure."""
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire()
+        try:
+            embeddings = backend.embed_batch(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Backend returned {len(embeddings)} embeddings for {len(texts)} texts")
+            return embeddings
+        except Exception as e:
+            if attempt == max_retries:
+                print(f"Error generating embeddings: {e}")
+                break
+            backoff = 2 ** attempt
+            print(f"Error generating embeddings (attempt {attempt + 1}/{max_retries + 1}): {e}; retrying in {backoff}s")
+            time.sleep(backoff)
+
+    return [None] * len(texts)
+
+
+def checkpoint_header(config: Dict) -> Dict:
+    """First checkpoint line; a checkpoint is only resumed for the same backend and model."""
+    backend = config.get("backend", DEFAULT_BACKEND)
+    header = {"backend": backend, "task_type": config["task_type"]}
+    if backend == HashBackend.name:
+        header["embedding_dim"] = config.get("embedding_dim", DEFAULT_HASH_EMBEDDING_DIM)
+    else:
+        header["model"] = config["embedding_model"]
+    return header
+
+
+def load_checkpoint(checkpoint_path: Path, header: Dict) -> Dict[str, Dict]:
+    """
+    Read finished latents from a checkpoint file.
+
+    A truncated last line (from a crash mid-write) is ignored, as is the whole
+    file when it was written for a different backend or model.
+    """
+    finished = {}
+    if not checkpoint_path.exists():
+        return finished
+
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    try:
+        file_header = json.loads(lines[0]) if lines else None
+    except json.JSONDecodeError:
+        file_header = None
+
+    if file_header != header:
+        print(f"Ignoring checkpoint written with different settings: {checkpoint_path}")
+        return finished
+
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        finished[record["latent_id"]] = record
+
+    return finished
+
+
+def embed_explanations(
+    pending: List[Tuple[str, str]],
+    backend,
+    config: Dict,
+    checkpoint_file
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Embed (latent_id, explanation) pairs concurrently.
+
+    Every finished batch is appended to checkpoint_file and flushed. Returns the
+    new embedding entries keyed by latent ID and the IDs that failed.
+    """
+    batch_size = max(1, config.get("batch_size", DEFAULT_BATCH_SIZE))
+    max_concurrency = max(1, config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+    max_retries = config.get("max_retries", DEFAULT_MAX_RETRIES)
+    rate_limiter = TokenBucket(requests_per_second(config))
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    embeddings = {}
+    failed = []
+    completed = 0
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {
+            executor.submit(
+                generate_batch_embeddings, backend, [text for _, text in batch], rate_limiter, max_retries
+            ): batch
+            for batch in batches
+        }
+
+        for future in as_completed(futures):
+            batch = futures[future]
+            for (latent_id, explanation), embedding in zip(batch, future.result()):
+                if embedding is None:
+                    failed.append(latent_id)
+                    continue
+
+                record = {"latent_id": latent_id, "explanation": explanation, "embedding": list(embedding)}
+                checkpoint_file.write(json.dumps(record) + "\n")
+                embeddings[latent_id] = {
+                    "explanation": explanation,
+                    "embedding": record["embedding"],
+                    "embedding_dim": len(record["embedding"]),
+                }
+
+            checkpoint_file.flush()
+            completed += len(batch)
+            print(f"Processed {completed}/{len(pending)} latents ({len(failed)} failed)")
+
+    return embeddings, failed
+
+
+def save_embeddings(
+    embeddings_data: Dict,
+    output_dir: str,
+    filename: str,
+    config: Dict,
+    sae_id: str,
+    write_json: bool = False
+) -> None:
+    """Save embeddings as a binary embedding store (plus optional legacy JSON) and copy config."""
     os.makedirs(output_dir, exist_ok=True)
 
     # Save embeddings
-    output_file = os.path.join(output_dir, filename)
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(embeddings_data, f, indent=2, ensure_ascii=False)
+    EmbeddingStore.from_json_data(embeddings_data).save(Path(output_dir))
+    print(f"Embedding store saved to: {output_dir}")
+
+    if write_json:
+        output_file = os.path.join(output_dir, filename)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(embeddings_data, f, indent=2, ensure_ascii=False)
+        print(f"Embeddings saved to: {output_file}")
 
     # Save config file with sae_id in the same directory
     config_with_sae_id = config.copy()
@@ -116,7 +360,6 @@ def save_embeddings(embeddings_data: Dict, output_dir: str, filename: str, confi
     with open(config_file, "w", encoding="utf-8") as f:
         json.dump(config_with_sae_id, f, indent=2, ensure_ascii=False)
 
-    print(f"Embeddings saved to: {output_file}")
     print(f"Config saved to: {config_file}")
 
 
@@ -128,6 +371,16 @@ def main():
         default="../config/embedding_config.json",
         help="Path to configuration file (default: ../config/embedding_config.json)"
     )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(EMBEDDING_BACKENDS),
+        help="Override the config's embedding backend"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore an existing checkpoint and embed every explanation again"
+    )
     args = parser.parse_args()
 
     # Get script directory and project root
@@ -142,12 +395,15 @@ def main():
 
     config = load_config(config_path)
     print(f"Loaded config from: {config_path}")
+    if args.backend:
+        config["backend"] = args.backend
 
     # Setup paths relative to project root
     data_source = config["data_source"]
     data_source_dir = project_root / "data" / "raw" / data_source
     explanations_dir = data_source_dir / "explanations"
     output_dir = project_root / "data" / "embeddings" / data_source
+    checkpoint_path = output_dir / CHECKPOINT_FILENAME
 
     print(f"Input directory: {explanations_dir}")
     print(f"Output directory: {output_dir}")
@@ -162,13 +418,14 @@ def main():
         print(f"Error: Explanations directory does not exist: {explanations_dir}")
         return
 
-    # Setup Gemini API
+    # Setup embedding backend
     try:
-        setup_gemini_api()
-        print("Gemini API configured successfully")
+        backend = create_backend(config)
+        print(f"Embedding backend: {backend.name}")
     except ValueError as e:
         print(f"Error: {e}")
-        print("Please set GOOGLE_API_KEY in .env file")
+        if config.get("backend", DEFAULT_BACKEND) == GeminiBackend.name:
+            print("Please set GOOGLE_API_KEY in .env file")
         return
 
     # Get all explanation files
@@ -179,47 +436,67 @@ def main():
         print("No explanation files found!")
         return
 
-    # Process each file
+    explanations = [(extract_latent_id(filepath), read_explanation(filepath)) for filepath in explanation_files]
+
+    # Resume from the checkpoint: latents whose explanation is unchanged are done
+    header = checkpoint_header(config)
+    finished = {} if args.no_resume else load_checkpoint(checkpoint_path, header)
+    embeddings = {}
+    pending = []
+    for latent_id, explanation in explanations:
+        record = finished.get(latent_id)
+        if record is not None and record["explanation"] == explanation:
+            embeddings[latent_id] = {
+                "explanation": explanation,
+                "embedding": record["embedding"],
+                "embedding_dim": len(record["embedding"]),
+            }
+        else:
+            pending.append((latent_id, explanation))
+
+    if embeddings:
+        print(f"Resuming from checkpoint: {len(embeddings)} latents already embedded")
+    print(f"Embedding {len(pending)} explanations")
+
+    # Rewrite the checkpoint with the reusable records, then append as batches finish
+    os.makedirs(output_dir, exist_ok=True)
+    with open(checkpoint_path, "w", encoding="utf-8") as checkpoint_file:
+        checkpoint_file.write(json.dumps(header) + "\n")
+        for latent_id, entry in embeddings.items():
+            checkpoint_file.write(json.dumps({
+                "latent_id": latent_id, "explanation": entry["explanation"], "embedding": entry["embedding"]
+            }) + "\n")
+        checkpoint_file.flush()
+
+        new_embeddings, failed = embed_explanations(pending, backend, config, checkpoint_file)
+
+    embeddings.update(new_embeddings)
+    for latent_id in failed:
+        print(f"  Failed to generate embedding for latent {latent_id}")
+
     embeddings_data = {
         "metadata": {
-            "model": config["embedding_model"],
+            "model": backend.model_name,
             "task_type": config["task_type"],
             "total_latents": len(explanation_files),
             "dataset": data_source,
             "sae_id": sae_id,
             "config_used": config,
         },
-        "embeddings": {},
+        "embeddings": {latent_id: embeddings[latent_id] for latent_id, _ in explanations if latent_id in embeddings},
     }
 
-    for i, filepath in enumerate(explanation_files):
-        latent_id = extract_latent_id(filepath)
-        explanation = read_explanation(filepath)
-
-        print(f"Processing latent {latent_id} ({i+1}/{len(explanation_files)})")
-
-        # Generate embedding
-        embedding = generate_embedding(
-            explanation,
-            config["embedding_model"],
-            config["task_type"]
-        )
-
-        if embedding is not None:
-            embeddings_data["embeddings"][latent_id] = {
-                "explanation": explanation,
-                "embedding": embedding,
-                "embedding_dim": len(embedding),
-            }
-            print(f"  Generated embedding with dimension: {len(embedding)}")
-        else:
-            print(f"  Failed to generate embedding for latent {latent_id}")
-
-        # Add delay to avoid rate limiting
-        time.sleep(config["delay_between_requests"])
-
     # Save results
-    save_embeddings(embeddings_data, str(output_dir), config["output_filename"], config, sae_id)
+    save_embeddings(
+        embeddings_data, str(output_dir), config["output_filename"], config, sae_id,
+        config.get("write_json", False)
+    )
+
+    # The checkpoint is only needed while latents are still missing
+    if not failed:
+        os.remove(checkpoint_path)
+    else:
+        print(f"Checkpoint kept at {checkpoint_path}; rerun to retry {len(failed)} failed latents")
 
     successful_embeddings = len(embeddings_data["embeddings"])
     print(
@@ -22,6 +22,8 @@ from pathlib import Path
 from typing import Dict, List
 import umap
 
+from embedding_store import EmbeddingStore, load_embedding_store
+
 
 def load_config(config_path: str) -> Dict:
     """Load configuration from JSON file."""
@@ -29,25 +31,21 @@ def load_config(config_path: str) -> Dict:
         return json.load(f)
 
 
-def load_embedding_data(embedding_dir: str) -> Dict:
+def load_embedding_data(embedding_dir: str) -> EmbeddingStore:
     """
-    Load embedding data from embeddings.json file.
+    Load the embedding store of one source.
 
     Args:
-        embedding_dir: Directory containing embeddings.json
+        embedding_dir: Directory containing the embedding store (or embeddings.json)
 
     Returns:
-        Dictionary with metadata and embeddings
+        EmbeddingStore with the memory-mapped embedding matrix
     """
-    embedding_file = os.path.join(embedding_dir, "embeddings.json")
-
-    if not os.path.exists(embedding_file):
-        raise FileNotFoundError(f"Embedding file not found: {embedding_file}")
-
-    with open(embedding_file, 'r') as f:
-        data = json.load(f)
+    store = load_embedding_store(Path(embedding_dir))
+    if store is None:
+        raise FileNotFoundError(f"Embeddings not found in: {embedding_dir}")
 
-    return data
+    return store
 
 
 def prepare_embedding_matrix(embedding_sources: List[Dict]) -> tuple:
@@ -55,7 +53,7 @@ def prepare_embedding_matrix(embedding_sources: List[Dict]) -> tuple:
     Prepare embedding matrix from multiple sources.
 
     Args:
-        embedding_sources: List of dictionaries with 'name', 'path', and 'data'
+        embedding_sources: List of dictionaries with 'name', 'path', and 'store'
 
     Returns:
         Tuple of (embedding_matrix, source_map, feature_map)
@@ -63,29 +61,27 @@ def prepare_embedding_matrix(embedding_sources: List[Dict]) -> tuple:
         - source_map: list mapping row index to (source_name, feature_id)
         - feature_map: dict mapping feature_id to list of (source_name, row_index)
     """
-    all_embeddings = []
+    source_matrices = []
     source_map = []  # Maps row index to (source_name, feature_id)
     feature_map = {}  # Maps feature_id to list of (source_name, row_index)
 
     for source in embedding_sources:
         source_name = source['name']
-        embeddings_dict = source['data']['embeddings']
+        store = source['store']
 
-        print(f"Processing {source_name}: {len(embeddings_dict)} embeddings")
+        print(f"Processing {source_name}: {len(store)} embeddings")
 
-        for feature_id_str, emb_data in embeddings_dict.items():
-            feature_id = int(feature_id_str)
-            embedding = np.array(emb_data['embedding'], dtype=np.float32)
-
-            row_index = len(all_embeddings)
-            all_embeddings.append(embedding)
+        for feature_id in store.latent_ids.tolist():
+            row_index = len(source_map)
             source_map.append((source_name, feature_id))
 
             if feature_id not in feature_map:
                 feature_map[feature_id] = []
             feature_map[feature_id].append((source_name, row_index))
 
-    embedding_matrix = np.vstack(all_embeddings)
+        source_matrices.append(store.matrix)
+
+    embedding_matrix = np.vstack(source_matrices).astype(np.float32, copy=False)
     print(f"\nTotal embeddings: {embedding_matrix.shape[0]}")
     print(f"Embedding dimension: {embedding_matrix.shape[1]}")
     print(f"Unique features: {len(feature_map)}")
@@ -253,12 +249,12 @@ def main():
             source_path = project_root / source_config["path"]
 
             print(f"Loading {source_name} from {source_path}...")
-            data = load_embedding_data(str(source_path))
+            store = load_embedding_data(str(source_path))
 
             embedding_sources.append({
                 "name": source_name,
                 "path": str(source_path),
-                "data": data
+                "store": store
             })
 
         # Prepare embedding matrix
@@ -1,17 +1,32 @@
 #!/usr/bin/env python3
 """
 Process latent scores from multiple scoring methods and generate summaries.
+
+Latents are processed in shards of shard_size, serially or with --parallel in
+a process pool. Results are written as the nested JSON summary and as a
+long-format parquet table (one row per latent and scoring method).
 """
 
 import os
 import json
 import glob
 import argparse
-import statistics
-import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+import numpy as np
+import polars as pl
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    orjson = None
+
+DEFAULT_SHARD_SIZE = 1000
+SCORE_FILE_PATTERN = "layers.30_latent{}.txt"
+
 
 def load_config(config_path: str) -> Dict:
     """Load configuration from JSON file."""
@@ -50,12 +65,22 @@ def extract_latent_id(filename: str) -> str:
 
 
 def load_score_file(filepath: str) -> Optional[Dict]:
-    """Load score data from JSON-formatted text file."""
+    """
+    Load score data from JSON-formatted text file, using orjson when it is installed.
+
+    orjson rejects the NaN/Infinity tokens Python's json module writes, so
+    files it cannot decode are retried with the stdlib decoder.
+    """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open(filepath, 'rb') as f:
             content = f.read().strip()
-            return json.loads(content)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
+        if orjson is not None:
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(content)
+    except (ValueError, FileNotFoundError) as e:
         print(f"Error loading {filepath}: {e}")
         return None
 
@@ -81,38 +106,44 @@ def process_latent_scores(score_data: Dict, method: str) -> Tuple[Optional[float
         return process_binary_scores(score_data)
 
 
+def _to_float_array(values: List) -> np.ndarray:
+    """Convert values to float64, with NaN for None and for values float() rejects."""
+    try:
+        converted = np.asarray(values, dtype=np.float64)
+        if converted.ndim == 1:
+            return converted
+    except (ValueError, TypeError):
+        pass
+
+    converted = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            converted[i] = float(value)
+        except (ValueError, TypeError):
+            pass
+    return converted
+
+
 def process_simulation_scores(score_data: Dict) -> Tuple[Optional[float], int, int, Optional[float]]:
     """Process simulation scores that have ev_correlation_score values."""
     if not isinstance(score_data, list):
         return None, 0, 0, None
 
-    valid_scores = []
-    failure_count = 0
-
-    for item in score_data:
-        if isinstance(item, dict) and 'ev_correlation_score' in item:
-            score = item['ev_correlation_score']
-            if score is not None:
-                try:
-                    score_float = float(score)
-                    if not math.isnan(score_float) and math.isfinite(score_float):
-                        valid_scores.append(score_float)
-                    else:
-                        failure_count += 1
-                except (ValueError, TypeError):
-                    failure_count += 1
-            else:
-                failure_count += 1
-        else:
-            failure_count += 1
+    # Items without a finite ev_correlation_score count as failures
+    scores = _to_float_array([
+        item.get('ev_correlation_score') if isinstance(item, dict) else None
+        for item in score_data
+    ])
+    valid_scores = scores[np.isfinite(scores)]
 
     total_examples = len(score_data)
+    failure_count = total_examples - len(valid_scores)
 
-    if not valid_scores:
+    if not len(valid_scores):
         return None, total_examples, failure_count, None
 
-    average_score = statistics.mean(valid_scores)
-    variance = statistics.variance(valid_scores) if len(valid_scores) > 1 else 0.0
+    average_score = float(valid_scores.mean())
+    variance = float(valid_scores.var(ddof=1)) if len(valid_scores) > 1 else 0.0
 
     return average_score, total_examples, failure_count, variance
 
@@ -122,25 +153,23 @@ def process_binary_scores(score_data: Dict) -> Tuple[Optional[float], int, int,
     if not isinstance(score_data, list):
         return None, 0, 0, None
 
-    correct_count = 0
-    failure_count = 0
-
-    for item in score_data:
-        if isinstance(item, dict) and 'correct' in item:
-            correct_value = item['correct']
-            if isinstance(correct_value, bool):
-                if correct_value:
-                    correct_count += 1
-            else:
-                failure_count += 1
-        else:
-            failure_count += 1
-
     total_examples = len(score_data)
 
     if total_examples == 0:
         return None, 0, 0, None
 
+    # 1 = correct, 0 = incorrect, -1 = failure (missing or non-boolean correct field)
+    outcomes = np.fromiter(
+        (
+            (1 if value else 0) if isinstance(value, bool) else -1
+            for value in (item.get('correct') if isinstance(item, dict) else None for item in score_data)
+        ),
+        dtype=np.int8,
+        count=total_examples
+    )
+    failure_count = int(np.count_nonzero(outcomes < 0))
+    correct_count = int(np.count_nonzero(outcomes == 1))
+
     # For binary methods, average_score is accuracy (proportion correct)
     accuracy = correct_count / (total_examples - failure_count) if (total_examples - failure_count) > 0 else None
 
@@ -154,13 +183,105 @@ def get_score_files(scores_dir: str, method: str) -> List[str]:
     if not os.path.exists(method_dir):
         return []
 
-    pattern = os.path.join(method_dir, "layers.30_latent*.txt")
+    pattern = os.path.join(method_dir, SCORE_FILE_PATTERN.format("*"))
     files = glob.glob(pattern)
     return sorted(files)
 
 
-def save_processed_scores(processed_data: Dict, output_dir: str, filename: str, config: Dict, sae_id: str) -> None:
-    """Save processed scores data to JSON file and copy config."""
+def process_latent_shard(scores_dir: str, methods: List[str], latent_ids: List[str]) -> List[Dict]:
+    """
+    Process every scoring method of a shard of latents.
+
+    Returns one summary row per latent and method (module-level so process pool
+    workers can run it).
+    """
+    rows = []
+    for latent_id in latent_ids:
+        for method in methods:
+            score_file = os.path.join(scores_dir, method, SCORE_FILE_PATTERN.format(latent_id))
+
+            if os.path.exists(score_file):
+                score_data = load_score_file(score_file)
+                avg_score, total_examples, failure_count, variance = process_latent_scores(score_data, method)
+            else:
+                avg_score, total_examples, failure_count, variance = None, 0, 0, None
+
+            rows.append({
+                "latent_id": latent_id,
+                "method": method,
+                "average_score": avg_score,
+                "total_examples": total_examples,
+                "failure_count": failure_count,
+                "success_count": total_examples - failure_count,
+                "variance": variance
+            })
+    return rows
+
+
+def process_all_latents(
+    scores_dir: str,
+    methods: List[str],
+    latent_ids: List[str],
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    num_workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Process all latents shard by shard, in a process pool when num_workers > 1.
+
+    Rows are returned in latent_ids order regardless of shard completion order.
+    """
+    shards = [latent_ids[i:i + shard_size] for i in range(0, len(latent_ids), shard_size)]
+    shard_rows: List[Optional[List[Dict]]] = [None] * len(shards)
+
+    if num_workers is None or num_workers <= 1:
+        for index, shard in enumerate(shards):
+            shard_rows[index] = process_latent_shard(scores_dir, methods, shard)
+            print(f"Shard {index + 1}/{len(shards)} done: {len(shard)} latents")
+    else:
+        # Forking after Polars has started its thread pool can deadlock the workers
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {
+                pool.submit(process_latent_shard, scores_dir, methods, shard): index
+                for index, shard in enumerate(shards)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                shard_rows[index] = future.result()
+                print(f"Shard {index + 1} done ({completed}/{len(shards)}): {len(shards[index])} latents")
+
+    return [row for rows in shard_rows for row in rows]
+
+
+def build_scores_dataframe(rows: List[Dict], sae_id: str, data_source: str) -> pl.DataFrame:
+    """Columnar form of the summary rows: one row per latent and scoring method."""
+    return pl.DataFrame(
+        rows,
+        schema={
+            "latent_id": pl.Utf8,
+            "method": pl.Utf8,
+            "average_score": pl.Float64,
+            "total_examples": pl.Int64,
+            "failure_count": pl.Int64,
+            "success_count": pl.Int64,
+            "variance": pl.Float64
+        }
+    ).with_columns([
+        pl.col("latent_id").cast(pl.UInt32),
+        pl.lit(sae_id).alias("sae_id"),
+        pl.lit(data_source).alias("data_source")
+    ])
+
+
+def save_processed_scores(
+    processed_data: Dict,
+    output_dir: str,
+    filename: str,
+    config: Dict,
+    sae_id: str,
+    scores_df: Optional[pl.DataFrame] = None,
+    parquet_filename: Optional[str] = None
+) -> None:
+    """Save processed scores data to JSON (and optionally parquet) and copy config."""
     os.makedirs(output_dir, exist_ok=True)
 
     # Save processed scores
@@ -168,6 +289,11 @@ def save_processed_scores(processed_data: Dict, output_dir: str, filename: str,
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(processed_data, f, indent=2, ensure_ascii=False)
 
+    if scores_df is not None and parquet_filename:
+        parquet_file = os.path.join(output_dir, parquet_filename)
+        scores_df.write_parquet(parquet_file)
+        print(f"Processed scores table saved to: {parquet_file}")
+
     # Save config file with sae_id in the same directory
     config_with_sae_id = config.copy()
     config_with_sae_id["sae_id"] = sae_id
@@ -187,6 +313,16 @@ def main():
         default="../config/score_config.json",
         help="Path to configuration file (default: ../config/score_config.json)"
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Process latent shards in a process pool"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes in parallel mode (default: CPU count)"
+    )
     args = parser.parse_args()
 
     # Get script directory and project root
@@ -244,40 +380,33 @@ def main():
     print(f"Found {len(all_latent_ids)} unique latents across all methods")
 
     # Process each latent for each method
-    for latent_id in sorted(all_latent_ids):
-        processed_data["latent_scores"][latent_id] = {}
-
-        for method in config["scoring_methods"]:
-            method_dir = scores_dir / method
-            score_file = method_dir / f"layers.30_latent{latent_id}.txt"
-
-            if score_file.exists():
-                score_data = load_score_file(str(score_file))
-                avg_score, total_examples, failure_count, variance = process_latent_scores(score_data, method)
+    parallel = args.parallel or config.get("parallel", False)
+    num_workers = (args.workers or config.get("num_workers") or os.cpu_count() or 1) if parallel else 1
+    print(f"Processing with {num_workers} worker{'s' if num_workers != 1 else ''}")
+
+    rows = process_all_latents(
+        str(scores_dir),
+        config["scoring_methods"],
+        sorted(all_latent_ids),
+        config.get("shard_size", DEFAULT_SHARD_SIZE),
+        num_workers
+    )
 
-                processed_data["latent_scores"][latent_id][method] = {
-                    "average_score": avg_score,
-                    "total_examples": total_examples,
-                    "failure_count": failure_count,
-                    "success_count": total_examples - failure_count,
-                    "variance": variance
-                }
-
-                avg_str = f"{avg_score:.4f}" if avg_score is not None else "N/A"
-                print(f"Latent {latent_id} - {method}: avg={avg_str}, "
-                      f"examples={total_examples}, failures={failure_count}")
-            else:
-                processed_data["latent_scores"][latent_id][method] = {
-                    "average_score": None,
-                    "total_examples": 0,
-                    "failure_count": 0,
-                    "success_count": 0,
-                    "variance": None
-                }
-                print(f"Latent {latent_id} - {method}: file not found")
+    for row in rows:
+        processed_data["latent_scores"].setdefault(row["latent_id"], {})[row["method"]] = {
+            "average_score": row["average_score"],
+            "total_examples": row["total_examples"],
+            "failure_count": row["failure_count"],
+            "success_count": row["success_count"],
+            "variance": row["variance"]
+        }
 
     # Save results
-    save_processed_scores(processed_data, str(output_dir), config["output_filename"], config, sae_id)
+    scores_df = build_scores_dataframe(rows, sae_id, data_source)
+    save_processed_scores(
+        processed_data, str(output_dir), config["output_filename"], config, sae_id,
+        scores_df, config.get("parquet_filename")
+    )
 
     # Print summary statistics
     total_latents = len(all_latent_ids)
@@ -0,0 +1,13 @@
+import numpy as np
+
+from build_semantic_index import normalize_rows, train_centroids
+
+
+def test_train_centroids_samples_at_least_nlist_rows():
+    rng = np.random.default_rng(0)
+    vectors = normalize_rows(rng.standard_normal((64, 8)).astype(np.float32))
+
+    centroids = train_centroids(vectors, nlist=16, iterations=2, sample_size=4, chunk_size=32, rng=rng)
+
+    assert centroids.shape == (16, 8)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
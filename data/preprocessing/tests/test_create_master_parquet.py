@@ -0,0 +1,264 @@
+import json
+import os
+
+import polars as pl
+import pytest
+
+from create_master_parquet import MasterParquetCreator, load_config
+
+SAE_ID = "test/sae"
+SAE_DIR = "test--sae"
+
+
+def write_feature(detailed_dir, feature_id, explainers=("explainer-a", "explainer-b"), score=0.5):
+    explanations, scores = [], []
+    for index, explainer in enumerate(explainers):
+        data_source = f"{explainer}-source"
+        explanations.append({
+            "explanation_id": f"{feature_id}-{index}",
+            "data_source": data_source,
+            "explanation_method": "quantiles",
+            "llm_explainer": explainer
+        })
+        scores.append({
+            "data_source": data_source,
+            "llm_scorer": "scorer",
+            "score_fuzz": score,
+            "score_simulation": score,
+            "score_detection": score,
+            "score_embedding": score
+        })
+
+    path = detailed_dir / SAE_DIR / f"feature_{feature_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "feature_id": feature_id,
+        "sae_id": SAE_ID,
+        "explanations": explanations,
+        "scores": scores,
+        "semantic_distance_pairs": []
+    }))
+    return path
+
+
+@pytest.fixture
+def creator_factory(tmp_path):
+    detailed_dir = tmp_path / "detailed_json"
+    for feature_id in range(30):
+        write_feature(detailed_dir, feature_id)
+
+    def make():
+        config = load_config(None)
+        config.update({
+            "detailed_json_directory": str(detailed_dir),
+            "output_path": str(tmp_path / "master" / "feature_analysis.parquet"),
+            "shard_size": 10
+        })
+        return MasterParquetCreator(config)
+
+    return detailed_dir, make
+
+
+@pytest.fixture
+def shard_runs(monkeypatch):
+    """Record the shard keys each build processes."""
+    runs = []
+    original = MasterParquetCreator._run_shards
+
+    def recording(self, shards, part_paths, num_workers):
+        runs.append(sorted(shards))
+        return original(self, shards, part_paths, num_workers)
+
+    monkeypatch.setattr(MasterParquetCreator, "_run_shards", recording)
+    return runs
+
+
+def read_dataset(creator):
+    with open(creator.dataset_dir / "_dataset.json") as f:
+        manifest = json.load(f)
+    with pl.StringCache():
+        frames = [pl.read_parquet(creator.dataset_dir / p["path"]) for p in manifest["partitions"]]
+        return manifest, pl.concat(frames)
+
+
+def sort_rows(df):
+    return df.with_columns(pl.col(pl.Categorical).cast(pl.Utf8)).sort(["feature_id", "llm_explainer"])
+
+
+def test_first_build_processes_every_shard(creator_factory, shard_runs):
+    _, make = creator_factory
+    creator = make()
+    assert creator.build_parquet_incremental(num_workers=1) == 60
+    assert shard_runs == [[f"{SAE_DIR}/shard-0000{i}" for i in range(3)]]
+
+    manifest = json.loads(creator.manifest_path.read_text())
+    assert len(manifest["shards"]) == 3
+    assert manifest["shards"][f"{SAE_DIR}/shard-00000"]["partitions"] == [
+        [SAE_ID, "explainer-a"], [SAE_ID, "explainer-b"]
+    ]
+    assert len(pl.read_parquet(creator.output_path)) == 60
+
+
+def test_unchanged_inputs_reprocess_nothing(creator_factory, shard_runs):
+    detailed_dir, make = creator_factory
+    make().build_parquet_incremental(num_workers=1)
+    master_mtime = make().output_path.stat().st_mtime_ns
+
+    # A new mtime with the same content is detected by the content hash
+    path = detailed_dir / SAE_DIR / "feature_3.json"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+    creator = make()
+    assert creator.build_parquet_incremental(num_workers=1) == 60
+    assert shard_runs[-1] == []
+    assert creator.changed_partitions == set()
+    assert creator.output_path.stat().st_mtime_ns == master_mtime
+
+
+def test_changed_added_and_deleted_files_mark_their_shards(creator_factory, shard_runs):
+    detailed_dir, make = creator_factory
+    make().build_parquet_incremental(num_workers=1)
+
+    write_feature(detailed_dir, 14, score=0.75)
+    write_feature(detailed_dir, 35)
+    (detailed_dir / SAE_DIR / "feature_27.json").unlink()
+
+    creator = make()
+    assert creator.build_parquet_incremental(num_workers=1) == 60
+    assert shard_runs[-1] == [f"{SAE_DIR}/shard-00001", f"{SAE_DIR}/shard-00002", f"{SAE_DIR}/shard-00003"]
+
+    master = pl.read_parquet(creator.output_path)
+    assert master.filter(pl.col("feature_id") == 14)["score_fuzz"].to_list() == [0.75, 0.75]
+    assert 27 not in master["feature_id"].to_list()
+    assert 35 in master["feature_id"].to_list()
+
+
+def test_shared_dependency_change_rebuilds_every_shard(creator_factory, shard_runs):
+    _, make = creator_factory
+    make().build_parquet_incremental(num_workers=1)
+
+    creator = make()
+    creator.shard_size = 15
+    creator.build_parquet_incremental(num_workers=1)
+    assert shard_runs[-1] == [f"{SAE_DIR}/shard-0000{i}" for i in range(2)]
+
+
+def test_partitioned_dataset_updates_only_changed_partitions(creator_factory):
+    detailed_dir, make = creator_factory
+    creator = make()
+    creator.build_parquet_incremental(num_workers=1)
+    creator.write_partitioned_dataset()
+    part_a = creator.dataset_dir / "sae_id=test%2Fsae" / "llm_explainer=explainer-a" / "part-0.parquet"
+    mtime_a = part_a.stat().st_mtime_ns
+
+    creator = make()
+    creator.build_parquet_incremental(num_workers=1)
+    manifest_mtime = (creator.dataset_dir / "_dataset.json").stat().st_mtime_ns
+    assert creator.write_partitioned_dataset(creator.changed_partitions) == 0
+    assert (creator.dataset_dir / "_dataset.json").stat().st_mtime_ns == manifest_mtime
+
+    # A feature with a new explainer only touches that explainer's partition
+    write_feature(detailed_dir, 31, explainers=("explainer-c",))
+    creator = make()
+    creator.build_parquet_incremental(num_workers=1)
+    assert creator.changed_partitions == {(SAE_ID, "explainer-c")}
+    assert creator.write_partitioned_dataset(creator.changed_partitions) == 1
+
+    manifest, rows = read_dataset(creator)
+    assert [p["keys"]["llm_explainer"] for p in manifest["partitions"]] == [
+        "explainer-a", "explainer-b", "explainer-c"
+    ]
+    assert part_a.stat().st_mtime_ns == mtime_a
+    assert sort_rows(rows).equals(sort_rows(pl.read_parquet(creator.output_path)))
+
+    # Deleting its only feature removes the partition again
+    (detailed_dir / SAE_DIR / "feature_31.json").unlink()
+    creator = make()
+    creator.build_parquet_incremental(num_workers=1)
+    creator.write_partitioned_dataset(creator.changed_partitions)
+
+    manifest, rows = read_dataset(creator)
+    assert [p["keys"]["llm_explainer"] for p in manifest["partitions"]] == ["explainer-a", "explainer-b"]
+    assert sort_rows(rows).equals(sort_rows(pl.read_parquet(creator.output_path)))
+
+
+def write_intermediates(data_dir):
+    """
+    Preprocessing outputs of SAE_ID for two explainer data sources.
+
+    Latent 3 has no explanation from source-b (its distance pair is dropped),
+    latent 4 has no source-a score (its source-a row is dropped), and latent 5
+    has no closest-feature similarity (feature_splitting falls back to 0.0).
+    """
+    from embedding_store import EmbeddingStore
+
+    latents = {"source-a": [0, 1, 2, 3, 4, 5], "source-b": [0, 1, 2, 4, 5]}
+    for data_source, latent_ids in latents.items():
+        EmbeddingStore.from_json_data({
+            "metadata": {
+                "sae_id": SAE_ID,
+                "config_used": {"explanation_method": "quantiles", "llm_explainer": f"explainer-{data_source[-1]}"}
+            },
+            "embeddings": {
+                str(latent_id): {"explanation": f"{data_source} latent {latent_id}", "embedding": [1.0, float(latent_id)]}
+                for latent_id in latent_ids
+            }
+        }).save(data_dir / "embeddings" / data_source)
+
+        scored = [latent_id for latent_id in latent_ids if (data_source, latent_id) != ("source-a", 4)]
+        scores_dir = data_dir / "scores" / data_source
+        scores_dir.mkdir(parents=True)
+        (scores_dir / "scores.json").write_text(json.dumps({
+            "metadata": {"sae_id": SAE_ID, "config_used": {"llm_scorer": "scorer"}},
+            "latent_scores": {
+                str(latent_id): {
+                    method: {"average_score": latent_id / 10 + offset}
+                    for offset, method in enumerate(["fuzz", "detection", "simulation", "embedding"])
+                }
+                for latent_id in scored
+            }
+        }))
+
+    distances_dir = data_dir / "semantic_distances" / "a_vs_b"
+    distances_dir.mkdir(parents=True)
+    (distances_dir / "semantic_distances.json").write_text(json.dumps({
+        "metadata": {
+            "sae_id_1": SAE_ID, "sae_id_2": SAE_ID, "data_source_1": "source-a", "data_source_2": "source-b"
+        },
+        "semantic_distances": {
+            str(latent_id): {"distances": {"cosine": 0.1 * latent_id + 0.05, "euclidean": float(latent_id)}}
+            for latent_id in range(6)
+        }
+    }))
+
+    similarity_dir = data_dir / "feature_similarity" / SAE_DIR
+    similarity_dir.mkdir(parents=True)
+    (similarity_dir / "feature_similarities.json").write_text(json.dumps({
+        "feature_mappings": [
+            {"source_feature_id": latent_id, "closest_feature_id": (latent_id + 1) % 6,
+             "cosine_similarity": -0.25 * latent_id}
+            for latent_id in range(5)
+        ]
+    }))
+
+
+def test_master_from_intermediates_matches_detailed_json_route(tmp_path, monkeypatch):
+    # Relative config paths resolve against the enclosing "interface" directory
+    project_root = tmp_path / "interface"
+    write_intermediates(project_root / "data")
+    monkeypatch.chdir(project_root)
+
+    config = load_config(None)
+    config["sae_id_filter"] = SAE_ID
+
+    with pl.StringCache():
+        creator = MasterParquetCreator(config)
+        frames = creator.load_intermediates()
+        from_intermediates = creator.build_from_intermediates(frames)
+
+        assert creator.export_details(frames, "json", num_workers=1) == 6
+        from_detailed_json = MasterParquetCreator(config).process_all_features()
+
+    assert len(from_intermediates) == 10
+    assert from_intermediates.schema == from_detailed_json.schema
+    assert sort_rows(from_intermediates).equals(sort_rows(from_detailed_json))
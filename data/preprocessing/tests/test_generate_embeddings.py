@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+import generate_embeddings
+from generate_embeddings import (
+    HashBackend,
+    TokenBucket,
+    checkpoint_header,
+    embed_explanations,
+    load_checkpoint,
+)
+
+CONFIG = {
+    "backend": "hash",
+    "embedding_dim": 32,
+    "task_type": "semantic_similarity",
+    "batch_size": 2,
+    "max_concurrency": 1,
+    "requests_per_second": 0,
+    "max_retries": 1,
+}
+
+EXPLANATIONS = [(str(latent_id), f"explanation {latent_id} about token {latent_id % 3}") for latent_id in range(7)]
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(generate_embeddings, "time", clock)
+    return clock
+
+
+class FailingBackend(HashBackend):
+    """Hash backend whose calls fail while their number is in fail_calls."""
+
+    def __init__(self, config, fail_calls=()):
+        super().__init__(config)
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+
+    def embed_batch(self, texts):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise RuntimeError(f"call {self.calls} failed")
+        return super().embed_batch(texts)
+
+
+def run(tmp_path, pending, backend, config=CONFIG):
+    """Embed pending into a fresh checkpoint (header first, as main() writes it)."""
+    checkpoint_path = tmp_path / generate_embeddings.CHECKPOINT_FILENAME
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint_file:
+        if checkpoint_path.stat().st_size == 0:
+            checkpoint_file.write(json.dumps(checkpoint_header(config)) + "\n")
+        return embed_explanations(pending, backend, config, checkpoint_file)
+
+
+def test_resume_embeds_only_what_a_crashed_run_left(tmp_path, clock):
+    expected = {latent_id: HashBackend(CONFIG).embed_text(text) for latent_id, text in EXPLANATIONS}
+    checkpoint_path = tmp_path / generate_embeddings.CHECKPOINT_FILENAME
+
+    # First run: the third batch fails on every attempt
+    first, failed = run(tmp_path, EXPLANATIONS, FailingBackend(CONFIG, fail_calls={3, 4}))
+    assert failed == ["4", "5"]
+    assert set(first) == {"0", "1", "2", "3", "6"}
+
+    # Crash while writing the last record: only part of its line reached the file
+    lines = checkpoint_path.read_text().splitlines(keepends=True)
+    checkpoint_path.write_text("".join(lines[:-1]) + lines[-1][:20])
+
+    finished = load_checkpoint(checkpoint_path, checkpoint_header(CONFIG))
+    assert set(finished) == {"0", "1", "2", "3"}
+    for latent_id, record in finished.items():
+        assert record["embedding"] == expected[latent_id]
+
+    # Second run embeds the failed and the truncated latents only
+    backend = FailingBackend(CONFIG)
+    pending = [(latent_id, text) for latent_id, text in EXPLANATIONS if latent_id not in finished]
+    resumed, failed = run(tmp_path, pending, backend)
+    assert failed == []
+    assert set(resumed) == {"4", "5", "6"}
+    assert backend.calls == 2
+    for latent_id, entry in resumed.items():
+        assert entry["embedding"] == expected[latent_id]
+        assert entry["embedding_dim"] == CONFIG["embedding_dim"]
+
+
+def test_checkpoint_with_other_settings_is_ignored(tmp_path, clock):
+    run(tmp_path, EXPLANATIONS[:2], HashBackend(CONFIG))
+    checkpoint_path = tmp_path / generate_embeddings.CHECKPOINT_FILENAME
+
+    assert set(load_checkpoint(checkpoint_path, checkpoint_header(CONFIG))) == {"0", "1"}
+    other_dim = {**CONFIG, "embedding_dim": 64}
+    assert load_checkpoint(checkpoint_path, checkpoint_header(other_dim)) == {}
+    other_backend = {**CONFIG, "backend": "gemini", "embedding_model": "models/other"}
+    assert load_checkpoint(checkpoint_path, checkpoint_header(other_backend)) == {}
+    assert load_checkpoint(tmp_path / "missing.jsonl", checkpoint_header(CONFIG)) == {}
+
+
+def test_failed_batches_are_retried_with_backoff(tmp_path, clock):
+    config = {**CONFIG, "max_retries": 2}
+    backend = FailingBackend(config, fail_calls={1, 2})
+
+    embeddings, failed = run(tmp_path, EXPLANATIONS[:2], backend, config)
+    assert failed == []
+    assert set(embeddings) == {"0", "1"}
+    assert backend.calls == 3
+    assert clock.sleeps == [1, 2]
+
+
+def test_token_bucket_limits_the_request_rate(clock):
+    bucket = TokenBucket(rate=2.0)
+    for _ in range(6):
+        bucket.acquire()
+    # Two requests use the initial burst, the other four wait half a second each
+    assert clock.now == pytest.approx(2.0)
+
+    unlimited = TokenBucket(rate=0)
+    for _ in range(10):
+        unlimited.acquire()
+    assert clock.now == pytest.approx(2.0)